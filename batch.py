@@ -0,0 +1,637 @@
+"""
+Vectorized batch engine for Pochven flashpoint simulations.
+
+Every simulation in a batch is held as a row of NumPy arrays: an (N, 3) array of
+flashpoint systems kept in the same order the dict-based simulator iterates them,
+the index of the flashpoint the fleet is currently sitting on, and a bitmask of the
+camping systems for that run. All runs are advanced one flashpoint step at a time with
+array operations, each moving to the flashpoint its routing policy's compiled table
+picks (see policies.py), which gives the same statistics as
+Pochven.simulate_flashpoint_runs at a fraction of the per-run cost.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from policies import Policy, policy_table, resolve
+
+
+# Version of the simulation model. Bump it whenever a change alters simulation or
+# exact-solver results, so cached results from the old model are no longer used.
+MODEL_VERSION = 1
+
+# Marks a configuration value that is drawn at random on every run
+RANDOM = -1
+
+# Recorded as the first-encounter step of runs that never met the camp
+NEVER_ENCOUNTERED = -1
+
+# Number of simulations advanced together. Runs are always split into chunks of this
+# size, each with its own random stream, so results for a given seed do not depend on
+# how the chunks are spread over worker processes.
+CHUNK_SIZE = 1 << 14
+
+# For each completed flashpoint slot, the surviving slots in their original order.
+# The newly spawned flashpoint is always appended last, like a new dict key.
+_SURVIVORS = np.array([[1, 2], [0, 2], [0, 1]])
+
+
+class RunStatistics(NamedTuple):
+    """
+    Histograms and counters accumulated over a batch of runs.
+
+    Attributes:
+        n_simulations: Number of runs
+        n_flashpoints: Number of flashpoints completed in each run
+        first_encounter_counts: Entry n counts the runs that first met a camp on
+            flashpoint n (entry 0 is always zero)
+        pass_counts: Entry k counts the runs whose routes passed a camp k times
+        transit_counts: Entry s counts the routes, over all runs and steps, that
+            passed through system s (endpoints included)
+        visit_counts: Entry s counts the runs whose routes passed through system s
+            at least once
+    """
+    n_simulations: int
+    n_flashpoints: int
+    first_encounter_counts: np.ndarray
+    pass_counts: np.ndarray
+    transit_counts: np.ndarray
+    visit_counts: np.ndarray
+
+    @property
+    def probability(self) -> float:
+        """Fraction of runs that met a camp at least once."""
+        return int(self.first_encounter_counts.sum()) / self.n_simulations
+
+    @property
+    def pass_distribution(self) -> np.ndarray:
+        """Entry k is the fraction of runs that passed a camp exactly k times."""
+        return self.pass_counts / self.n_simulations
+
+    @property
+    def expected_passes(self) -> float:
+        """Mean number of camp passes per run."""
+        return float(np.arange(len(self.pass_counts)) @ self.pass_counts) / self.n_simulations
+
+    @property
+    def transit_frequency(self) -> np.ndarray:
+        """Mean number of times a run's routes pass through each system."""
+        return self.transit_counts / self.n_simulations
+
+    @property
+    def visit_probability(self) -> np.ndarray:
+        """Fraction of runs whose routes pass through each system."""
+        return self.visit_counts / self.n_simulations
+
+
+class RandomDraws:
+    """
+    The random numbers a batch of runs consumes, drawn on demand from a generator.
+
+    SpawnTape offers the same methods from pre-drawn numbers, so the engine can
+    replay one tape across several configurations.
+    """
+
+    def __init__(self, rng: np.random.Generator, size: int):
+        self.rng = rng
+        self.size = size
+
+    def camping_systems(self, n_systems: int) -> np.ndarray:
+        """(N,) uniformly random camping systems."""
+        return self.rng.integers(0, n_systems, self.size)
+
+    def flashpoints(self, n_systems: int) -> np.ndarray:
+        """(N, 3) uniformly random starting flashpoints."""
+        return self.rng.integers(0, n_systems, (self.size, 3))
+
+    def start_slots(self) -> np.ndarray:
+        """(N,) uniformly random starting flashpoint slots."""
+        return self.rng.integers(0, 3, self.size)
+
+    def spawns(self, step: int, n_systems: int) -> np.ndarray:
+        """(N,) uniformly random systems for the flashpoint spawned on a step."""
+        return self.rng.integers(0, n_systems, self.size)
+
+    def spawn_uniforms(self, step: int) -> np.ndarray:
+        """(N,) uniform numbers in [0, 1) driving the spawn on a step."""
+        return self.rng.random(self.size)
+
+
+class SpawnTape:
+    """
+    Pre-drawn random numbers for a fixed number of runs and flashpoints.
+
+    Configurations simulated on the same tape share their random numbers (common
+    random numbers), so differences between them are not buried in sampling noise.
+    Every draw is stored as a uniform number and mapped onto the range it is used
+    for, which keeps a tape valid for any map size.
+    """
+
+    def __init__(self, n_simulations: int, n_flashpoints: int, seed: Optional[int] = None):
+        rng = np.random.default_rng(seed)
+        self.size = n_simulations
+        self.n_flashpoints = n_flashpoints
+        self._camping_systems = rng.random(n_simulations)
+        self._flashpoints = rng.random((n_simulations, 3))
+        self._start_slots = rng.random(n_simulations)
+        self._spawns = rng.random((n_flashpoints, n_simulations))
+
+    def camping_systems(self, n_systems: int) -> np.ndarray:
+        return (self._camping_systems * n_systems).astype(np.int64)
+
+    def flashpoints(self, n_systems: int) -> np.ndarray:
+        return (self._flashpoints * n_systems).astype(np.int64)
+
+    def start_slots(self) -> np.ndarray:
+        return (self._start_slots * 3).astype(np.int64)
+
+    def spawns(self, step: int, n_systems: int) -> np.ndarray:
+        return (self._spawns[step - 1] * n_systems).astype(np.int64)
+
+    def spawn_uniforms(self, step: int) -> np.ndarray:
+        return self._spawns[step - 1]
+
+
+def slot_chooser(routing, camp_mask: np.ndarray, policy: Optional[Policy] = None
+                 ) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    The flashpoint choice of a batch of runs under a routing policy.
+
+    Args:
+        routing: Routing table of the map
+        camp_mask: (N,) uint64 camp bitmask of each run, for camp-aware policies
+        policy: A policies.Policy, or None for the nearest flashpoint
+
+    Returns:
+        A function (current_system, flashpoints) -> slots. current_system has the
+        runs along its first axis and flashpoints one more trailing axis of 3;
+        extra axes broadcast, as for evaluating every possible spawn at once
+    """
+    policy = resolve(policy)
+    if not policy.camp_aware:
+        table = policy_table(policy, routing)
+        return lambda current_system, flashpoints: table[
+            current_system, flashpoints[..., 0], flashpoints[..., 1], flashpoints[..., 2]]
+
+    # One table per distinct camp mask, stacked and selected per run
+    masks, index = np.unique(camp_mask, return_inverse=True)
+    tables = np.stack([policy_table(policy, routing, int(mask)) for mask in masks])
+
+    def choose(current_system, flashpoints):
+        run_table = index.reshape(index.shape + (1,) * (current_system.ndim - 1))
+        return tables[run_table, current_system,
+                      flashpoints[..., 0], flashpoints[..., 1], flashpoints[..., 2]]
+    return choose
+
+
+def path_hits(path_mask: np.ndarray, start: np.ndarray, end: np.ndarray,
+              camp_mask: np.ndarray) -> np.ndarray:
+    """
+    Check whether the shortest paths from start to end pass through any camp.
+
+    Args:
+        path_mask: The RoutingTable.path_mask array
+        start: Array of starting system IDs
+        end: Array of ending system IDs
+        camp_mask: uint64 array of camp bitmasks (see routing.system_mask)
+
+    Returns:
+        Boolean array, True where the path includes one of the camps
+    """
+    return path_mask[start, end] & camp_mask != 0
+
+
+def path_includes(path_mask: np.ndarray, start: np.ndarray, end: np.ndarray,
+                  system: np.ndarray) -> np.ndarray:
+    """
+    Check whether the shortest paths from start to end pass through a system.
+
+    Args:
+        path_mask: The RoutingTable.path_mask array
+        start: Array of starting system IDs
+        end: Array of ending system IDs
+        system: Array of system IDs to look for on the paths
+
+    Returns:
+        Boolean array, True where the path includes the system
+    """
+    return (path_mask[start, end] >> system.astype(np.uint64)) & np.uint64(1) == 1
+
+
+def configuration(pochven) -> Tuple[int, int, np.ndarray]:
+    """
+    The configuration of a Pochven instance as engine inputs.
+
+    Returns:
+        A tuple of (camp mask, fleet starting system, flashpoints array), with
+        RANDOM for anything that is randomized on every run
+    """
+    if pochven.distance_oracle is not None:
+        raise ValueError("The batch engine needs a RoutingTable, not a distance oracle")
+    camp_mask = pochven.camp_mask if pochven.camping_system_provided else RANDOM
+    fleet_starting_system = pochven.fleet_starting_system
+    if fleet_starting_system is None:
+        fleet_starting_system = RANDOM
+    if pochven.flashpoints_provided:
+        flashpoints = np.array(list(pochven.flashpoints.values()))
+    else:
+        flashpoints = np.full(3, RANDOM)
+    return camp_mask, fleet_starting_system, flashpoints
+
+
+def broadcast_configuration(config: Tuple[int, int, np.ndarray], size: int
+                            ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Repeat a configuration from configuration() for a batch of runs."""
+    camp_mask, fleet_starting_system, flashpoints = config
+    return (np.full(size, camp_mask, dtype=np.int64), np.full(size, fleet_starting_system),
+            np.tile(flashpoints, (size, 1)))
+
+
+def initial_state(routing, camp_mask: np.ndarray, fleet_starting_system: np.ndarray,
+                  flashpoints: np.ndarray, draws: RandomDraws, policy: Optional[Policy] = None
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Draw the starting state of a batch of runs.
+
+    Args:
+        routing: Routing table of the map
+        camp_mask: (N,) int64 camp bitmasks, RANDOM to draw a single camp per run
+        fleet_starting_system: (N,) fleet starting systems, RANDOM to start each run
+            at a random flashpoint
+        flashpoints: (N, 3) starting flashpoints, rows of RANDOM to draw them per run
+        draws: Source of the runs' random numbers (RandomDraws or SpawnTape)
+        policy: Routing policy for the first move (None for the nearest flashpoint)
+
+    Returns:
+        A tuple of (camp_mask, flashpoints, current_slot) arrays, where camp_mask
+        is uint64 and current_slot is the flashpoint the fleet starts on
+    """
+    n_systems = routing.n_systems
+
+    # Randomize any elements that weren't provided as arguments
+    random_camp = camp_mask == RANDOM
+    if random_camp.any():
+        camp_mask = np.where(
+            random_camp, np.left_shift(1, draws.camping_systems(n_systems)), camp_mask)
+
+    random_flashpoints = flashpoints == RANDOM
+    if random_flashpoints.any():
+        flashpoints = np.where(
+            random_flashpoints, draws.flashpoints(n_systems), flashpoints)
+
+    # Masks with bit 63 set are negative as int64; the cast keeps their bits
+    camp_mask = camp_mask.astype(np.uint64)
+
+    # Start at the flashpoint the policy picks from the fleet's system, or at a random one
+    random_start = fleet_starting_system == RANDOM
+    current_slot = slot_chooser(routing, camp_mask, policy)(
+        np.where(random_start, 0, fleet_starting_system), flashpoints)
+    if random_start.any():
+        current_slot = np.where(
+            random_start, draws.start_slots(), current_slot)
+
+    return camp_mask, flashpoints, current_slot
+
+
+def iter_steps(routing, camp_mask: np.ndarray, flashpoints: np.ndarray,
+               current_slot: np.ndarray, n_flashpoints: int, draws: RandomDraws,
+               policy: Optional[Policy] = None) -> Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Advance a batch of runs one flashpoint completion at a time.
+
+    Args:
+        routing: Routing table of the map
+        camp_mask: (N,) uint64 camp bitmask of each run
+        flashpoints: (N, 3) flashpoint systems of each run, in dict order
+        current_slot: (N,) flashpoint each run's fleet is sitting on
+        n_flashpoints: Number of flashpoints to complete in each run
+        draws: Source of the runs' random numbers (RandomDraws or SpawnTape)
+        policy: Routing policy choosing the next flashpoint (None for the nearest)
+
+    Yields:
+        For every step (1-based), a tuple of (step, current_system, next_system,
+        flashpoints, hit): the system whose flashpoint was just completed, the
+        flashpoint system the fleet moves to, the flashpoints after the spawn, and
+        whether the route between them passes a camp
+    """
+    rows = np.arange(len(camp_mask))
+    n_systems = routing.n_systems
+    path_mask = routing.path_mask
+    choose_slot = slot_chooser(routing, camp_mask, policy)
+
+    current_system = flashpoints[rows, current_slot]
+
+    for step in range(1, n_flashpoints + 1):
+        # Complete the current flashpoint and spawn a new one at the end
+        survivors = np.take_along_axis(
+            flashpoints, _SURVIVORS[current_slot], axis=1)
+        spawned = draws.spawns(step, n_systems)
+        flashpoints = np.column_stack((survivors, spawned))
+
+        # Move to the flashpoint the policy picks, checking the path for the camp
+        current_slot = choose_slot(current_system, flashpoints)
+        next_system = flashpoints[rows, current_slot]
+        hit = path_hits(path_mask, current_system, next_system, camp_mask)
+        yield step, current_system, next_system, flashpoints, hit
+        current_system = next_system
+
+
+def first_encounter_steps(routing, camp_mask: np.ndarray, flashpoints: np.ndarray,
+                          current_slot: np.ndarray, n_flashpoints: int,
+                          draws: RandomDraws, policy: Optional[Policy] = None) -> np.ndarray:
+    """
+    Advance a batch of runs and record when each first meets the camping fleet.
+
+    Takes the same arguments as iter_steps.
+
+    Returns:
+        Array of shape (N,) holding the flashpoint step (1-based) at which each run
+        first met the camping fleet, or NEVER_ENCOUNTERED
+    """
+    first_encounter = np.full(len(camp_mask), NEVER_ENCOUNTERED)
+    for step, _, _, _, hit in iter_steps(routing, camp_mask, flashpoints,
+                                         current_slot, n_flashpoints, draws, policy):
+        first_encounter[hit & (first_encounter == NEVER_ENCOUNTERED)] = step
+    return first_encounter
+
+
+def conditional_encounter_probabilities(routing, camp_mask: np.ndarray,
+                                        flashpoints: np.ndarray, current_slot: np.ndarray,
+                                        n_flashpoints: int, draws: RandomDraws,
+                                        policy: Optional[Policy] = None) -> np.ndarray:
+    """
+    Conditional Monte Carlo estimate of each run's encounter probability.
+
+    Instead of sampling the spawn and checking whether the resulting route passes the
+    camp, every step evaluates all possible spawns and adds the exact probability q
+    that the next route leads through the camp. The run then continues with a spawn
+    drawn from the ones that avoid the camp, weighted by the probability 1 - q of
+    having got that far. Each run's value is an unbiased estimate of the encounter
+    probability with much lower variance than a 0/1 outcome.
+
+    Args:
+        routing: Routing table of the map
+        camp_mask: (N,) uint64 camp bitmask of each run
+        flashpoints: (N, 3) flashpoint systems of each run, in dict order
+        current_slot: (N,) flashpoint each run's fleet is sitting on
+        n_flashpoints: Number of flashpoints to complete in each run
+        draws: Source of the runs' random numbers (RandomDraws or SpawnTape)
+        policy: Routing policy choosing the next flashpoint (None for the nearest)
+
+    Returns:
+        Array of shape (N,) of per-run encounter probability estimates
+    """
+    size = len(camp_mask)
+    rows = np.arange(size)
+    n_systems = routing.n_systems
+    path_mask = routing.path_mask
+    every_spawn = np.arange(n_systems)
+    choose_slot = slot_chooser(routing, camp_mask, policy)
+
+    current_system = flashpoints[rows, current_slot]
+    not_encountered = np.ones(size)
+
+    for step in range(1, n_flashpoints + 1):
+        # Candidate flashpoints for every possible spawn: (N, n_systems, 3)
+        survivors = np.take_along_axis(
+            flashpoints, _SURVIVORS[current_slot], axis=1)
+        candidates = np.empty((size, n_systems, 3), dtype=survivors.dtype)
+        candidates[:, :, :2] = survivors[:, None, :]
+        candidates[:, :, 2] = every_spawn
+
+        slot = choose_slot(current_system[:, None], candidates)
+        target = np.take_along_axis(candidates, slot[:, :, None], axis=2)[:, :, 0]
+        hit = path_hits(path_mask, current_system[:, None], target, camp_mask[:, None])
+
+        # Weight by the chance of avoiding the camp on this step
+        avoided = n_systems - np.count_nonzero(hit, axis=1)
+        not_encountered *= avoided / n_systems
+
+        # Continue along a spawn that avoids the camp (any spawn once none does)
+        allowed = np.where(avoided[:, None] > 0, ~hit, True)
+        choice = (draws.spawn_uniforms(step) *
+                  np.count_nonzero(allowed, axis=1)).astype(np.int64)
+        spawned = np.argmax(np.cumsum(allowed, axis=1) > choice[:, None], axis=1)
+
+        flashpoints = np.column_stack((survivors, spawned))
+        current_slot = slot[rows, spawned]
+        current_system = target[rows, spawned]
+
+    return 1.0 - not_encountered
+
+
+def chunk_streams(n_simulations: int, seed: Union[None, int, np.random.SeedSequence] = None
+                  ) -> List[Tuple[int, int, np.random.SeedSequence]]:
+    """
+    Split a run of simulations into fixed-size chunks with independent random streams.
+
+    Chunk i always gets the i-th child stream of the seed, so the same seed gives the
+    same streams no matter how many simulations or workers there are.
+
+    Args:
+        n_simulations: Total number of simulations
+        seed: Integer seed or SeedSequence (fresh OS entropy if None)
+
+    Returns:
+        A list of (offset, chunk size, seed sequence) tuples
+    """
+    root = seed if isinstance(
+        seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [(offset, min(CHUNK_SIZE, n_simulations - offset),
+             np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (index,)))
+            for index, offset in enumerate(range(0, n_simulations, CHUNK_SIZE))]
+
+
+def _run_chunk(task):
+    chunk_function, offset, size, seed_sequence, args = task
+    return chunk_function(offset, size, np.random.default_rng(seed_sequence), *args)
+
+
+def map_chunks(chunk_function: Callable, n_simulations: int, *args,
+               seed: Union[None, int, np.random.SeedSequence] = None,
+               workers: Optional[int] = None) -> list:
+    """
+    Run a chunk function over all chunks of a simulation, optionally in parallel.
+
+    Args:
+        chunk_function: Module-level function called as
+            chunk_function(offset, size, rng, *args) for the runs
+            offset to offset + size
+        n_simulations: Total number of simulations
+        *args: Extra arguments passed to every chunk
+        seed: Integer seed or SeedSequence (fresh OS entropy if None)
+        workers: Number of worker processes (runs in this process if None or 1)
+
+    Returns:
+        The chunk results in chunk order
+    """
+    tasks = [(chunk_function, offset, size, seed_sequence, args)
+             for offset, size, seed_sequence in chunk_streams(n_simulations, seed)]
+
+    if workers is None or workers <= 1 or len(tasks) <= 1:
+        return [_run_chunk(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        return list(executor.map(_run_chunk, tasks))
+
+
+def _first_encounter_counts(offset: int, size: int, rng: np.random.Generator,
+                            routing, config: Tuple[int, int, np.ndarray],
+                            max_flashpoints: int, policy: Optional[Policy] = None) -> np.ndarray:
+    draws = RandomDraws(rng, size)
+    state = initial_state(routing, *broadcast_configuration(config, size), draws, policy)
+    first_encounter = first_encounter_steps(
+        routing, *state, max_flashpoints, draws, policy)
+    return np.bincount(first_encounter[first_encounter != NEVER_ENCOUNTERED],
+                       minlength=max_flashpoints + 1)
+
+
+def _system_bits(masks: np.ndarray, n_systems: int) -> np.ndarray:
+    # Unpack uint64 system bitmasks into a trailing axis of n_systems 0/1 values
+    as_bytes = masks.astype('<u8').view(np.uint8).reshape(masks.shape + (8,))
+    return np.unpackbits(as_bytes, axis=-1, bitorder='little')[..., :n_systems]
+
+
+def _run_statistics(offset: int, size: int, rng: np.random.Generator,
+                    routing, config: Tuple[int, int, np.ndarray],
+                    n_flashpoints: int, policy: Optional[Policy] = None
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    n_systems = routing.n_systems
+    draws = RandomDraws(rng, size)
+    state = initial_state(routing, *broadcast_configuration(config, size), draws, policy)
+
+    first_encounter = np.full(size, NEVER_ENCOUNTERED)
+    passes = np.zeros(size, dtype=np.int64)
+    visited = np.zeros(size, dtype=np.uint64)
+    route_counts = np.zeros(n_systems * n_systems, dtype=np.int64)
+    for step, current_system, next_system, _, hit in iter_steps(
+            routing, *state, n_flashpoints, draws, policy):
+        first_encounter[hit & (first_encounter == NEVER_ENCOUNTERED)] = step
+        passes += hit
+        visited |= routing.path_mask[current_system, next_system]
+        route_counts += np.bincount(current_system * n_systems + next_system,
+                                    minlength=n_systems * n_systems)
+
+    # Routes are counted per (start, end) pair and expanded onto their systems once
+    transit = route_counts @ _system_bits(routing.path_mask, n_systems).reshape(
+        n_systems * n_systems, n_systems).astype(np.int64)
+    return (np.bincount(first_encounter[first_encounter != NEVER_ENCOUNTERED],
+                        minlength=n_flashpoints + 1),
+            np.bincount(passes, minlength=n_flashpoints + 1),
+            transit,
+            _system_bits(visited, n_systems).sum(axis=0, dtype=np.int64))
+
+
+def _conditional_sum(offset: int, size: int, rng: np.random.Generator,
+                     routing, config: Tuple[int, int, np.ndarray],
+                     n_flashpoints: int, policy: Optional[Policy] = None) -> float:
+    draws = RandomDraws(rng, size)
+    state = initial_state(routing, *broadcast_configuration(config, size), draws, policy)
+    return float(conditional_encounter_probabilities(
+        routing, *state, n_flashpoints, draws, policy).sum())
+
+
+def conditional_encounter_probability(pochven, n_flashpoints: int, n_simulations: int,
+                                      seed: Union[None, int, np.random.SeedSequence] = None,
+                                      workers: Optional[int] = None) -> float:
+    """
+    Estimate the encounter probability with the conditional Monte Carlo estimator.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete in each simulation
+        n_simulations: Number of simulations to run
+        seed: Integer seed or SeedSequence (fresh OS entropy if None)
+        workers: Number of worker processes (runs in this process if None or 1)
+
+    Returns:
+        Estimated probability of encountering the camping fleet at least once
+    """
+    chunk_sums = map_chunks(_conditional_sum, n_simulations, pochven.routing,
+                            configuration(pochven), n_flashpoints, pochven.policy,
+                            seed=seed, workers=workers)
+    return sum(chunk_sums) / n_simulations
+
+
+def first_encounter_histogram(pochven, max_flashpoints: int, n_simulations: int,
+                              seed: Union[None, int, np.random.SeedSequence] = None,
+                              workers: Optional[int] = None) -> np.ndarray:
+    """
+    Run a batch of simulations and histogram the step of each run's first encounter.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        max_flashpoints: Number of flashpoints to complete in each simulation
+        n_simulations: Number of simulations to run
+        seed: Integer seed or SeedSequence (fresh OS entropy if None)
+        workers: Number of worker processes (runs in this process if None or 1)
+
+    Returns:
+        Array of length max_flashpoints + 1 where entry n counts the runs that first
+        met the camping fleet on flashpoint n (entry 0 is always zero)
+    """
+    counts = np.zeros(max_flashpoints + 1, dtype=np.int64)
+    for chunk_counts in map_chunks(_first_encounter_counts, n_simulations,
+                                   pochven.routing, configuration(pochven),
+                                   max_flashpoints, pochven.policy, seed=seed, workers=workers):
+        counts += chunk_counts
+
+    return counts
+
+
+def simulate_encounters(pochven, n_flashpoints: int, n_simulations: int,
+                        seed: Union[None, int, np.random.SeedSequence] = None,
+                        workers: Optional[int] = None) -> int:
+    """
+    Run a batch of simulations and count the runs that meet the camping fleet.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete in each simulation
+        n_simulations: Number of simulations to run
+        seed: Integer seed or SeedSequence (fresh OS entropy if None)
+        workers: Number of worker processes (runs in this process if None or 1)
+
+    Returns:
+        Number of simulations that encountered the camping fleet at least once
+    """
+    return int(first_encounter_histogram(
+        pochven, n_flashpoints, n_simulations, seed, workers).sum())
+
+
+def run_statistics(pochven, n_flashpoints: int, n_simulations: int,
+                   seed: Union[None, int, np.random.SeedSequence] = None,
+                   workers: Optional[int] = None) -> RunStatistics:
+    """
+    Run a batch of simulations and accumulate encounter, camp-pass and transit histograms.
+
+    Everything is collected in the same pass over the same random streams as
+    simulate_encounters, so a given seed gives the same encounter probability.
+    Nothing is kept per run beyond the current chunk.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete in each simulation
+        n_simulations: Number of simulations to run
+        seed: Integer seed or SeedSequence (fresh OS entropy if None)
+        workers: Number of worker processes (runs in this process if None or 1)
+
+    Returns:
+        The RunStatistics of the batch
+    """
+    n_systems = pochven.routing.n_systems
+    first_encounter_counts = np.zeros(n_flashpoints + 1, dtype=np.int64)
+    pass_counts = np.zeros(n_flashpoints + 1, dtype=np.int64)
+    transit_counts = np.zeros(n_systems, dtype=np.int64)
+    visit_counts = np.zeros(n_systems, dtype=np.int64)
+    for first, passes, transit, visits in map_chunks(
+            _run_statistics, n_simulations, pochven.routing, configuration(pochven),
+            n_flashpoints, pochven.policy, seed=seed, workers=workers):
+        first_encounter_counts += first
+        pass_counts += passes
+        transit_counts += transit
+        visit_counts += visits
+
+    return RunStatistics(n_simulations, n_flashpoints, first_encounter_counts,
+                         pass_counts, transit_counts, visit_counts)
@@ -0,0 +1,303 @@
+"""
+Throughput benchmarks for the simulation hot path.
+
+Run as a module:
+
+    python -m benchmark                          # print throughput
+    python -m benchmark --save baseline.json     # record a baseline
+    python -m benchmark --baseline baseline.json # fail on regressions
+    python -m benchmark --oracle-systems 8000    # add distance oracle benchmarks
+
+Every benchmark reports a rate (operations or simulations per second). Against a
+baseline, a benchmark whose rate dropped by more than the threshold fails the run
+with exit code 1.
+
+The distance oracle benchmarks run on a synthetic map of the given size. Besides
+query and simulation rates they report startup times (building and reopening the
+memory-mapped matrix, the first BFS row of the lazy oracle) and memory (the size of
+the distance file and of the lazy oracle's row cache).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+import oracle
+from pochven import Pochven
+
+
+class Benchmark(NamedTuple):
+    """A benchmark: a callable and how many units of work one call performs."""
+    name: str
+    function: Callable[[], object]
+    units_per_call: int
+    unit: str
+
+
+def _measure(benchmark: Benchmark, repeat: int) -> float:
+    # Best rate over several repeats, each long enough to time reliably
+    timer = timeit.Timer(benchmark.function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return benchmark.units_per_call / best
+
+
+def build_benchmarks(quick: bool = False) -> List[Benchmark]:
+    """
+    The benchmark suite.
+
+    Args:
+        quick: Use smaller end-to-end sizes for a fast smoke run
+
+    Returns:
+        A list of benchmarks
+    """
+    pochven = Pochven(camping_system=12, fleet_starting_system=5,
+                      flashpoint_starting_systems=[0, 8, 16])
+
+    # complete_flashpoint mutates its instance, so it gets its own, reset before each
+    # call, and the spawns it draws from the random module are seeded
+    spawning = Pochven(camping_system=12, fleet_starting_system=5,
+                       flashpoint_starting_systems=[0, 8, 16])
+    initial_flashpoints = dict(spawning.flashpoints)
+    random.seed(0)
+
+    def complete_flashpoint():
+        spawning.flashpoints = dict(initial_flashpoints)
+        spawning.complete_flashpoint(next(iter(initial_flashpoints)))
+
+    benchmarks = [
+        Benchmark('find_shortest_path',
+                  lambda: pochven.find_shortest_path(3, 15), 1, 'ops/s'),
+        Benchmark('find_nearest_flashpoint',
+                  lambda: pochven.find_nearest_flashpoint(7), 1, 'ops/s'),
+        Benchmark('complete_flashpoint', complete_flashpoint, 1, 'ops/s'),
+        Benchmark('simulate_flashpoint_runs[n=10]',
+                  lambda: pochven.simulate_flashpoint_runs(10, 100, random.Random(0)),
+                  100, 'sims/s'),
+    ]
+
+    sizes = [1000, 10000] if quick else [1000, 10000, 100000]
+    for n_simulations in sizes:
+        benchmarks.append(Benchmark(
+            f'calculate_encounter_probability[n=10,sims={n_simulations}]',
+            lambda n_simulations=n_simulations: pochven.calculate_encounter_probability(
+                10, n_simulations, seed=0),
+            n_simulations, 'sims/s'))
+
+    return benchmarks
+
+
+def synthetic_map(n_systems: int, window: int = 200, seed: int = 0) -> Dict[int, List[int]]:
+    """
+    A connected random map standing in for a large multi-region graph.
+
+    Every system links to a random system at most window IDs before it, and a
+    quarter as many extra links join nearby IDs. That gives about 1.25 gates per
+    system, like New Eden, and a diameter of about 70 jumps at 8000 systems.
+
+    Args:
+        n_systems: Number of systems
+        window: Largest ID difference between linked systems
+        seed: Seed of the random links
+
+    Returns:
+        Adjacency lists, each sorted by system ID
+    """
+    rng = np.random.default_rng(seed)
+    connections = {system_id: set() for system_id in range(n_systems)}
+
+    def link(a, b):
+        if a != b:
+            connections[a].add(b)
+            connections[b].add(a)
+
+    for system_id in range(1, n_systems):
+        link(system_id, system_id - int(rng.integers(1, min(system_id, window) + 1)))
+    for _ in range(n_systems // 4):
+        system_id = int(rng.integers(n_systems))
+        link(system_id, min(n_systems - 1, system_id + int(rng.integers(1, window))))
+    return {system_id: sorted(links) for system_id, links in connections.items()}
+
+
+def _seconds(function: Callable[[], object]) -> float:
+    t = time.perf_counter()
+    function()
+    return time.perf_counter() - t
+
+
+def oracle_report(n_systems: int, directory: str, cache_rows: int = 4096,
+                  n_simulations: int = 200) -> Dict[str, float]:
+    """
+    Startup time and memory of the distance oracles on a synthetic map.
+
+    Args:
+        n_systems: Number of systems in the synthetic map
+        directory: Directory for the memory-mapped distance file (rebuilt if present)
+        cache_rows: Row cache size of the lazy oracle
+        n_simulations: Runs of 10 flashpoints simulated to fill the lazy cache
+
+    Returns:
+        A dict of measurements, in seconds and bytes
+    """
+    connections = synthetic_map(n_systems)
+    path = os.path.join(directory, f"distances-{oracle.map_fingerprint(connections)}.npy")
+    if os.path.exists(path):
+        os.remove(path)
+
+    report = {'n_systems': n_systems}
+    report['memmap_build_seconds'] = _seconds(
+        lambda: oracle.MemmapDistanceOracle(connections, directory))
+    report['memmap_open_seconds'] = _seconds(
+        lambda: oracle.MemmapDistanceOracle(connections, directory))
+    report['memmap_file_bytes'] = os.path.getsize(path)
+
+    lazy = oracle.LazyDistanceOracle(connections, cache_rows)
+    report['lazy_init_seconds'] = _seconds(
+        lambda: oracle.LazyDistanceOracle(connections, cache_rows))
+    report['lazy_row_seconds'] = _seconds(lambda: lazy.distance_row(n_systems // 2))
+
+    pochven = Pochven(camping_system=n_systems // 2, distance_oracle=lazy)
+    report['lazy_simulation_seconds'] = _seconds(
+        lambda: pochven.simulate_flashpoint_runs(10, n_simulations, random.Random(0)))
+    report['lazy_cache_bytes'] = lazy.cache_bytes
+    report['lazy_hit_rate'] = lazy.hits / (lazy.hits + lazy.misses)
+
+    for name, value in report.items():
+        print(f"{name:<55} {value:>16,.6g}")
+    return report
+
+
+def oracle_benchmarks(n_systems: int, directory: str) -> List[Benchmark]:
+    """
+    Query and simulation rates of a memory-mapped distance oracle on a synthetic map.
+
+    Args:
+        n_systems: Number of systems in the synthetic map
+        directory: Directory for the memory-mapped distance file
+
+    Returns:
+        A list of benchmarks
+    """
+    distance_oracle = oracle.MemmapDistanceOracle(synthetic_map(n_systems), directory)
+    pochven = Pochven(camping_system=n_systems // 2, fleet_starting_system=0,
+                      flashpoint_starting_systems=[n_systems // 4, n_systems // 3, n_systems - 1],
+                      distance_oracle=distance_oracle)
+    far = n_systems - 1
+    return [
+        Benchmark(f'oracle_find_shortest_path[n={n_systems}]',
+                  lambda: pochven.find_shortest_path(0, far), 1, 'ops/s'),
+        Benchmark(f'oracle_find_nearest_flashpoint[n={n_systems}]',
+                  lambda: pochven.find_nearest_flashpoint(7), 1, 'ops/s'),
+        Benchmark(f'oracle_path_passes_camping_system[n={n_systems}]',
+                  lambda: pochven.path_passes_camping_system(0, far), 1, 'ops/s'),
+        Benchmark(f'oracle_simulate_flashpoint_runs[n={n_systems}]',
+                  lambda: pochven.simulate_flashpoint_runs(10, 100, random.Random(0)),
+                  100, 'sims/s'),
+    ]
+
+
+def run_benchmarks(benchmarks: List[Benchmark], repeat: int = 5) -> Dict[str, Dict[str, object]]:
+    """
+    Measure every benchmark.
+
+    Returns:
+        A dict mapping benchmark names to {"rate": ..., "unit": ...}
+    """
+    results = {}
+    for benchmark in benchmarks:
+        rate = _measure(benchmark, repeat)
+        results[benchmark.name] = {'rate': rate, 'unit': benchmark.unit}
+        print(f"{benchmark.name:<55} {rate:>16,.0f} {benchmark.unit}")
+    return results
+
+
+def find_regressions(results: Dict[str, Dict[str, object]], baseline: Dict[str, Dict[str, object]],
+                     threshold: float) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: Results from run_benchmarks
+        baseline: Results loaded from a saved baseline
+        threshold: Largest acceptable relative drop in rate, e.g. 0.2 for 20%
+
+    Returns:
+        A description of every benchmark that regressed beyond the threshold
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result['rate'] / baseline[name]['rate'] - 1
+        if change < -threshold:
+            regressions.append(
+                f"{name}: {baseline[name]['rate']:,.0f} -> {result['rate']:,.0f} "
+                f"{result['unit']} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Throughput benchmarks for the Pochven simulation hot path')
+    parser.add_argument('--save', metavar='PATH', default=None,
+                        help='Save the results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='PATH', default=None,
+                        help='Compare against a JSON baseline and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Largest acceptable relative throughput drop (default: 0.2)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of timing repeats per benchmark (default: 5)')
+    parser.add_argument('--quick', action='store_true',
+                        help='Skip the largest end-to-end size')
+    parser.add_argument('--oracle-systems', type=int, metavar='N', default=None,
+                        help='Also benchmark the distance oracles on a synthetic map of N systems')
+    parser.add_argument('--oracle-dir', metavar='DIR', default=None,
+                        help='Directory for the memory-mapped distance file (default: a temporary directory)')
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks(args.quick)
+    report: Optional[Dict[str, float]] = None
+    if args.oracle_systems is not None:
+        directory = args.oracle_dir or tempfile.mkdtemp(prefix='pochven-oracle-')
+        report = oracle_report(args.oracle_systems, directory)
+        print()
+        benchmarks += oracle_benchmarks(args.oracle_systems, directory)
+
+    results = run_benchmarks(benchmarks, args.repeat)
+
+    if args.save is not None:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'benchmarks': results,
+                'oracle': report,
+            }, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['benchmarks']
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nThroughput regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Persistent on-disk cache for simulation and exact-solver results.
+
+Results are stored in a local SQLite file under a content-addressed key: a hash of
+the model version, the map and the configuration. The cache is size-bounded and
+evicts the least recently used entries first. Bumping batch.MODEL_VERSION, or
+changing the map, gives every configuration a new key, so stale entries are never
+returned and age out through eviction.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+
+import numpy as np
+
+import batch
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'pochven_math', 'results.sqlite')
+
+# Seed column value for unseeded runs (SQLite treats NULLs as distinct in keys)
+_UNSEEDED = -1
+
+
+def configuration_key(pochven, kind: str, n_flashpoints: Optional[int] = None) -> str:
+    """
+    Content-addressed key of a Pochven configuration.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        kind: Which kind of result the key is for
+        n_flashpoints: Number of flashpoints, for results that depend on it
+
+    Returns:
+        Hex digest identifying the model version, map and configuration
+    """
+    camp_mask, fleet_starting_system, flashpoints = batch.configuration(pochven)
+    map_digest = hashlib.sha256(pochven.routing.indptr.tobytes() +
+                                pochven.routing.indices.tobytes()).hexdigest()
+    fields = {
+        'kind': kind,
+        'model_version': batch.MODEL_VERSION,
+        'map': map_digest,
+        'camp_mask': int(camp_mask),
+        'fleet_starting_system': int(fleet_starting_system),
+        'flashpoints': [int(f) for f in flashpoints],
+        'n_flashpoints': n_flashpoints,
+    }
+    # Only non-default policies enter the key, so existing entries keep theirs
+    if pochven.policy is not None:
+        fields['policy'] = repr(pochven.policy)
+    payload = json.dumps(fields, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of results, backed by a SQLite file.
+
+    Simulation results are keyed by configuration and number of flashpoints. A request
+    without a seed is answered by any stored run with at least as many simulations,
+    since a larger run is a more precise estimate of the same probability. A seeded
+    request is only answered by a run with the same seed and simulation count, so
+    it returns exactly what the simulator would.
+
+    Exact curves are keyed by configuration alone; a stored curve answers any request
+    up to its length.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 64 * 1024 * 1024):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT NOT NULL,
+                n_simulations INTEGER NOT NULL,
+                seed INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (key, n_simulations, seed)
+            )""")
+        self._connection.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get(self, key: str, n_simulations: int, seed: Optional[int]) -> Optional[str]:
+        if seed is None:
+            row = self._connection.execute(
+                "SELECT n_simulations, seed, value FROM results "
+                "WHERE key = ? AND n_simulations >= ? ORDER BY n_simulations DESC LIMIT 1",
+                (key, n_simulations)).fetchone()
+        else:
+            row = self._connection.execute(
+                "SELECT n_simulations, seed, value FROM results "
+                "WHERE key = ? AND n_simulations = ? AND seed = ?",
+                (key, n_simulations, seed)).fetchone()
+        if row is None:
+            return None
+
+        self._connection.execute(
+            "UPDATE results SET last_access = ? WHERE key = ? AND n_simulations = ? AND seed = ?",
+            (time.time(), key, row[0], row[1]))
+        self._connection.commit()
+        return row[2]
+
+    def _put(self, key: str, n_simulations: int, seed: Optional[int], value: str) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (key, n_simulations, _UNSEEDED if seed is None else seed, value, time.time()))
+        self._evict()
+        self._connection.commit()
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until the stored values fit the budget
+        total = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._connection.execute(
+            "SELECT rowid, LENGTH(value) FROM results ORDER BY last_access").fetchall()
+        evicted = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((rowid,))
+            total -= size
+        self._connection.executemany("DELETE FROM results WHERE rowid = ?", evicted)
+
+    def size(self) -> int:
+        """Total size in bytes of the stored values."""
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM results").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._connection.execute("DELETE FROM results")
+        self._connection.commit()
+
+    def encounter_probability(self, pochven, n_flashpoints: int, n_simulations: int = 1000,
+                              workers: Optional[int] = None, seed: Optional[int] = None) -> float:
+        """
+        Cached Pochven.calculate_encounter_probability.
+
+        Args:
+            pochven: The Pochven instance describing the configuration
+            n_flashpoints: Number of flashpoints to complete
+            n_simulations: Number of simulations to run
+            workers: Number of worker processes to split the simulations over
+            seed: Seed for reproducible results (fresh entropy if omitted)
+
+        Returns:
+            Probability of encountering the camping fleet at least once
+        """
+        key = configuration_key(pochven, 'simulation', n_flashpoints)
+        cached = self._get(key, n_simulations, seed)
+        if cached is not None:
+            return json.loads(cached)
+
+        probability = pochven.calculate_encounter_probability(
+            n_flashpoints, n_simulations, workers=workers, seed=seed)
+        self._put(key, n_simulations, seed, json.dumps(probability))
+        return probability
+
+    def analytical_curve(self, pochven, max_flashpoints: int) -> np.ndarray:
+        """
+        Cached Pochven.calculate_analytical_curve.
+
+        Args:
+            pochven: The Pochven instance describing the configuration
+            max_flashpoints: Largest number of flashpoints to evaluate
+
+        Returns:
+            Array of length max_flashpoints + 1 where entry n is the exact probability
+            of encountering the camping fleet at least once after n flashpoints
+        """
+        # The curve's length plays the role of the simulation count
+        key = configuration_key(pochven, 'analytical')
+        cached = self._get(key, max_flashpoints + 1, None)
+        if cached is not None:
+            return np.array(json.loads(cached)[:max_flashpoints + 1])
+
+        curve = pochven.calculate_analytical_curve(max_flashpoints)
+        self._put(key, max_flashpoints + 1, None, json.dumps(curve.tolist()))
+        return curve
+
+    def analytical_probability(self, pochven, n_flashpoints: int) -> float:
+        """Cached Pochven.calculate_analytical_probability."""
+        return float(self.analytical_curve(pochven, n_flashpoints)[n_flashpoints])
@@ -1,8 +1,12 @@
 from pochven import Pochven
-import matplotlib.pyplot as plt
+from cache import ResultCache
+import policies
+import scenarios
 import numpy as np
 import random
 import argparse
+import os
+import sys
 
 
 def main():
@@ -10,8 +14,8 @@ def main():
     parser = argparse.ArgumentParser(
         description='Pochven Flashpoint Fleet Encounter Probability Calculator')
 
-    parser.add_argument('--camping-system', type=int, default=None,
-                        help='System ID to camp in (0-23). At least two of --camping-system, --flashpoint-systems, and --fleet-starting-system must be specified together.')
+    parser.add_argument('--camping-system', type=int, nargs='+', default=None,
+                        help='System ID to camp in (0-23), or several IDs for multiple camps. At least two of --camping-system, --flashpoint-systems, and --fleet-starting-system must be specified together.')
 
     parser.add_argument('--flashpoint-systems', type=int, nargs=3, default=None,
                         help='Three system IDs (0-23) where flashpoints start. At least two of --camping-system, --flashpoint-systems, and --fleet-starting-system must be specified together.')
@@ -37,8 +41,61 @@ def main():
     parser.add_argument('--fleet-starting-system', type=int, default=None,
                         help='System ID where the flashpoint fleet starts (0-23). At least two of --camping-system, --flashpoint-systems, and --fleet-starting-system must be specified together.')
 
+    parser.add_argument('--include-home-systems', action='store_true',
+                        help='Add the three krai home systems (24-26) to the map')
+
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes to run the simulations on (default: 1)')
+
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed for reproducible simulation results')
+
+    parser.add_argument('--target-half-width', type=float, default=None,
+                        help='Simulate until the 95%% confidence interval half-width is at most this, instead of a fixed --n-simulations')
+
+    parser.add_argument('--cache', metavar='PATH', default=None,
+                        help='Reuse results stored in this cache file, and store new ones in it')
+
+    parser.add_argument('--place-camps', type=int, metavar='K', default=None,
+                        help='Find the best placement of K camps for the given fleet start and flashpoints, instead of evaluating --camping-system')
+
+    parser.add_argument('--output-dir', metavar='DIR', default=None,
+                        help='Save figures as PNG files in this directory instead of showing them')
+
+    parser.add_argument('--policy', choices=['nearest', 'camp-avoiding', 'lookahead'], default='nearest',
+                        help='How the fleet picks its next flashpoint (default: nearest)')
+
+    parser.add_argument('--lookahead-depth', type=int, default=2,
+                        help='Number of flashpoints the lookahead policy plans ahead (default: 2)')
+
+    parser.add_argument('--animate', metavar='PATH', default=None,
+                        help='Animate one simulated run of --n-flashpoints steps to this .gif file, or to PNG frames in this directory')
+
+    parser.add_argument('--batch', metavar='PATH', default=None,
+                        help='Evaluate every scenario in this JSONL or CSV file (- for stdin) and write one JSON result line per scenario; the other options give the defaults for fields a scenario leaves out')
+
+    parser.add_argument('--batch-format', choices=scenarios.FORMATS, default=None,
+                        help='Format of the --batch input (default: csv for .csv files, jsonl otherwise)')
+
+    parser.add_argument('--batch-output', metavar='PATH', default=None,
+                        help='Write the --batch results to this file instead of stdout')
+
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='Most --batch scenarios queued on the workers at once (default: 4 per worker)')
+
     args = parser.parse_args()
 
+    if args.batch is not None:
+        run_batch(args)
+        return
+
+    # Figures are written to files when an output directory is given
+    def output_path(name):
+        if args.output_dir is None:
+            return None
+        os.makedirs(args.output_dir, exist_ok=True)
+        return os.path.join(args.output_dir, name)
+
     # Validate that at least two of the three parameters are specified
     specified_params = sum([
         args.camping_system is not None,
@@ -46,28 +103,47 @@ def main():
         args.fleet_starting_system is not None
     ])
 
-    if specified_params == 1:
+    if specified_params == 1 and args.place_camps is None:
         parser.error(
             "At least two of --camping-system, --flashpoint-systems, and --fleet-starting-system must be specified together")
 
+    # The fleet's routing policy
+    if args.lookahead_depth < 1:
+        parser.error("--lookahead-depth must be at least 1")
+    policy = {
+        'nearest': None,
+        'camp-avoiding': policies.CampAvoidingPolicy(),
+        'lookahead': policies.LookaheadPolicy(depth=args.lookahead_depth),
+    }[args.policy]
+
     # Create a Pochven instance with the specified parameters
     pochven = Pochven(
-        camping_system=args.camping_system,
+        include_home_systems=args.include_home_systems,
+        camping_system=args.camping_system[0] if args.camping_system is not None and len(
+            args.camping_system) == 1 else None,
+        camping_systems=args.camping_system if args.camping_system is not None and len(
+            args.camping_system) > 1 else None,
         flashpoint_starting_systems=args.flashpoint_systems,
-        fleet_starting_system=args.fleet_starting_system
+        fleet_starting_system=args.fleet_starting_system,
+        policy=policy
     )
 
     # Print initial state
     print("Initial state:")
-    print(f"Camping system: {pochven.camping_system}")
+    if len(pochven.camping_systems) > 1:
+        print(f"Camping systems: {sorted(pochven.camping_systems)}")
+    else:
+        print(f"Camping system: {pochven.camping_system}")
     print(f"Flashpoints: {pochven.flashpoints}")
     if pochven.fleet_starting_system is not None:
         print(f"Fleet starting system: {pochven.fleet_starting_system}")
+    if pochven.policy is not None:
+        print(f"Fleet policy: {pochven.policy}")
 
     # Visualize the initial state if requested
     if args.visualize:
         print("\nVisualizing Pochven constellation...")
-        pochven.visualize_pochven()
+        pochven.visualize_pochven(output_path=output_path('pochven.png'))
 
     # Visualize a sample path if requested
     if args.visualize_path:
@@ -84,13 +160,48 @@ def main():
 
         print("\nVisualizing the path...")
         pochven.visualize_pochven(
-            show_path=True, start_system=start_system, end_system=end_system)
+            show_path=True, start_system=start_system, end_system=end_system,
+            output_path=output_path('path.png'))
+
+    # Animate a simulated run if requested
+    if args.animate is not None:
+        records = np.concatenate(list(pochven.iter_trajectories(
+            args.n_flashpoints, seed=args.seed)))
+        n_frames = pochven.animate_trajectory(records, args.animate)
+        print(f"\nAnimated {n_frames} flashpoint steps to {args.animate}")
+
+    # Optimize camp placement if requested
+    if args.place_camps is not None:
+        best = pochven.optimize_camp_placement(
+            args.place_camps, args.n_flashpoints, args.n_simulations, seed=args.seed, workers=args.workers)
+        print(
+            f"\nBest placement of {args.place_camps} camps for {args.n_flashpoints} flashpoints (with {args.n_simulations} simulations):")
+        print(f"  Camping systems: {list(best.camping_systems)}")
+        print(f"  Simulation probability: {best.probability:.4f}")
+        return
+
+    # Estimate to a target precision if requested
+    if args.target_half_width is not None:
+        estimate = pochven.estimate_encounter_probability(
+            args.n_flashpoints, args.target_half_width, seed=args.seed, workers=args.workers)
+        print(
+            f"\nProbability of encounter after {args.n_flashpoints} flashpoints (with {estimate.n_simulations} simulations):")
+        print(
+            f"  Simulation probability: {estimate.probability:.4f} (95% CI {estimate.lower:.4f} - {estimate.upper:.4f})")
+        return
 
     # Calculate probability for the specified number of flashpoints
-    sim_prob = pochven.calculate_encounter_probability(
-        args.n_flashpoints, args.n_simulations)
-    analytical_prob = pochven.calculate_analytical_probability(
-        args.n_flashpoints)
+    if args.cache is not None:
+        with ResultCache(args.cache) as cache:
+            sim_prob = cache.encounter_probability(
+                pochven, args.n_flashpoints, args.n_simulations, workers=args.workers, seed=args.seed)
+            analytical_prob = cache.analytical_probability(
+                pochven, args.n_flashpoints)
+    else:
+        sim_prob = pochven.calculate_encounter_probability(
+            args.n_flashpoints, args.n_simulations, workers=args.workers, seed=args.seed)
+        analytical_prob = pochven.calculate_analytical_probability(
+            args.n_flashpoints)
 
     print(
         f"\nProbability of encounter after {args.n_flashpoints} flashpoints (with {args.n_simulations} simulations):")
@@ -101,7 +212,41 @@ def main():
     if args.plot_curve:
         print("\nPlotting probability curve...")
         pochven.plot_probability_curve(
-            max_flashpoints=args.max_flashpoints, n_simulations=args.n_simulations)
+            max_flashpoints=args.max_flashpoints, n_simulations=args.n_simulations,
+            output_path=output_path('probability_curve.png'))
+
+
+def run_batch(args):
+    """Evaluate the scenarios in args.batch, streaming one JSON result line per scenario."""
+    batch_format = args.batch_format or (
+        'csv' if args.batch.lower().endswith('.csv') else 'jsonl')
+
+    # Command line options fill in the fields a scenario leaves out
+    defaults = {
+        'camping_system': args.camping_system,
+        'flashpoint_systems': args.flashpoint_systems,
+        'fleet_starting_system': args.fleet_starting_system,
+        'include_home_systems': args.include_home_systems,
+        'n_flashpoints': args.n_flashpoints,
+        'n_simulations': args.n_simulations,
+        'seed': args.seed,
+        'policy': args.policy,
+        'lookahead_depth': args.lookahead_depth,
+    }
+    defaults = {name: value for name, value in defaults.items() if value is not None}
+
+    input_stream = sys.stdin if args.batch == '-' else open(args.batch, newline='')
+    output_stream = sys.stdout if args.batch_output is None else open(args.batch_output, 'w')
+    try:
+        n_results, n_errors, seconds = scenarios.run_batch(
+            input_stream, output_stream, batch_format, defaults, args.workers, args.max_in_flight)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+    print(f"Evaluated {n_results} scenarios ({n_errors} failed) in {seconds:.1f}s",
+          file=sys.stderr)
 
 
 def run_example_simulation():
@@ -0,0 +1,505 @@
+"""
+Exact Markov-chain solver for the encounter probability.
+
+Between flashpoint completions the simulation is fully described by the fleet's
+system and the two flashpoints it did not just take, kept in dict order because
+that order breaks ties in find_nearest_flashpoint. Each completion spawns a new
+flashpoint uniformly at random, so the chain over (fleet system, first remaining
+flashpoint, second remaining flashpoint) plus an absorbing "encountered" state
+gives the exact probability of meeting the camp for every number of flashpoints.
+
+Camps related by a symmetry of the map (a rotation of the ring, for instance) have
+isomorphic chains, so every configuration is re-expressed relative to a canonical
+camp and one chain serves the whole symmetry class. This only saves chains, not
+states: a rotation that fixes the camp is the identity, so the chain of one camp
+keeps all n_systems**3 states, and the curve and first-encounter distribution
+cost one sparse matrix-vector product per flashpoint. Beyond the curve, the chain
+gives the expected number of flashpoints until the first encounter and the
+stationary distribution of the fleet's system from linear solves. These use
+scipy.sparse when it is installed and plain NumPy iteration otherwise.
+"""
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from batch import path_hits
+from policies import Policy, policy_table, resolve
+from routing import RoutingTable, order_preserving_symmetries, system_mask
+
+# Relative tolerance of the linear solves
+SOLVE_TOLERANCE = 1e-12
+
+# Iteration limit of the NumPy fallback solvers
+_MAX_ITERATIONS = 100000
+
+
+def _state_index(n_systems, fleet_system, first, second):
+    return (fleet_system * n_systems + first) * n_systems + second
+
+
+@lru_cache(maxsize=None)
+def _sparse():
+    # scipy.sparse and its linalg submodule if scipy is installed, else None
+    try:
+        import scipy.sparse
+        import scipy.sparse.linalg
+    except ImportError:
+        return None
+    return scipy.sparse
+
+
+class EncounterChain:
+    """
+    Transition structure of the flashpoint chain for a set of camping systems and a
+    routing policy (None for the nearest flashpoint).
+
+    Only the transitions that avoid the camp are stored; the probability mass
+    that disappears from the chain at each step is the mass absorbed by the
+    "encountered" state.
+    """
+
+    def __init__(self, routing: RoutingTable, camp_mask: int, policy: Optional[Policy] = None):
+        self.camp_mask = camp_mask
+        self.policy = policy
+        self.n_systems = n_systems = routing.n_systems
+        self.n_states = n_systems ** 3
+
+        # Enumerate every (state, spawned system) pair at once
+        fleet_system, first, second, spawned = np.meshgrid(
+            *(np.arange(n_systems),) * 4, indexing='ij')
+        fleet_system, first, second, spawned = (
+            a.ravel() for a in (fleet_system, first, second, spawned))
+
+        candidates = np.column_stack((first, second, spawned))
+        slot = policy_table(resolve(policy), routing, camp_mask)[fleet_system, first, second, spawned]
+        target = candidates[np.arange(len(slot)), slot]
+        hit = path_hits(routing.path_mask, fleet_system, target, np.uint64(camp_mask))
+
+        # The flashpoints left behind after moving to the target, in dict order
+        remaining_first = np.where(slot == 0, second, first)
+        remaining_second = np.where(slot == 2, second, spawned)
+
+        source = _state_index(n_systems, fleet_system, first, second)
+        destination = _state_index(
+            n_systems, target, remaining_first, remaining_second)
+
+        self._source = source[~hit]
+        self._destination = destination[~hit]
+        self._matrix = None
+        self._forward = None
+        self._hitting_times = None
+
+    def transition_matrix(self):
+        """
+        The transient part of the transition matrix as a scipy.sparse CSR matrix,
+        with entry [s, d] the probability of moving from state s to state d without
+        meeting a camp. Built once; requires scipy.
+        """
+        if self._matrix is None:
+            sparse = _sparse()
+            if sparse is None:
+                raise ImportError("transition_matrix requires scipy")
+            weights = np.full(len(self._source), 1.0 / self.n_systems)
+            self._matrix = sparse.csr_matrix(
+                (weights, (self._source, self._destination)), shape=(self.n_states,) * 2)
+        return self._matrix
+
+    def step(self, distribution: np.ndarray) -> np.ndarray:
+        """
+        Advance a (sub-stochastic) state distribution by one flashpoint completion.
+
+        Args:
+            distribution: Probability mass over the n_states transient states
+
+        Returns:
+            The mass that is still un-encountered after one more flashpoint
+        """
+        if _sparse() is not None:
+            if self._forward is None:
+                self._forward = self.transition_matrix().T.tocsr()
+            return self._forward @ distribution
+        return np.bincount(self._destination, weights=distribution[self._source],
+                           minlength=self.n_states) / self.n_systems
+
+    def _expect(self, values: np.ndarray) -> np.ndarray:
+        # Expected value of values[state] one flashpoint later, per starting state,
+        # counting encounters as 0
+        return np.bincount(self._source, weights=values[self._destination],
+                           minlength=self.n_states) / self.n_systems
+
+    def hitting_times(self) -> np.ndarray:
+        """
+        Expected number of flashpoints until the first encounter, from every state.
+
+        Solves (I - Q) h = 1 for the transient transition matrix Q once and keeps the
+        result, so later queries only take a dot product with a starting distribution.
+
+        Returns:
+            Array over the n_states transient states
+
+        Raises:
+            ValueError: If some state never meets a camp, so its expectation is infinite
+        """
+        if self._hitting_times is not None:
+            return self._hitting_times
+        if self.camp_mask == 0:
+            raise ValueError("The expected time to an encounter needs at least one camp")
+
+        ones = np.ones(self.n_states)
+        sparse = _sparse()
+        if sparse is not None:
+            system = sparse.identity(self.n_states, format='csr') - self.transition_matrix()
+            times, info = sparse.linalg.bicgstab(system, ones, rtol=SOLVE_TOLERANCE)
+            if info != 0:
+                raise ValueError("The expected time to an encounter did not converge")
+        else:
+            # h = 1 + Q h, summed term by term; the terms are the survival
+            # probabilities after each flashpoint, which decay geometrically
+            times = np.zeros(self.n_states)
+            term = ones
+            for _ in range(_MAX_ITERATIONS):
+                times += term
+                if term.max() <= SOLVE_TOLERANCE * times.max():
+                    break
+                term = self._expect(term)
+            else:
+                raise ValueError("The expected time to an encounter did not converge")
+
+        self._hitting_times = times
+        return times
+
+    def survival_curve(self, initial: np.ndarray, max_flashpoints: int) -> np.ndarray:
+        """
+        Probability of not having met the camp after each number of flashpoints.
+
+        Args:
+            initial: Starting distribution over the transient states
+            max_flashpoints: Largest number of flashpoints to evaluate
+
+        Returns:
+            Array of length max_flashpoints + 1, indexed by the number of flashpoints
+        """
+        survival = np.empty(max_flashpoints + 1)
+        distribution = initial
+        survival[0] = distribution.sum()
+        for n in range(1, max_flashpoints + 1):
+            distribution = self.step(distribution)
+            survival[n] = distribution.sum()
+        return survival
+
+
+@lru_cache(maxsize=None)
+def encounter_chain(routing: RoutingTable, camp_mask: int,
+                    policy: Optional[Policy] = None) -> EncounterChain:
+    """Build (once) the chain for a map, camp bitmask and routing policy."""
+    return EncounterChain(routing, camp_mask, policy)
+
+
+def _state_permutation(n_systems: int, perm: np.ndarray) -> np.ndarray:
+    # Image of every chain state under a permutation of the systems
+    fleet_system, first, second = np.unravel_index(np.arange(n_systems ** 3), (n_systems,) * 3)
+    return _state_index(n_systems, perm[fleet_system], perm[first], perm[second])
+
+
+@lru_cache(maxsize=None)
+def _canonical_frame(routing: RoutingTable, camp_mask: int,
+                     symmetric: bool = True) -> Tuple[int, np.ndarray]:
+    # The smallest image of camp_mask under the symmetries of the map, and the
+    # matching permutation of the chain states; the identity when the routing
+    # policy doesn't commute with the symmetries
+    if not symmetric:
+        return camp_mask, np.arange(routing.n_systems ** 3)
+    camps = [c for c in range(routing.n_systems) if camp_mask >> c & 1]
+    canonical, perm = min(((system_mask(int(p) for p in perm[camps]), perm)
+                           for perm in order_preserving_symmetries(routing)),
+                          key=lambda image: image[0])
+    return canonical, _state_permutation(routing.n_systems, perm)
+
+
+def relative_chains(routing: RoutingTable, camp_masks: Sequence[int],
+                    initial: Union[np.ndarray, Callable[[int], np.ndarray]],
+                    policy: Optional[Policy] = None) -> List[Tuple[EncounterChain, np.ndarray]]:
+    """
+    Re-express an average over camp placements relative to canonical camps.
+
+    Each camp mask is mapped by a symmetry of the map onto the smallest of its
+    images, and the starting distribution is carried along. Every statistic here is
+    linear in the starting distribution, so camps that share a canonical image share
+    one chain and their distributions are summed: averaging over a uniformly random
+    camp on the ring needs a single chain rather than one per system.
+
+    Args:
+        routing: Routing table of the map
+        camp_masks: Camp bitmasks to average over with equal weight
+        initial: Starting distribution over the chain states, or a function of the
+            camp mask returning it (when the first move depends on the camps)
+        policy: Routing policy of the fleet (None for the nearest flashpoint)
+
+    Returns:
+        A list of (chain, starting distribution) pairs whose statistics add up to
+        the average over camp_masks
+    """
+    relative: Dict[int, np.ndarray] = {}
+    symmetric = policy is None or policy.symmetric
+    for camp_mask in camp_masks:
+        canonical, state_perm = _canonical_frame(routing, camp_mask, symmetric)
+        start = initial(camp_mask) if callable(initial) else initial
+        distribution = np.empty_like(start)
+        distribution[state_perm] = start / len(camp_masks)
+        if canonical in relative:
+            relative[canonical] += distribution
+        else:
+            relative[canonical] = distribution
+    return [(encounter_chain(routing, camp_mask, policy), distribution)
+            for camp_mask, distribution in relative.items()]
+
+
+def initial_distribution(routing: RoutingTable, flashpoints: Optional[Sequence[int]] = None,
+                         fleet_starting_system: Optional[int] = None,
+                         policy: Optional[Policy] = None, camp_mask: int = 0) -> np.ndarray:
+    """
+    Distribution over chain states right before the first flashpoint is completed.
+
+    Args:
+        routing: Routing table of the map
+        flashpoints: The three starting flashpoint systems in dict order, or None
+            for uniformly random flashpoints
+        fleet_starting_system: The fleet's starting system, or None to start at a
+            uniformly random flashpoint
+        policy: Routing policy choosing the first flashpoint (None for the nearest)
+        camp_mask: Camps known to a camp-aware policy
+
+    Returns:
+        Probability vector over the chain's transient states
+    """
+    n_systems = routing.n_systems
+    n_states = n_systems ** 3
+
+    if flashpoints is not None:
+        triples = np.array([flashpoints])
+    else:
+        triples = np.stack(np.meshgrid(
+            *(np.arange(n_systems),) * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    weight = 1.0 / len(triples)
+
+    if fleet_starting_system is not None:
+        table = policy_table(resolve(policy), routing, camp_mask)
+        slots = [table[fleet_starting_system, triples[:, 0], triples[:, 1], triples[:, 2]]]
+        weight_per_slot = weight
+    else:
+        slots = [np.full(len(triples), slot) for slot in range(3)]
+        weight_per_slot = weight / 3
+
+    distribution = np.zeros(n_states)
+    survivors = np.array([[1, 2], [0, 2], [0, 1]])
+    rows = np.arange(len(triples))
+    for slot in slots:
+        kept = triples[rows[:, None], survivors[slot]]
+        index = _state_index(
+            n_systems, triples[rows, slot], kept[:, 0], kept[:, 1])
+        distribution += np.bincount(index, minlength=n_states) * weight_per_slot
+
+    return distribution
+
+
+def _camp_masks(routing: RoutingTable,
+                camping_system: Union[None, int, Iterable[int]]) -> List[int]:
+    # The camp bitmasks to average over
+    if camping_system is None:
+        return [1 << camp for camp in range(routing.n_systems)]
+    if isinstance(camping_system, (int, np.integer)):
+        return [1 << int(camping_system)]
+    return [system_mask(camping_system)]
+
+
+def _start(routing: RoutingTable, camping_system: Union[None, int, Iterable[int]],
+           flashpoints: Optional[Sequence[int]], fleet_starting_system: Optional[int],
+           policy: Optional[Policy]) -> List[Tuple[EncounterChain, np.ndarray]]:
+    # The (chain, starting distribution) pairs of a configuration
+    if fleet_starting_system is not None and policy is not None and policy.camp_aware:
+        # The first move depends on the camps, and so does the starting distribution
+        def initial(camp_mask):
+            return initial_distribution(routing, flashpoints, fleet_starting_system,
+                                        policy, camp_mask)
+    else:
+        initial = initial_distribution(routing, flashpoints, fleet_starting_system, policy)
+    return relative_chains(routing, _camp_masks(routing, camping_system), initial, policy)
+
+
+def encounter_curve(routing: RoutingTable, camping_system: Union[None, int, Iterable[int]],
+                    flashpoints: Optional[Sequence[int]], fleet_starting_system: Optional[int],
+                    max_flashpoints: int, policy: Optional[Policy] = None) -> np.ndarray:
+    """
+    Exact probability of encountering the camp for every number of flashpoints.
+
+    Args:
+        routing: Routing table of the map
+        camping_system: The camping system, a collection of camping systems, or
+            None to average over a uniformly random single camp
+        flashpoints: The three starting flashpoint systems in dict order, or None
+            for uniformly random flashpoints
+        fleet_starting_system: The fleet's starting system, or None to start at a
+            uniformly random flashpoint
+        max_flashpoints: Largest number of flashpoints to evaluate
+        policy: Routing policy of the fleet (None for the nearest flashpoint)
+
+    Returns:
+        Array of length max_flashpoints + 1 where entry n is the probability of
+        encountering the camping fleet at least once in n flashpoints
+    """
+    survival = sum(chain.survival_curve(distribution, max_flashpoints)
+                   for chain, distribution in _start(
+                       routing, camping_system, flashpoints, fleet_starting_system, policy))
+    return 1.0 - survival
+
+
+def first_encounter_distribution(routing: RoutingTable,
+                                 camping_system: Union[None, int, Iterable[int]],
+                                 flashpoints: Optional[Sequence[int]],
+                                 fleet_starting_system: Optional[int],
+                                 max_flashpoints: int,
+                                 policy: Optional[Policy] = None) -> np.ndarray:
+    """
+    Exact distribution of the number of flashpoints until the first encounter.
+
+    Takes the same arguments as encounter_curve.
+
+    Returns:
+        Array of length max_flashpoints + 1 where entry n is the probability that the
+        first encounter happens on the route to the n-th flashpoint. The remaining
+        mass, 1 - sum, is the probability of no encounter within max_flashpoints.
+    """
+    curve = encounter_curve(routing, camping_system, flashpoints, fleet_starting_system,
+                            max_flashpoints, policy)
+    # Differences of nearly equal survival probabilities can round below zero
+    return np.maximum(np.diff(curve, prepend=0.0), 0.0)
+
+
+def expected_flashpoints(routing: RoutingTable, camping_system: Union[None, int, Iterable[int]],
+                         flashpoints: Optional[Sequence[int]],
+                         fleet_starting_system: Optional[int],
+                         policy: Optional[Policy] = None) -> float:
+    """
+    Exact expected number of flashpoints until the first encounter.
+
+    Takes the same arguments as encounter_curve, without a horizon: the expectation
+    covers runs of any length. Each chain's hitting times are solved for once, so
+    repeated queries only cost a dot product.
+
+    Returns:
+        The expected number of flashpoints completed up to and including the one
+        whose route first meets a camp
+    """
+    return float(sum(distribution.dot(chain.hitting_times())
+                     for chain, distribution in _start(
+                         routing, camping_system, flashpoints, fleet_starting_system, policy)))
+
+
+@lru_cache(maxsize=None)
+def stationary_distribution(routing: RoutingTable, policy: Optional[Policy] = None) -> np.ndarray:
+    """
+    Long-run distribution of the fleet's system, ignoring camps.
+
+    The share of flashpoint completions in each system as the number of flashpoints
+    grows, whatever the starting configuration. Solves pi = pi P over the chain
+    states of the camp-free chain, then sums out the flashpoints.
+
+    Args:
+        routing: Routing table of the map
+        policy: Routing policy of the fleet (None for the nearest flashpoint); a
+            camp-aware policy behaves as if there were no camps
+
+    Returns:
+        Probability vector over the systems
+    """
+    chain = encounter_chain(routing, 0, policy)
+    n_states = chain.n_states
+    uniform = np.full(n_states, 1.0 / n_states)
+
+    sparse = _sparse()
+    if sparse is not None:
+        # pi (I - P) = 0 is singular; adding the rank-one term 1 sum(pi) / n fixes the
+        # normalization and leaves a system whose unique solution is pi
+        def matvec(x):
+            return x - chain.step(x) + x.sum() / n_states
+
+        system = sparse.linalg.LinearOperator((n_states, n_states), matvec=matvec)
+        stationary, info = sparse.linalg.bicgstab(system, uniform, x0=uniform,
+                                                  rtol=SOLVE_TOLERANCE)
+        if info != 0:
+            raise ValueError("The stationary distribution did not converge")
+    else:
+        # Power iteration; a uniform spawn each step makes the chain mix quickly
+        stationary = uniform
+        for _ in range(_MAX_ITERATIONS):
+            following = chain.step(stationary)
+            if np.abs(following - stationary).max() <= SOLVE_TOLERANCE * following.max():
+                break
+            stationary = following
+        else:
+            raise ValueError("The stationary distribution did not converge")
+
+    fleet_distribution = stationary.reshape(routing.n_systems, -1).sum(axis=1)
+    return fleet_distribution / fleet_distribution.sum()
+
+
+def _configuration(pochven) -> Tuple[Optional[List[int]], Optional[List[int]], Optional[int]]:
+    # Camping systems, flashpoints and fleet start of a Pochven instance, with None
+    # for anything randomized on every run
+    if pochven.distance_oracle is not None:
+        raise ValueError("The exact solver needs a RoutingTable, not a distance oracle")
+    camping_system = sorted(pochven.camping_systems) if pochven.camping_system_provided else None
+    flashpoints = list(pochven.flashpoints.values()
+                       ) if pochven.flashpoints_provided else None
+    return camping_system, flashpoints, pochven.fleet_starting_system
+
+
+def exact_encounter_curve(pochven, max_flashpoints: int) -> np.ndarray:
+    """
+    Exact probability of encountering the camp for every number of flashpoints.
+
+    Honors camping_system_provided, flashpoints_provided and fleet_starting_system
+    the same way the simulator does: anything not provided is averaged over its
+    uniform randomization.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        max_flashpoints: Largest number of flashpoints to evaluate
+
+    Returns:
+        Array of length max_flashpoints + 1 where entry n is the probability of
+        encountering the camping fleet at least once in n flashpoints
+    """
+    return encounter_curve(pochven.routing, *_configuration(pochven), max_flashpoints,
+                           pochven.policy)
+
+
+def exact_first_encounter_distribution(pochven, max_flashpoints: int) -> np.ndarray:
+    """
+    Exact distribution of the number of flashpoints until the first encounter.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        max_flashpoints: Largest number of flashpoints to evaluate
+
+    Returns:
+        Array of length max_flashpoints + 1 where entry n is the probability that the
+        first encounter happens on the route to the n-th flashpoint
+    """
+    return first_encounter_distribution(pochven.routing, *_configuration(pochven),
+                                        max_flashpoints, pochven.policy)
+
+
+def exact_expected_flashpoints(pochven) -> float:
+    """
+    Exact expected number of flashpoints until the first encounter.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+
+    Returns:
+        The expected number of flashpoints completed up to and including the one
+        whose route first meets a camp
+    """
+    return expected_flashpoints(pochven.routing, *_configuration(pochven), pochven.policy)
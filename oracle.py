@@ -0,0 +1,357 @@
+"""
+Distance oracles for maps too large for a RoutingTable.
+
+RoutingTable keeps dense next-hop and path-bitmask tables, which stop at 64 systems
+and grow quadratically. A distance oracle keeps only distances, one row per source
+system, and derives everything else from them. On an undirected map the row of a
+route's end system gives each system's distance to that end, so the next hop from
+any system is its first neighbour (in adjacency order) one jump closer. That is the
+same tie-break RoutingTable uses, so both give identical routes on the same map.
+
+- MemmapDistanceOracle stores all pairs as uint8 or uint16 in a .npy file, built
+  once per map and memory-mapped read-only. Worker processes reopen the file and
+  share its pages through the OS cache instead of each holding a copy.
+- LazyDistanceOracle runs a breadth-first search the first time a row is needed
+  and keeps the most recently used rows in an LRU cache, for maps whose full
+  matrix is too big to build or store.
+
+Both are answered with the same queries as RoutingTable (distance_row, get_distance,
+shortest_path, path_includes and path_intersects with a system bitmask), so Pochven
+can simulate on them with the nearest-flashpoint policy.
+"""
+import hashlib
+import os
+import random
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import batch
+
+
+def _csr(connections: Dict[int, List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    # CSR adjacency in the layout of RoutingTable.indptr/indices
+    n_systems = len(connections)
+    if sorted(connections) != list(range(n_systems)):
+        raise ValueError("System IDs must be the integers 0 to n - 1")
+    indptr = np.zeros(n_systems + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum([len(connections[s]) for s in range(n_systems)])
+    indices = np.array([t for s in range(n_systems) for t in connections[s]], dtype=np.int32)
+    return indptr, indices
+
+
+def _bfs_row(indptr: np.ndarray, indices: np.ndarray, source: int,
+             dtype: np.dtype) -> np.ndarray:
+    # Breadth-first search from one system, expanding only the frontier's edges
+    unreachable = np.iinfo(dtype).max
+    distance = np.full(len(indptr) - 1, unreachable, dtype=dtype)
+    distance[source] = 0
+    frontier = np.array([source])
+    level = 0
+    while len(frontier):
+        level += 1
+        degree = indptr[frontier + 1] - indptr[frontier]
+        edges = np.repeat(indptr[frontier] - np.cumsum(degree) + degree, degree) + \
+            np.arange(degree.sum())
+        reached = indices[edges]
+        frontier = np.unique(reached[distance[reached] == unreachable])
+        distance[frontier] = level
+    return distance
+
+
+def bfs_distances(indptr: np.ndarray, indices: np.ndarray, sources: np.ndarray,
+                  dtype: np.dtype = np.uint16) -> np.ndarray:
+    """
+    Breadth-first search from several sources at once.
+
+    The sources are packed one bit each into uint64 words, so each level expands
+    every search with one gather and one OR-reduction over the CSR adjacency. A
+    single source is searched level by level from its frontier instead, which
+    costs only the edges it crosses.
+
+    Args:
+        indptr, indices: CSR adjacency of an undirected map where every system has
+            at least one neighbour
+        sources: System IDs to search from
+        dtype: Integer dtype of the result; its maximum marks unreachable systems
+
+    Returns:
+        Array of shape (len(sources), n_systems) of jump counts
+    """
+    n_systems = len(indptr) - 1
+    sources = np.asarray(sources, dtype=np.int64)
+    n_sources = len(sources)
+    if n_sources == 1:
+        return _bfs_row(indptr, indices, int(sources[0]), dtype)[None]
+    source_index = np.arange(n_sources)
+
+    distance = np.full((n_sources, n_systems), np.iinfo(dtype).max, dtype=dtype)
+    distance[source_index, sources] = 0
+
+    frontier = np.zeros((n_systems, (n_sources + 63) // 64), dtype=np.uint64)
+    np.bitwise_or.at(frontier, (sources, source_index // 64),
+                     np.uint64(1) << (source_index % 64).astype(np.uint64))
+    seen = frontier.copy()
+
+    level = 0
+    while frontier.any() and len(indices):
+        level += 1
+        reached = np.bitwise_or.reduceat(frontier[indices], indptr[:-1], axis=0)
+        frontier = reached & ~seen
+        seen |= frontier
+
+        # Unpack only the words that gained systems on this level
+        systems, words = np.nonzero(frontier)
+        as_bytes = frontier[systems, words].astype('<u8').view(np.uint8).reshape(-1, 8)
+        entry, bit = np.nonzero(np.unpackbits(as_bytes, axis=1, bitorder='little'))
+        distance[words[entry] * 64 + bit, systems[entry]] = level
+
+    return distance
+
+
+def _distance_dtype(indptr: np.ndarray, indices: np.ndarray) -> np.dtype:
+    # Smallest unsigned dtype that holds every distance, with its maximum kept
+    # free to mark unreachable systems. The diameter is at most twice the
+    # eccentricity of any one system.
+    n_systems = len(indptr) - 1
+    if n_systems > 1 and (np.diff(indptr) == 0).any():
+        raise ValueError("The map is not connected")
+    row = bfs_distances(indptr, indices, [0], np.uint32)[0]
+    if (row == np.iinfo(np.uint32).max).any():
+        raise ValueError("The map is not connected")
+    for dtype in (np.uint8, np.uint16):
+        if 2 * int(row.max()) < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError("Distances don't fit in uint16")
+
+
+@lru_cache(maxsize=256)
+def _mask_systems(mask: int) -> Tuple[int, ...]:
+    # The system IDs of the bits set in a bitmask
+    systems = []
+    system_id = 0
+    while mask:
+        if mask & 1:
+            systems.append(system_id)
+        mask >>= 1
+        system_id += 1
+    return tuple(systems)
+
+
+def map_fingerprint(connections: Dict[int, List[int]]) -> str:
+    """A short digest of a map's adjacency lists, including their order."""
+    indptr, indices = _csr(connections)
+    return hashlib.sha256(indptr.tobytes() + indices.tobytes()).hexdigest()[:16]
+
+
+class DistanceOracle:
+    """
+    Shortest-path queries answered from rows of a map's distance matrix.
+
+    Subclasses provide distance_row(). Every system needs a path to every other,
+    and connections must be symmetric (an undirected map).
+
+    Attributes:
+        n_systems: Number of systems in the map
+        indptr, indices: CSR adjacency, as in RoutingTable
+        dtype: Integer dtype of the stored distances (uint8 or uint16)
+    """
+
+    def __init__(self, connections: Dict[int, List[int]]):
+        self.indptr, self.indices = _csr(connections)
+        self.n_systems = len(self.indptr) - 1
+        self._adjacency = [self.neighbours(s).tolist() for s in range(self.n_systems)]
+
+    def neighbours(self, system_id: int) -> np.ndarray:
+        """The systems connected to a system, in adjacency order."""
+        return self.indices[self.indptr[system_id]:self.indptr[system_id + 1]]
+
+    def distance_row(self, start_system_id: int) -> np.ndarray:
+        """Jump counts from one system to every system."""
+        raise NotImplementedError
+
+    def get_distance(self, start_system_id: int, end_system_id: int) -> int:
+        """Number of jumps on the shortest path between two systems."""
+        return int(self.distance_row(start_system_id)[end_system_id])
+
+    def _next_hop(self, system_id: int, to_end: np.ndarray) -> int:
+        # First neighbour one jump closer to the end whose distance row is to_end
+        closer = to_end[system_id] - 1
+        for neighbour in self._adjacency[system_id]:
+            if to_end[neighbour] == closer:
+                return neighbour
+        raise ValueError("The map's connections must be symmetric")
+
+    def shortest_path(self, start_system_id: int, end_system_id: int) -> List[int]:
+        """The list of systems on the path from start to end, both included."""
+        to_end = self.distance_row(end_system_id)
+        path = [start_system_id]
+        while path[-1] != end_system_id:
+            path.append(self._next_hop(path[-1], to_end))
+        return path
+
+    def path_includes(self, start_system_id: int, end_system_id: int, system_id: int) -> bool:
+        """Whether the shortest path from start to end passes through system_id."""
+        return self.path_intersects(start_system_id, end_system_id, 1 << system_id)
+
+    def path_intersects(self, start_system_id: int, end_system_id: int, mask: int) -> bool:
+        """
+        Whether the shortest path from start to end passes through any system in a bitmask.
+
+        A system can only be on the path if it lies on some shortest path, which is
+        checked from distances first; the path is walked only when a candidate does.
+        """
+        to_end = self.distance_row(end_system_id)
+        length = int(to_end[start_system_id])
+        candidates = [system_id for system_id in _mask_systems(mask)
+                      if int(self.distance_row(system_id)[start_system_id]) +
+                      int(to_end[system_id]) == length]
+        if not candidates:
+            return False
+
+        system_id = start_system_id
+        while True:
+            if system_id in candidates:
+                return True
+            if system_id == end_system_id:
+                return False
+            system_id = self._next_hop(system_id, to_end)
+
+
+class MemmapDistanceOracle(DistanceOracle):
+    """
+    All-pairs distances in a memory-mapped .npy file.
+
+    The file is named after the map's fingerprint, so one directory can hold the
+    matrices of several maps and a changed map never reads a stale file. It is
+    built on first use, block of sources by block, into a temporary file that is
+    renamed into place, so concurrent processes never see a partial matrix. When
+    pickled (e.g. to a worker process) the oracle reopens the file instead of
+    copying it.
+
+    Attributes:
+        path: Path of the distance file
+        distance: Read-only (n, n) memory map of jump counts
+    """
+
+    def __init__(self, connections: Dict[int, List[int]], directory: str,
+                 block_size: int = 512):
+        super().__init__(connections)
+        self.path = os.path.join(directory, f"distances-{map_fingerprint(connections)}.npy")
+        if not os.path.exists(self.path):
+            os.makedirs(directory, exist_ok=True)
+            self._build(block_size)
+        self._open()
+
+    def _build(self, block_size: int) -> None:
+        dtype = _distance_dtype(self.indptr, self.indices)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        distance = np.lib.format.open_memmap(
+            temporary, mode='w+', dtype=dtype, shape=(self.n_systems, self.n_systems))
+        for start in range(0, self.n_systems, block_size):
+            sources = np.arange(start, min(start + block_size, self.n_systems))
+            distance[sources] = bfs_distances(self.indptr, self.indices, sources, dtype)
+        distance.flush()
+        del distance
+        os.replace(temporary, self.path)
+
+    def _open(self) -> None:
+        self.distance = np.load(self.path, mmap_mode='r')
+        if self.distance.shape != (self.n_systems, self.n_systems):
+            raise ValueError(f"{self.path} doesn't hold a distance matrix for this map")
+        self.dtype = self.distance.dtype
+
+    def distance_row(self, start_system_id: int) -> np.ndarray:
+        return self.distance[start_system_id]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['distance']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+
+class LazyDistanceOracle(DistanceOracle):
+    """
+    Distance rows computed on demand and kept in an LRU cache.
+
+    Only a route's end system and the camps need rows, and flashpoint systems
+    recur, so a cache far smaller than the map serves most queries. A missed row
+    costs one breadth-first search. The cache is not pickled; each worker process
+    fills its own.
+
+    Attributes:
+        cache_rows: Most rows kept in the cache
+        hits, misses: Row lookups served from the cache and computed
+    """
+
+    def __init__(self, connections: Dict[int, List[int]], cache_rows: int = 4096):
+        super().__init__(connections)
+        if cache_rows < 1:
+            raise ValueError("The cache must hold at least one row")
+        self.dtype = _distance_dtype(self.indptr, self.indices)
+        self.cache_rows = cache_rows
+        self.hits = 0
+        self.misses = 0
+        self._rows: 'OrderedDict[int, np.ndarray]' = OrderedDict()
+
+    def distance_row(self, start_system_id: int) -> np.ndarray:
+        row = self._rows.get(start_system_id)
+        if row is not None:
+            self._rows.move_to_end(start_system_id)
+            self.hits += 1
+            return row
+
+        self.misses += 1
+        row = bfs_distances(self.indptr, self.indices, [start_system_id], self.dtype)[0]
+        row.setflags(write=False)
+        self._rows[start_system_id] = row
+        if len(self._rows) > self.cache_rows:
+            self._rows.popitem(last=False)
+        return row
+
+    @property
+    def cache_bytes(self) -> int:
+        """Memory held by the cached rows."""
+        return len(self._rows) * self.n_systems * self.dtype.itemsize
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_rows'] = OrderedDict()
+        return state
+
+
+def _loop_encounters(offset: int, size: int, rng: np.random.Generator, pochven,
+                     n_flashpoints: int) -> int:
+    # Run a chunk through the loop simulator with its own seeded random stream
+    chunk_rng = random.Random(int(rng.integers(2 ** 63)))
+    return round(pochven.simulate_flashpoint_runs(n_flashpoints, size, chunk_rng) * size)
+
+
+def simulate_encounters(pochven, n_flashpoints: int, n_simulations: int,
+                        seed: Optional[int] = None, workers: Optional[int] = None) -> int:
+    """
+    Count the runs that meet the camping fleet on a map backed by a distance oracle.
+
+    The runs are split into the batch engine's fixed-size chunks, each with its own
+    random stream derived from the seed, and simulated with the loop simulator,
+    optionally on a process pool. A MemmapDistanceOracle is shared by the workers
+    through its file.
+
+    Args:
+        pochven: A Pochven instance built with a distance oracle
+        n_flashpoints: Number of flashpoints to complete in each simulation
+        n_simulations: Number of simulations to run
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes (runs in this process if None or 1)
+
+    Returns:
+        Number of simulations that encountered the camping fleet at least once
+    """
+    return sum(batch.map_chunks(_loop_encounters, n_simulations, pochven, n_flashpoints,
+                                seed=seed, workers=workers))
@@ -0,0 +1,210 @@
+"""
+Optimizing where to place several camps.
+
+The flashpoint fleet's movements don't depend on where the camps are, so a run
+meets a set of camps exactly when its route visits one of them. Each simulated run
+is therefore reduced once to a bitmask of every system its routes pass through (the
+OR of the path masks of its steps), and any placement is scored against those masks
+with a single AND: the encounter probability of a placement is the share of runs
+whose visited mask intersects the placement's camp mask. All placements are scored
+on the same runs, so comparisons between them are not swamped by sampling noise.
+
+Identical visited masks are merged with a weight, which leaves far fewer rows to
+score than there are runs.
+"""
+import heapq
+from itertools import combinations, islice
+from math import comb
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import batch
+from policies import Policy
+from routing import system_mask
+
+METHODS = ('auto', 'greedy', 'exhaustive')
+
+# Largest number of placements the 'auto' method searches exhaustively
+EXHAUSTIVE_LIMIT = 50000
+
+# Number of placements scored together in one array operation
+_SCORE_BLOCK = 512
+
+
+class Placement(NamedTuple):
+    """A set of camping systems and its estimated encounter probability."""
+    camping_systems: Tuple[int, ...]
+    probability: float
+
+
+def _visited_masks(offset: int, size: int, rng: np.random.Generator, routing,
+                   config: Tuple[int, int, np.ndarray], n_flashpoints: int,
+                   policy: Optional[Policy]) -> np.ndarray:
+    # Bitmask of every system each run's routes pass through. The camp is irrelevant
+    # to the fleet's movements, so the runs are simulated without one.
+    _, fleet_starting_system, flashpoints = config
+    draws = batch.RandomDraws(rng, size)
+    state = batch.initial_state(
+        routing, *batch.broadcast_configuration((0, fleet_starting_system, flashpoints), size),
+        draws, policy)
+
+    visited = np.zeros(size, dtype=np.uint64)
+    for _, current_system, next_system, _, _ in batch.iter_steps(
+            routing, *state, n_flashpoints, draws, policy):
+        visited |= routing.path_mask[current_system, next_system]
+    return visited
+
+
+def visited_systems(pochven, n_flashpoints: int, n_simulations: int,
+                    seed: Optional[int] = None,
+                    workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate runs and collect the systems each one passes through.
+
+    The fleet's starting system, flashpoints and routing policy are taken from the
+    Pochven instance; its camps are ignored.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete in each run
+        n_simulations: Number of runs to simulate
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes to split the runs over
+
+    Returns:
+        A tuple of (masks, weights): the distinct visited-system bitmasks (uint64)
+        and the share of runs that produced each
+
+    Raises:
+        ValueError: If the routing policy is camp-aware, since the fleet's routes then
+            depend on where the camps are
+    """
+    if pochven.policy is not None and pochven.policy.camp_aware:
+        raise ValueError("Placements can only be scored for policies that aren't camp-aware")
+
+    visited = np.concatenate(batch.map_chunks(
+        _visited_masks, n_simulations, pochven.routing, batch.configuration(pochven),
+        n_flashpoints, pochven.policy, seed=seed, workers=workers))
+    masks, counts = np.unique(visited, return_counts=True)
+    return masks, counts / n_simulations
+
+
+def _score_masks(masks: np.ndarray, weights: np.ndarray, camp_masks: np.ndarray) -> np.ndarray:
+    # Encounter probability of each camp mask, a block of placements at a time
+    probabilities = np.empty(len(camp_masks))
+    for start in range(0, len(camp_masks), _SCORE_BLOCK):
+        block = camp_masks[start:start + _SCORE_BLOCK]
+        hits = masks[None, :] & block[:, None] != 0
+        probabilities[start:start + _SCORE_BLOCK] = hits.dot(weights)
+    return probabilities
+
+
+def score_placements(pochven, placements: Sequence[Iterable[int]], n_flashpoints: int,
+                     n_simulations: int = 10000, seed: Optional[int] = None,
+                     workers: Optional[int] = None) -> np.ndarray:
+    """
+    Estimate the encounter probability of several placements on the same runs.
+
+    Args:
+        pochven: The Pochven instance describing the fleet's configuration
+        placements: Collections of camping systems to score
+        n_flashpoints: Number of flashpoints to complete in each run
+        n_simulations: Number of runs to simulate
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes to split the runs over
+
+    Returns:
+        Array with the encounter probability of each placement
+    """
+    masks, weights = visited_systems(pochven, n_flashpoints, n_simulations, seed, workers)
+    camp_masks = np.array([system_mask(placement) for placement in placements], dtype=np.uint64)
+    return _score_masks(masks, weights, camp_masks)
+
+
+def _greedy(masks: np.ndarray, weights: np.ndarray, candidates: List[int],
+            n_camps: int) -> Placement:
+    # Greedy selection with lazy marginal gains (CELF). Coverage is submodular, so a
+    # candidate's gain only shrinks as camps are added; a stale gain is an upper
+    # bound, and a candidate whose refreshed gain still tops the heap is the best.
+    on_path = masks[:, None] >> np.array(candidates, dtype=np.uint64) & np.uint64(1) == 1
+    gains = weights.dot(on_path)
+
+    # Entries are (-gain, candidate index, number of camps chosen when computed)
+    heap = [(-gain, index, 0) for index, gain in enumerate(gains)]
+    heapq.heapify(heap)
+
+    covered = np.zeros(len(masks), dtype=bool)
+    chosen = []
+    probability = 0.0
+    for n_chosen in range(n_camps):
+        while True:
+            negative_gain, index, computed_at = heapq.heappop(heap)
+            if computed_at == n_chosen:
+                break
+            gain = weights[on_path[:, index] & ~covered].sum()
+            heapq.heappush(heap, (-gain, index, n_chosen))
+
+        chosen.append(candidates[index])
+        covered |= on_path[:, index]
+        probability -= negative_gain
+
+    return Placement(tuple(sorted(chosen)), float(probability))
+
+
+def _exhaustive(masks: np.ndarray, weights: np.ndarray, candidates: List[int],
+                n_camps: int) -> Placement:
+    # Score every placement of n_camps candidates, a block at a time
+    best = None
+    placements = combinations(candidates, n_camps)
+    while True:
+        block = list(islice(placements, _SCORE_BLOCK))
+        if not block:
+            return best
+        probabilities = _score_masks(
+            masks, weights, np.array([system_mask(p) for p in block], dtype=np.uint64))
+        index = int(np.argmax(probabilities))
+        if best is None or probabilities[index] > best.probability:
+            best = Placement(block[index], float(probabilities[index]))
+
+
+def optimize_camp_placement(pochven, n_camps: int, n_flashpoints: int,
+                            n_simulations: int = 10000,
+                            candidates: Optional[Iterable[int]] = None,
+                            method: str = 'auto', seed: Optional[int] = None,
+                            workers: Optional[int] = None) -> Placement:
+    """
+    Find where to place n_camps camps to best catch the flashpoint fleet.
+
+    Args:
+        pochven: The Pochven instance describing the fleet's configuration
+        n_camps: Number of camps to place
+        n_flashpoints: Number of flashpoints to complete in each run
+        n_simulations: Number of runs to score the placements on
+        candidates: Systems a camp may be placed in (every system if omitted)
+        method: 'exhaustive' to score every placement, 'greedy' to add the best camp
+            one at a time (within 1 - 1/e of the optimum), or 'auto' to search
+            exhaustively when there are at most EXHAUSTIVE_LIMIT placements
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes to split the runs over
+
+    Returns:
+        The best placement found, with its encounter probability on the simulated runs
+    """
+    if method not in METHODS:
+        raise ValueError(f"The method must be one of {', '.join(METHODS)}")
+
+    candidates = sorted(set(range(pochven.n_systems) if candidates is None else candidates))
+    if any(c not in range(pochven.n_systems) for c in candidates):
+        raise ValueError(
+            f"The candidate systems must be ints between 0 and {pochven.n_systems - 1} inclusive")
+    if not 1 <= n_camps <= len(candidates):
+        raise ValueError(
+            f"The number of camps must be between 1 and the number of candidates ({len(candidates)})")
+
+    masks, weights = visited_systems(pochven, n_flashpoints, n_simulations, seed, workers)
+
+    if method == 'exhaustive' or (method == 'auto' and
+                                  comb(len(candidates), n_camps) <= EXHAUSTIVE_LIMIT):
+        return _exhaustive(masks, weights, candidates, n_camps)
+    return _greedy(masks, weights, candidates, n_camps)
@@ -0,0 +1,267 @@
+"""
+Plotting for the Pochven simulation.
+
+Matplotlib is only imported when a plot is drawn, so the simulation core (and every
+batch worker) runs without it. Each function either shows the figure interactively
+through pyplot or, given an output path, renders it straight to a file with the Agg
+canvas, which needs no display and never touches pyplot's global state.
+
+Animations are always rendered headlessly: the constellation is drawn once as a
+cached background, and each frame restores it and redraws only the artists that
+change (the flashpoints, the fleet and its route), which is what makes runs of
+thousands of steps quick to render.
+"""
+import os
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+
+def _new_figure(figsize, output_path: Optional[str]):
+    # A standalone Agg figure when rendering to a file, a pyplot figure otherwise
+    if output_path is not None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=figsize)
+        FigureCanvasAgg(figure)
+    else:
+        import matplotlib.pyplot as plt
+
+        figure = plt.figure(figsize=figsize)
+    return figure, figure.add_subplot()
+
+
+def _finish(figure, output_path: Optional[str]) -> None:
+    # Save the figure to output_path, or show it interactively
+    figure.tight_layout()
+    if output_path is not None:
+        figure.savefig(output_path)
+    else:
+        import matplotlib.pyplot as plt
+
+        plt.show()
+
+
+def _connections(pochven, x: np.ndarray, y: np.ndarray):
+    # Every connection as one LineCollection, each link drawn once
+    from matplotlib.collections import LineCollection
+
+    links = [(i, j) for i in range(pochven.n_systems)
+             for j in pochven.systems[i].connections if i < j]
+    segments = [[(x[i], y[i]), (x[j], y[j])] for i, j in links]
+    return LineCollection(segments, colors='gray', zorder=1)
+
+
+def visualize_pochven(pochven, show_flashpoints: bool = True, show_path: bool = False,
+                      start_system: Optional[int] = None, end_system: Optional[int] = None,
+                      output_path: Optional[str] = None) -> None:
+    """
+    Visualize the Pochven constellation, highlighting the camping system and flashpoints.
+
+    Args:
+        pochven: The Pochven instance to draw
+        show_flashpoints: Whether to highlight the flashpoints
+        show_path: Whether to show a path between two systems
+        start_system: The starting system for the path (required if show_path is True)
+        end_system: The ending system for the path (required if show_path is True)
+        output_path: Render the figure to this file instead of showing it
+    """
+    if show_path and (start_system is None or end_system is None):
+        raise ValueError(
+            "Both start_system and end_system must be provided to show a path")
+
+    figure, ax = _new_figure((10, 10), output_path)
+
+    # Calculate positions for systems
+    x, y = pochven._system_positions()
+
+    # Plot systems
+    ax.scatter(x, y, s=200, c='lightblue', edgecolors='black', zorder=2)
+
+    # Plot connections
+    ax.add_collection(_connections(pochven, x, y))
+
+    # Highlight camping systems
+    camps = sorted(pochven.camping_systems)
+    ax.scatter(x[camps], y[camps], s=300, c='red',
+               edgecolors='black', zorder=3, label='Camping System')
+
+    # Highlight flashpoints
+    if show_flashpoints:
+        flashpoints = list(pochven.flashpoints.values())
+        ax.scatter(x[flashpoints], y[flashpoints], s=250, c='yellow',
+                   edgecolors='black', zorder=3, label='Flashpoint')
+
+    # Show path if requested
+    if show_path:
+        path = pochven.find_shortest_path(start_system, end_system)
+        path_x = [x[i] for i in path]
+        path_y = [y[i] for i in path]
+
+        ax.plot(path_x, path_y, 'green', linewidth=3, zorder=4, label='Path')
+
+        # Highlight start and end
+        ax.scatter(x[start_system], y[start_system], s=250, c='green',
+                   edgecolors='black', zorder=5, label='Start')
+        ax.scatter(x[end_system], y[end_system], s=250, c='blue',
+                   edgecolors='black', zorder=5, label='End')
+
+    # Add system labels
+    for i in range(pochven.n_systems):
+        ax.text(1.1*x[i], 1.1*y[i], str(i), fontsize=12,
+                ha='center', va='center', zorder=6)
+
+    # Add legend (remove duplicates)
+    handles, labels = ax.get_legend_handles_labels()
+    by_label = dict(zip(labels, handles))
+    ax.legend(by_label.values(), by_label.keys(), loc='best')
+
+    # Set title and remove axes
+    ax.set_title('Pochven Constellation')
+    ax.axis('off')
+
+    _finish(figure, output_path)
+
+
+def plot_probability_curve(pochven, max_flashpoints: int = 20, n_simulations: int = 1000,
+                           output_path: Optional[str] = None) -> None:
+    """
+    Plot the probability curve of encountering the camping fleet as a function of n_flashpoints.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        max_flashpoints: Maximum number of flashpoints to simulate
+        n_simulations: Number of simulations to run
+        output_path: Render the figure to this file instead of showing it
+    """
+    # Calculate both curves in a single pass each
+    n_values, sim_probs = pochven.calculate_probability_curve(
+        max_flashpoints, n_simulations)
+    analytical_probs = pochven.calculate_analytical_curve(max_flashpoints)[1:]
+
+    figure, ax = _new_figure((10, 6), output_path)
+    ax.plot(n_values, sim_probs, 'bo-', label='Simulation')
+    ax.plot(n_values, analytical_probs, 'r--', label='Analytical')
+
+    # Add labels and title
+    ax.set_xlabel('Number of Flashpoints')
+    ax.set_ylabel('Probability of Encounter')
+    ax.set_title(
+        'Probability of Encountering Camping Fleet vs. Number of Flashpoints')
+    ax.grid(True)
+    ax.legend()
+
+    # Set x-ticks to only show whole numbers
+    ax.set_xticks(n_values)
+
+    _finish(figure, output_path)
+
+
+def _render_frames(pochven, records: np.ndarray, figsize, dpi: int
+                   ) -> Iterator[Tuple[np.ndarray, str]]:
+    # Yield each step of a run as an RGBA image and its caption, redrawing only the
+    # changed artists. Laying out text costs more than drawing everything else, so
+    # the caption is left for Pillow to stamp on.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_axes((0, 0, 1, 1))
+    x, y = pochven._system_positions()
+    positions = np.column_stack((x, y))
+
+    # The constellation, drawn once into the cached background
+    ax.add_collection(_connections(pochven, x, y))
+    ax.scatter(x, y, s=120, c='lightblue', edgecolors='black', zorder=2)
+    camps = sorted(pochven.camping_systems)
+    ax.scatter(x[camps], y[camps], s=180, c='red', edgecolors='black', zorder=3)
+    for i in range(pochven.n_systems):
+        ax.text(1.12*x[i], 1.12*y[i], str(i), fontsize=8, ha='center', va='center')
+    ax.set_xlim(1.25*x.min(), 1.25*x.max())
+    ax.set_ylim(1.25*y.min(), 1.25*y.max())
+    ax.axis('off')
+
+    # The artists that change every step
+    route = LineCollection([], linewidths=3, zorder=4, animated=True)
+    flashpoints = ax.scatter([], [], s=150, c='yellow', edgecolors='black', zorder=5,
+                             animated=True)
+    fleet = ax.scatter([], [], s=60, c='green', marker='D', edgecolors='black', zorder=6,
+                       animated=True)
+    ax.add_collection(route)
+
+    canvas.draw()
+    background = canvas.copy_from_bbox(figure.bbox)
+
+    camp_passes = 0
+    for record in records:
+        path = pochven.find_shortest_path(int(record['fleet_system']), int(record['target_system']))
+        camp_passes += bool(record['camp_hit'])
+        route.set_segments([positions[path]])
+        route.set_color('red' if record['camp_hit'] else 'green')
+        flashpoints.set_offsets(positions[record['flashpoints']])
+        fleet.set_offsets(positions[[path[0]]])
+
+        canvas.restore_region(background)
+        for artist in (route, flashpoints, fleet):
+            ax.draw_artist(artist)
+        yield (np.asarray(canvas.buffer_rgba()),
+               f"Step {record['step']}    camp passes: {camp_passes}")
+
+
+def animate_trajectory(pochven, records: np.ndarray, output_path: str, run: int = 0,
+                       fps: int = 10, figsize=(6, 6), dpi: int = 80) -> int:
+    """
+    Render one recorded run as an animation, one frame per flashpoint step.
+
+    Each frame shows the flashpoints after the spawn, the fleet's system and its
+    route to the next flashpoint, red when it passes a camp. Rendering needs no
+    display. Frames are streamed, so a PNG sequence is written in constant memory;
+    a GIF is assembled by Pillow at about one byte per pixel per frame.
+
+    Args:
+        pochven: The Pochven instance the run was recorded on
+        records: Trajectory records (see trajectory.py), e.g. from load_trajectories
+        output_path: A .gif file, or a directory to write frame_00001.png, ... into
+        run: Index of the run to render
+        fps: Frames (steps) per second of the GIF
+        figsize: Figure size in inches
+        dpi: Resolution of the frames
+
+    Returns:
+        Number of frames rendered
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    records = records[records['run'] == run]
+    records = records[np.argsort(records['step'], kind='stable')]
+    if not len(records):
+        raise ValueError(f"No records of run {run}")
+    font = ImageFont.load_default(size=dpi // 5)
+
+    # Frames are palette images sharing the first frame's palette (the map's colours
+    # never change), which is several times quicker to encode than RGB
+    frames = _render_frames(pochven, records, figsize, dpi)
+    palette = None
+
+    def palette_frames():
+        nonlocal palette
+        for frame, caption in frames:
+            image = Image.fromarray(frame).convert('RGB')
+            ImageDraw.Draw(image).text((dpi // 8, dpi // 8), caption, fill='black', font=font)
+            if palette is None:
+                palette = image.quantize(dither=Image.Dither.NONE)
+            yield image.quantize(palette=palette, dither=Image.Dither.NONE)
+
+    images = palette_frames()
+    if output_path.lower().endswith('.gif'):
+        # Frame-difference optimization costs more than the rendering, so it is off
+        next(images).save(output_path, save_all=True, append_images=images,
+                          duration=1000 / fps, loop=0, optimize=False)
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        for index, image in enumerate(images, start=1):
+            image.save(os.path.join(output_path, f"frame_{index:05d}.png"), compress_level=1)
+    return len(records)
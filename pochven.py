@@ -1,76 +1,123 @@
 from system import System
+import batch
+import markov
+import oracle
+import placement
+import policies
+import profiling
+import routing
+import stats
+from state import SimulationState
+import timed
+import trajectory
 import random
-from typing import Optional, List, Tuple
-import matplotlib.pyplot as plt
+from typing import Iterable, Iterator, Optional, List, Tuple
 import numpy as np
 import math
 
 
 class Pochven:
     def __init__(self, include_home_systems=False, camping_system: Optional[int] = None,
-                 flashpoint_starting_systems: Optional[list] = None, fleet_starting_system: Optional[int] = None):
+                 flashpoint_starting_systems: Optional[list] = None, fleet_starting_system: Optional[int] = None,
+                 camping_systems: Optional[Iterable[int]] = None,
+                 policy: Optional[policies.Policy] = None,
+                 distance_oracle: Optional[oracle.DistanceOracle] = None):
         self.flashpoints = dict()
         self.systems = dict()
         self.camping_system = int()
         self.fleet_starting_system = fleet_starting_system
 
         # Track if positions were provided as arguments
-        self.camping_system_provided = camping_system is not None
+        self.camping_system_provided = camping_system is not None or camping_systems is not None
         self.flashpoints_provided = flashpoint_starting_systems is not None
         self.fleet_starting_system_provided = fleet_starting_system is not None
 
+        # Build the map and its routing tables
+        self.include_home_systems = include_home_systems
+        self.distance_oracle = distance_oracle
+        if distance_oracle is not None:
+            if include_home_systems:
+                raise ValueError("A map given by a distance oracle has no home systems to include")
+            if policy is not None and not isinstance(policy, policies.NearestPolicy):
+                raise ValueError("Maps given by a distance oracle only support the nearest-flashpoint policy")
+            connections = {system_id: distance_oracle.neighbours(system_id).tolist()
+                           for system_id in range(distance_oracle.n_systems)}
+        else:
+            connections = routing.pochven_connections(include_home_systems)
+        for system_id, system_connections in connections.items():
+            self.systems[system_id] = System(
+                id=system_id, connections=system_connections)
+
+        # Distance, next-hop and path-membership lookups for the simulation; a
+        # distance oracle answers the same queries for large maps
+        self.routing = distance_oracle if distance_oracle is not None else \
+            routing.pochven_routing_table(include_home_systems)
+        self.n_systems = self.routing.n_systems
+        last_system = self.n_systems - 1
+
         # Validate fleet_starting_system if provided
-        if fleet_starting_system is not None and fleet_starting_system not in range(0, 24):
+        if fleet_starting_system is not None and fleet_starting_system not in range(0, self.n_systems):
             raise ValueError(
-                "The fleet starting system must be an int between 0 and 23 inclusive")
+                f"The fleet starting system must be an int between 0 and {last_system} inclusive")
 
         # validate values if included
-        if camping_system is not None and camping_system not in range(0, 24):
+        if camping_system is not None and camping_system not in range(0, self.n_systems):
             raise ValueError(
-                "The camping system must be an int between 0 and 23 inclusive")
+                f"The camping system must be an int between 0 and {last_system} inclusive")
+
+        if camping_systems is not None:
+            if camping_system is not None:
+                raise ValueError(
+                    "Specify either camping_system or camping_systems, not both")
+            camping_systems = frozenset(camping_systems)
+            if not camping_systems or any(camp not in range(0, self.n_systems) for camp in camping_systems):
+                raise ValueError(
+                    f"The camping systems must be a non-empty set of ints between 0 and {last_system} inclusive")
+
+        if policy is not None and not isinstance(policy, policies.Policy):
+            raise ValueError("The policy must be a policies.Policy or None")
 
         if flashpoint_starting_systems is not None and len(flashpoint_starting_systems) != 3:
             raise ValueError(
-                "The flashpoint starting systems must be a list of 3 integers between 0 and 23")
-
-        if include_home_systems:
-            raise NotImplementedError(
-                "I didn't implement logic for home systems yet.")
-
-        # create systems
-        for system_id in range(0, 24):
-            if system_id == 0:
-                connections = [1, 23]
-            elif system_id == 23:
-                connections = [22, 0]
-            else:
-                connections = [system_id - 1, system_id + 1]
-            self.systems[system_id] = System(
-                id=system_id, connections=connections)
+                f"The flashpoint starting systems must be a list of 3 integers between 0 and {last_system}")
 
         # set flashpoint starting systems
         if flashpoint_starting_systems is not None:
             for i, value in enumerate(flashpoint_starting_systems):
-                if value not in range(0, 24):
+                if value not in range(0, self.n_systems):
                     raise ValueError(
-                        "The flashpoint starting systems must be a list of 3 integers between 0 and 23")
+                        f"The flashpoint starting systems must be a list of 3 integers between 0 and {last_system}")
                 self.flashpoints[i] = value
         else:
             for key in range(0, 3):
-                flashpoint_location = random.randint(
-                    0, 23)  # Fixed: changed from 24 to 23
+                flashpoint_location = random.randint(0, last_system)
                 self.flashpoints[key] = flashpoint_location
 
-        # set camping system
-        if camping_system is not None:
+        # set camping systems; camping_system is the lowest of them
+        if camping_systems is not None:
+            self.camping_system = min(camping_systems)
+        elif camping_system is not None:
             self.camping_system = camping_system
         else:
-            self.camping_system = random.randint(
-                0, 23)  # Fixed: changed from 24 to 23
+            self.camping_system = random.randint(0, last_system)
+        self.camping_systems = camping_systems if camping_systems is not None else frozenset(
+            [self.camping_system])
+
+        # Bitmask of the camping systems, for checking routes against every camp at once
+        self.camp_mask = routing.system_mask(self.camping_systems)
+
+        # IDs for spawned flashpoints are handed out in increasing order
+        self._next_flashpoint_id = len(self.flashpoints)
+
+        # How the fleet picks its next flashpoint; None is the nearest flashpoint
+        self.policy = policy
+
+        # Optional profiling.SimulationProfiler (or compatible hook); None disables instrumentation
+        self.profiler: Optional[profiling.SimulationProfiler] = None
 
     def find_shortest_path(self, start_system_id: int, end_system_id: int) -> List[int]:
         """
-        Find the shortest path between two systems in the ring topology.
+        Find the shortest path between two systems in the Pochven map.
 
         Args:
             start_system_id: The ID of the starting system
@@ -79,23 +126,7 @@ class Pochven:
         Returns:
             A list of system IDs representing the path (including start and end)
         """
-        # Calculate clockwise distance
-        clockwise_dist = (end_system_id - start_system_id) % 24
-
-        # Calculate counter-clockwise distance
-        counter_clockwise_dist = (start_system_id - end_system_id) % 24
-
-        # Determine the shorter path
-        if clockwise_dist <= counter_clockwise_dist:
-            # Clockwise path
-            path = [(start_system_id + i) %
-                    24 for i in range(clockwise_dist + 1)]
-        else:
-            # Counter-clockwise path
-            path = [(start_system_id - i) %
-                    24 for i in range(counter_clockwise_dist + 1)]
-
-        return path
+        return self.routing.shortest_path(start_system_id, end_system_id)
 
     def complete_flashpoint(self, flashpoint_id: int) -> int:
         """
@@ -128,11 +159,14 @@ class Pochven:
         Returns:
             A tuple of (flashpoint_id, system_id) for the new flashpoint
         """
-        # Find a new ID for the flashpoint
-        new_id = max(self.flashpoints.keys()) + 1 if self.flashpoints else 0
+        # Take the next unused ID
+        new_id = self._next_flashpoint_id
+        while new_id in self.flashpoints:
+            new_id += 1
+        self._next_flashpoint_id = new_id + 1
 
         # Find a system that doesn't already have a flashpoint
-        available_systems = range(0, 24)
+        available_systems = range(0, self.n_systems)
         if not available_systems:
             raise ValueError("No available systems for new flashpoint")
 
@@ -156,13 +190,10 @@ class Pochven:
         """
         nearest_flashpoint_id = None
         min_distance = float('inf')
+        distances = self.routing.distance_row(current_system_id)
 
         for flashpoint_id, flashpoint_system in self.flashpoints.items():
-            # Calculate the shortest path
-            path = self.find_shortest_path(
-                current_system_id, flashpoint_system)
-            # Subtract 1 because path includes start system
-            distance = len(path) - 1
+            distance = distances[flashpoint_system]
 
             if distance < min_distance:
                 min_distance = distance
@@ -170,255 +201,619 @@ class Pochven:
 
         return nearest_flashpoint_id
 
+    def find_next_flashpoint(self, current_system_id: int) -> int:
+        """
+        Find the flashpoint the fleet heads for next under its routing policy.
+
+        Args:
+            current_system_id: The ID of the current system
+
+        Returns:
+            The ID of the chosen flashpoint
+        """
+        if self.distance_oracle is not None:
+            return self.find_nearest_flashpoint(current_system_id)
+        state = SimulationState(tuple(self.flashpoints.values()), current_system_id, self.camp_mask)
+        slot = state.policy_slot(policies.policy_lists(
+            policies.resolve(self.policy), self.routing, self.camp_mask))
+        return list(self.flashpoints)[slot]
+
     def path_includes_camping_system(self, path: List[int]) -> bool:
         """
-        Check if a path includes the camping system.
+        Check if a path includes a camping system.
 
         Args:
             path: A list of system IDs representing a path
 
         Returns:
-            True if the path includes the camping system, False otherwise
+            True if the path includes any of the camping systems, False otherwise
         """
-        return self.camping_system in path
+        return not self.camping_systems.isdisjoint(path)
 
-    def simulate_flashpoint_runs(self, n_flashpoints: int, n_simulations: int = 1000) -> float:
+    def path_passes_camping_system(self, start_system_id: int, end_system_id: int) -> bool:
+        """
+        Check if the shortest path between two systems includes a camping system.
+
+        Equivalent to building the path with find_shortest_path and passing it to
+        path_includes_camping_system, but answered from the routing table.
+
+        Args:
+            start_system_id: The ID of the starting system
+            end_system_id: The ID of the ending system
+
+        Returns:
+            True if the path includes any of the camping systems, False otherwise
+        """
+        return self.routing.path_intersects(start_system_id, end_system_id, self.camp_mask)
+
+    def simulation_state(self) -> SimulationState:
+        """
+        A fresh per-run state holding this instance's starting configuration.
+
+        Returns:
+            A SimulationState with the current flashpoints (oldest first), the fleet
+            starting system and the camp bitmask
+        """
+        return SimulationState(tuple(self.flashpoints.values()),
+                               self.fleet_starting_system, self.camp_mask)
+
+    def simulate_flashpoint_runs(self, n_flashpoints: int, n_simulations: int = 1000,
+                                 rng: Optional[random.Random] = None) -> float:
         """
         Simulate multiple runs of flashpoint fleet movements and count encounters.
 
+        Each run works on its own SimulationState and leaves the instance untouched,
+        so several threads or coroutines can simulate on one Pochven at once (give
+        each its own rng for independent, reproducible streams).
+
         Args:
             n_flashpoints: Number of flashpoints to complete in each simulation
             n_simulations: Number of simulations to run
+            rng: Random number generator to draw from (the random module if omitted)
 
         Returns:
             Probability of encountering the camping fleet at least once
         """
+        if rng is None:
+            rng = random
+
+        if self.distance_oracle is not None:
+            return self._simulate_flashpoint_runs_oracle(n_flashpoints, n_simulations, rng)
+
+        # The instrumented loop is separate so that disabled profiling costs nothing per step
+        if self.profiler is not None:
+            return self._simulate_flashpoint_runs_profiled(n_flashpoints, n_simulations, rng)
+
+        path_intersects = self.routing.path_intersects
+        policy = policies.resolve(self.policy)
+        slots = policies.policy_lists(policy, self.routing, self.camp_mask)
+        systems = range(0, self.n_systems)
+        last_system = self.n_systems - 1
+
+        state = self.simulation_state()
+        initial = state.snapshot()
         encounters = 0
+        camp_slots = {}
 
         for _ in range(n_simulations):
-            # Create a copy of the original state
-            original_flashpoints = self.flashpoints.copy()
-            original_camping_system = self.camping_system
-            original_fleet_starting_system = self.fleet_starting_system
+            state.restore(initial)
 
             # Randomize any elements that weren't provided as arguments
-            simulation_flashpoints = original_flashpoints.copy()
-            simulation_camping_system = original_camping_system
-
-            # Randomize camping system if not provided
             if not self.camping_system_provided:
-                simulation_camping_system = random.randint(0, 23)
-                self.camping_system = simulation_camping_system
-
-            # Randomize flashpoints if not provided
+                state.camp_mask = 1 << rng.randint(0, last_system)
             if not self.flashpoints_provided:
-                simulation_flashpoints = {}
-                for key in range(0, 3):
-                    flashpoint_location = random.randint(0, 23)
-                    simulation_flashpoints[key] = flashpoint_location
-                self.flashpoints = simulation_flashpoints
+                state.flashpoints = (rng.randint(0, last_system), rng.randint(0, last_system),
+                                     rng.randint(0, last_system))
 
-            # Determine the starting system and flashpoint
+            camp_mask = state.camp_mask
+            if policy.camp_aware and not self.camping_system_provided:
+                slots = camp_slots.get(camp_mask)
+                if slots is None:
+                    slots = camp_slots[camp_mask] = policies.policy_lists(
+                        policy, self.routing, camp_mask)
+
+            # Start at the flashpoint the policy picks from the fleet's system, or at a random one
             if self.fleet_starting_system is not None:
-                # Start at the specified system
-                current_system = self.fleet_starting_system
-                # Find the nearest flashpoint to start with
-                current_flashpoint_id = self.find_nearest_flashpoint(
-                    current_system)
-                # Move to that flashpoint to begin the simulation
-                current_system = self.flashpoints[current_flashpoint_id]
+                slot = state.policy_slot(slots)
             else:
-                # Start at a random flashpoint
-                current_flashpoint_id = random.choice(
-                    list(self.flashpoints.keys()))
-                current_system = self.flashpoints[current_flashpoint_id]
+                slot = rng.randrange(len(state.flashpoints))
 
-            # Track if we encounter the camping system in this simulation
             encountered = False
 
             for _ in range(n_flashpoints):
-                # Complete the current flashpoint
-                current_system = self.complete_flashpoint(
-                    current_flashpoint_id)
+                # Complete the current flashpoint, spawn its replacement and head
+                # for the one the policy picks
+                current_system = state.complete(slot, rng.choice(systems))
+                slot = state.policy_slot(slots)
+
+                if path_intersects(current_system, state.flashpoints[slot], camp_mask):
+                    encountered = True
 
-                # Find the nearest flashpoint
-                next_flashpoint_id = self.find_nearest_flashpoint(
-                    current_system)
-                next_system = self.flashpoints[next_flashpoint_id]
+            if encountered:
+                encounters += 1
+
+        return encounters / n_simulations
+
+    def _simulate_flashpoint_runs_oracle(self, n_flashpoints: int, n_simulations: int,
+                                         rng) -> float:
+        """
+        simulate_flashpoint_runs on a map given by a distance oracle.
+
+        Policy tables don't scale to large maps, so the fleet picks the nearest
+        flashpoint from the oracle's distance rows. Follows the same steps and random
+        draws as the table-driven loop, so on the same map and random state both
+        give the same result. Not instrumented by the profiler.
+        """
+        distance_oracle = self.distance_oracle
+        systems = range(0, self.n_systems)
+        last_system = self.n_systems - 1
+
+        state = self.simulation_state()
+        initial = state.snapshot()
+        encounters = 0
+
+        for _ in range(n_simulations):
+            state.restore(initial)
+
+            # Randomize any elements that weren't provided as arguments
+            if not self.camping_system_provided:
+                state.camp_mask = 1 << rng.randint(0, last_system)
+            if not self.flashpoints_provided:
+                state.flashpoints = (rng.randint(0, last_system), rng.randint(0, last_system),
+                                     rng.randint(0, last_system))
+            camp_mask = state.camp_mask
 
-                # Find the path to the next flashpoint
-                path = self.find_shortest_path(current_system, next_system)
+            # Start at the nearest flashpoint to the fleet's system, or at a random one
+            if self.fleet_starting_system is not None:
+                slot = state.nearest_slot(distance_oracle.distance_row(state.fleet_system))
+            else:
+                slot = rng.randrange(len(state.flashpoints))
+
+            encountered = False
 
-                # Check if the path includes the camping system
-                if self.path_includes_camping_system(path):
+            for _ in range(n_flashpoints):
+                current_system = state.complete(slot, rng.choice(systems))
+                slot = state.nearest_slot(distance_oracle.distance_row(current_system))
+
+                if distance_oracle.path_intersects(current_system, state.flashpoints[slot], camp_mask):
                     encountered = True
 
-                # Move to the next flashpoint
-                current_flashpoint_id = next_flashpoint_id
-                current_system = next_system
+            if encountered:
+                encounters += 1
+
+        return encounters / n_simulations
+
+    def _simulate_flashpoint_runs_profiled(self, n_flashpoints: int, n_simulations: int,
+                                           rng) -> float:
+        """
+        simulate_flashpoint_runs with every phase timed and counted by self.profiler.
+
+        Follows the same steps and random draws as the uninstrumented loop, so a given
+        random state produces the same result.
+        """
+        profiler = self.profiler
+        clock = profiler.clock
+        policy = policies.resolve(self.policy)
+        slots = policies.policy_lists(policy, self.routing, self.camp_mask)
+        systems = range(0, self.n_systems)
+        last_system = self.n_systems - 1
+
+        state = self.simulation_state()
+        initial = state.snapshot()
+        encounters = 0
+        camp_slots = {}
+
+        for _ in range(n_simulations):
+            t = clock()
+            state.restore(initial)
+            profiler.record('restore', clock() - t)
+
+            t = clock()
+            if not self.camping_system_provided:
+                state.camp_mask = 1 << rng.randint(0, last_system)
+            if not self.flashpoints_provided:
+                state.flashpoints = (rng.randint(0, last_system), rng.randint(0, last_system),
+                                     rng.randint(0, last_system))
+            profiler.record('randomize', clock() - t)
+
+            t = clock()
+            if policy.camp_aware and not self.camping_system_provided:
+                slots = camp_slots.get(state.camp_mask)
+                if slots is None:
+                    slots = camp_slots[state.camp_mask] = policies.policy_lists(
+                        policy, self.routing, state.camp_mask)
+            if self.fleet_starting_system is not None:
+                slot = state.policy_slot(slots)
+            else:
+                slot = rng.randrange(len(state.flashpoints))
+            profiler.record('initial_move', clock() - t)
+
+            encountered = False
+
+            for _ in range(n_flashpoints):
+                t = clock()
+                new_system = rng.choice(systems)
+                profiler.record('spawn', clock() - t)
+
+                t = clock()
+                current_system = state.complete(slot, new_system)
+                profiler.record('complete', clock() - t)
+
+                t = clock()
+                slot = state.policy_slot(slots)
+                next_system = state.flashpoints[slot]
+                profiler.record('nearest_flashpoint', clock() - t)
+
+                t = clock()
+                hit = self.routing.path_intersects(current_system, next_system, state.camp_mask)
+                profiler.record('camp_check', clock() - t)
+
+                profiler.count('steps')
+                profiler.count('spawns')
+                profiler.record_path_length(self.routing.get_distance(current_system, next_system))
+                if hit:
+                    profiler.count('camp_hits')
+                    encountered = True
 
             if encountered:
                 encounters += 1
+                profiler.count('encounters')
+            profiler.count('simulations')
+
+        return encounters / n_simulations
 
-            # Restore original state
-            self.flashpoints = original_flashpoints
-            self.camping_system = original_camping_system
-            self.fleet_starting_system = original_fleet_starting_system
+    def simulate_flashpoint_batch(self, n_flashpoints: int, n_simulations: int = 1000,
+                                  seed: Optional[int] = None, workers: Optional[int] = None) -> float:
+        """
+        Simulate multiple runs with the vectorized batch engine.
+
+        Produces the same statistics as simulate_flashpoint_runs, but advances all
+        simulations together with NumPy array operations. On a map given by a
+        distance oracle, the loop simulator runs the same seeded chunks instead.
+
+        Args:
+            n_flashpoints: Number of flashpoints to complete in each simulation
+            n_simulations: Number of simulations to run
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            workers: Number of worker processes to split the simulations over
 
+        Returns:
+            Probability of encountering the camping fleet at least once
+        """
+        if self.distance_oracle is not None:
+            return oracle.simulate_encounters(
+                self, n_flashpoints, n_simulations, seed, workers) / n_simulations
+
+        if self.profiler is None:
+            encounters = batch.simulate_encounters(
+                self, n_flashpoints, n_simulations, seed, workers)
+            return encounters / n_simulations
+
+        # The batch engine runs in bulk (possibly in other processes), so it is
+        # profiled as a whole: one timed call and the totals it implies
+        t = self.profiler.clock()
+        encounters = batch.simulate_encounters(
+            self, n_flashpoints, n_simulations, seed, workers)
+        self.profiler.record('batch', self.profiler.clock() - t)
+        self.profiler.count('simulations', n_simulations)
+        self.profiler.count('steps', n_simulations * n_flashpoints)
+        self.profiler.count('spawns', n_simulations * n_flashpoints)
+        self.profiler.count('encounters', encounters)
         return encounters / n_simulations
 
-    def calculate_encounter_probability(self, n_flashpoints: int, n_simulations: int = 1000) -> float:
+    def calculate_encounter_probability(self, n_flashpoints: int, n_simulations: int = 1000,
+                                        workers: Optional[int] = None, seed: Optional[int] = None,
+                                        conditional: bool = False) -> float:
         """
         Calculate the probability of encountering the camping fleet at least once
         after n flashpoints spawn.
 
+        The simulations are split into fixed-size chunks, each with its own random
+        stream derived from the seed, so a given seed gives bit-identical results
+        regardless of the number of workers.
+
         Args:
             n_flashpoints: Number of flashpoints to complete
             n_simulations: Number of simulations to run
+            workers: Number of worker processes to split the simulations over
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            conditional: Use the conditional Monte Carlo estimator, which adds the
+                exact chance of passing the camp at each step instead of sampling it
 
         Returns:
             Probability of encountering the camping fleet at least once
         """
-        return self.simulate_flashpoint_runs(n_flashpoints, n_simulations)
+        if conditional:
+            return batch.conditional_encounter_probability(
+                self, n_flashpoints, n_simulations, seed, workers)
+        return self.simulate_flashpoint_batch(n_flashpoints, n_simulations, seed, workers)
+
+    def estimate_encounter_probability(self, n_flashpoints: int, target_half_width: float = 0.01,
+                                       confidence: float = 0.95, max_simulations: int = 10 ** 7,
+                                       seed: Optional[int] = None,
+                                       workers: Optional[int] = None) -> stats.EncounterEstimate:
+        """
+        Estimate the encounter probability to a target precision.
+
+        Instead of a fixed number of simulations, runs are added in growing batches
+        until the Wilson confidence interval is no wider than requested.
+
+        Args:
+            n_flashpoints: Number of flashpoints to complete
+            target_half_width: Largest acceptable half-width of the confidence interval
+            confidence: Confidence level of the interval
+            max_simulations: Upper limit on the number of simulations
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            workers: Number of worker processes to split the simulations over
+
+        Returns:
+            An EncounterEstimate of (probability, lower, upper, n_simulations)
+        """
+        return stats.sequential_encounter_estimate(
+            self, n_flashpoints, target_half_width, confidence, max_simulations, seed, workers)
+
+    def calculate_probability_curve(self, max_flashpoints: int, n_simulations: int = 1000,
+                                    seed: Optional[int] = None,
+                                    workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate the simulated encounter probability for every number of flashpoints
+        from 1 to max_flashpoints.
+
+        A single batch of runs of length max_flashpoints is simulated and the step of
+        each run's first encounter is recorded. Since a run of n flashpoints is the
+        prefix of a longer run, the whole curve is the cumulative histogram of those
+        first-encounter steps.
+
+        Args:
+            max_flashpoints: Maximum number of flashpoints to simulate
+            n_simulations: Number of simulations to run
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            workers: Number of worker processes to split the simulations over
+
+        Returns:
+            A tuple of (n_values, probabilities) arrays
+        """
+        counts = batch.first_encounter_histogram(
+            self, max_flashpoints, n_simulations, seed, workers)
+        n_values = np.arange(1, max_flashpoints + 1)
+        probabilities = np.cumsum(counts)[1:] / n_simulations
+        return n_values, probabilities
+
+    def calculate_run_statistics(self, n_flashpoints: int, n_simulations: int = 1000,
+                                 seed: Optional[int] = None,
+                                 workers: Optional[int] = None) -> batch.RunStatistics:
+        """
+        Simulate runs and collect distributions beyond "at least one encounter".
+
+        One batch pass yields the encounter probability (identical to
+        calculate_encounter_probability for the same seed), the distribution and mean
+        of the number of camp passes per run, and how often the routes pass through
+        each system. For a policy that isn't camp-aware the fleet moves the same way
+        wherever the camps are, so visit_probability[s] and transit_frequency[s] are
+        the encounter probability and expected passes of a single camp in system s,
+        which ranks alternative camp spots from the same runs.
+
+        Args:
+            n_flashpoints: Number of flashpoints to complete in each simulation
+            n_simulations: Number of simulations to run
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            workers: Number of worker processes to split the simulations over
+
+        Returns:
+            A batch.RunStatistics with the histograms and derived frequencies
+        """
+        return batch.run_statistics(self, n_flashpoints, n_simulations, seed, workers)
+
+    def optimize_camp_placement(self, n_camps: int, n_flashpoints: int,
+                                n_simulations: int = 10000,
+                                candidates: Optional[Iterable[int]] = None,
+                                method: str = 'auto', seed: Optional[int] = None,
+                                workers: Optional[int] = None) -> placement.Placement:
+        """
+        Find where to place several camps to best catch the flashpoint fleet.
+
+        The fleet's starting system and flashpoints come from this instance; its
+        camping systems are ignored. Every candidate placement is scored on the same
+        simulated runs.
+
+        Args:
+            n_camps: Number of camps to place
+            n_flashpoints: Number of flashpoints to complete
+            n_simulations: Number of runs to score the placements on
+            candidates: Systems a camp may be placed in (every system if omitted)
+            method: 'exhaustive', 'greedy' or 'auto' (exhaustive when small enough)
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            workers: Number of worker processes to split the runs over
+
+        Returns:
+            A Placement of (camping_systems, probability)
+        """
+        return placement.optimize_camp_placement(
+            self, n_camps, n_flashpoints, n_simulations, candidates, method, seed, workers)
+
+    def calculate_timed_encounter_curve(self, horizon: float, resolution: float = 1.0,
+                                        n_simulations: int = 10000,
+                                        jump_time: float = timed.DEFAULT_JUMP_TIME,
+                                        clear_duration=None,
+                                        camp_schedule: timed.Schedules = None,
+                                        seed: Optional[int] = None,
+                                        workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate the encounter probability as a function of elapsed time.
+
+        Args:
+            horizon: Longest elapsed time to evaluate
+            resolution: Spacing of the returned time grid
+            n_simulations: Number of runs to simulate
+            jump_time: Time taken by one jump
+            clear_duration: Callable (rng, size) -> clear times, e.g.
+                timed.GammaDuration(20) (defaults to a fixed timed.DEFAULT_CLEAR_TIME)
+            camp_schedule: When the camps are active: None for always, a
+                timed.CampSchedule for every camp, or a dict of them per camping system
+            seed: Seed for reproducible results (fresh entropy if omitted)
+            workers: Number of worker processes to split the runs over
+
+        Returns:
+            A tuple of (times, probabilities)
+        """
+        return timed.timed_encounter_curve(
+            self, horizon, resolution, n_simulations, jump_time, clear_duration,
+            camp_schedule, seed, workers)
+
+    def iter_trajectories(self, n_flashpoints: int, n_simulations: int = 1,
+                          seed: Optional[int] = None) -> Iterator[np.ndarray]:
+        """
+        Stream the step-by-step records of simulated runs.
+
+        Args:
+            n_flashpoints: Number of flashpoints to complete in each run
+            n_simulations: Number of runs to simulate side by side
+            seed: Seed for reproducible results (fresh entropy if omitted)
+
+        Yields:
+            Blocks of trajectory.TRAJECTORY_DTYPE records (run, step, fleet_system,
+            target_system, flashpoints, camp_hit)
+        """
+        return trajectory.iter_trajectories(self, n_flashpoints, n_simulations, seed)
 
     def calculate_analytical_probability(self, n_flashpoints: int) -> float:
         """
-        Calculate the analytical probability of encountering the camping fleet at least once
+        Calculate the exact probability of encountering the camping fleet at least once
         after n flashpoints spawn.
 
-        This is based on the fact that in a ring topology with 24 systems, the probability
-        of a random path including the camping system can be calculated directly.
+        The simulation is a Markov chain over the fleet's system and the remaining
+        flashpoints, so the probability is computed exactly from its transition matrix
+        instead of by sampling.
 
         Args:
             n_flashpoints: Number of flashpoints to complete
 
         Returns:
-            Analytical probability of encountering the camping fleet at least once
+            Exact probability of encountering the camping fleet at least once
         """
-        # In a ring of 24 systems, the average path length between two random systems is 6
-        # The probability that a random path includes the camping system is approximately 6/24 = 1/4
-        # The probability of not encountering in n_flashpoints is (3/4)^n_flashpoints
-        # So the probability of encountering at least once is 1 - (3/4)^n_flashpoints
+        return float(self.calculate_analytical_curve(n_flashpoints)[n_flashpoints])
 
-        # This is a simplified model and assumes random distribution of flashpoints
-        # For more accurate results, use the simulation method
+    def calculate_analytical_curve(self, max_flashpoints: int) -> np.ndarray:
+        """
+        Calculate the exact encounter probability for every number of flashpoints
+        up to max_flashpoints in one pass.
 
-        p_not_encounter = (3/4) ** n_flashpoints
-        p_encounter = 1 - p_not_encounter
+        Args:
+            max_flashpoints: Largest number of flashpoints to evaluate
 
-        return p_encounter
+        Returns:
+            Array of length max_flashpoints + 1 where entry n is the probability of
+            encountering the camping fleet at least once after n flashpoints
+        """
+        return markov.exact_encounter_curve(self, max_flashpoints)
 
-    def visualize_pochven(self, show_flashpoints: bool = True, show_path: bool = False,
-                          start_system: Optional[int] = None, end_system: Optional[int] = None) -> None:
+    def calculate_first_encounter_distribution(self, max_flashpoints: int) -> np.ndarray:
         """
-        Visualize the Pochven constellation, highlighting the camping system and flashpoints.
+        Calculate the exact distribution of the number of flashpoints until the first
+        encounter.
 
         Args:
-            show_flashpoints: Whether to highlight the flashpoints
-            show_path: Whether to show a path between two systems
-            start_system: The starting system for the path (required if show_path is True)
-            end_system: The ending system for the path (required if show_path is True)
-        """
-        # Create a figure
-        plt.figure(figsize=(10, 10))
+            max_flashpoints: Largest number of flashpoints to evaluate
 
-        # Calculate positions for systems in a circle
-        angles = np.linspace(0, 2*np.pi, 24, endpoint=False)
-        radius = 5
-        x = radius * np.cos(angles)
-        y = radius * np.sin(angles)
+        Returns:
+            Array of length max_flashpoints + 1 where entry n is the probability that
+            the first encounter happens on the route to the n-th flashpoint
+        """
+        return markov.exact_first_encounter_distribution(self, max_flashpoints)
 
-        # Plot systems
-        plt.scatter(x, y, s=200, c='lightblue', edgecolors='black', zorder=2)
+    def calculate_expected_flashpoints(self) -> float:
+        """
+        Calculate the exact expected number of flashpoints until the first encounter,
+        with no limit on the number of flashpoints.
 
-        # Plot connections
-        for i in range(24):
-            for conn in self.systems[i].connections:
-                plt.plot([x[i], x[conn]], [y[i], y[conn]], 'gray', zorder=1)
+        Returns:
+            The expected number of flashpoints completed up to and including the one
+            whose route first meets a camp
+        """
+        return markov.exact_expected_flashpoints(self)
 
-        # Highlight camping system
-        plt.scatter(x[self.camping_system], y[self.camping_system], s=300, c='red',
-                    edgecolors='black', zorder=3, label='Camping System')
+    def calculate_stationary_distribution(self) -> np.ndarray:
+        """
+        Calculate the long-run share of flashpoint completions in each system,
+        ignoring camps.
 
-        # Highlight flashpoints
-        if show_flashpoints:
-            for _, system_id in self.flashpoints.items():
-                plt.scatter(x[system_id], y[system_id], s=250, c='yellow',
-                            edgecolors='black', zorder=3, label='Flashpoint')
+        Returns:
+            Probability vector over the systems
+        """
+        if self.distance_oracle is not None:
+            raise ValueError("The exact solver needs a RoutingTable, not a distance oracle")
+        return markov.stationary_distribution(self.routing, self.policy)
 
-        # Show path if requested
-        if show_path:
-            if start_system is None or end_system is None:
-                raise ValueError(
-                    "Both start_system and end_system must be provided to show a path")
+    def _system_positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Plot coordinates of every system.
 
-            path = self.find_shortest_path(start_system, end_system)
-            path_x = [x[i] for i in path]
-            path_y = [y[i] for i in path]
+        Ring systems are placed on a circle; home systems sit inside it, between the
+        ring systems they connect to.
 
-            plt.plot(path_x, path_y, 'green',
-                     linewidth=3, zorder=4, label='Path')
+        Returns:
+            A tuple of (x, y) coordinate arrays indexed by system ID
+        """
+        angles = np.linspace(0, 2*np.pi, routing.RING_SIZE, endpoint=False)
+        radius = 5
+        x = radius * np.cos(angles)
+        y = radius * np.sin(angles)
 
-            # Highlight start and end
-            plt.scatter(x[start_system], y[start_system], s=250, c='green',
-                        edgecolors='black', zorder=5, label='Start')
-            plt.scatter(x[end_system], y[end_system], s=250, c='blue',
-                        edgecolors='black', zorder=5, label='End')
+        for system_id in range(routing.RING_SIZE, self.n_systems):
+            gates = self.systems[system_id].connections
+            x = np.append(x, 0.6 * np.mean(x[gates]))
+            y = np.append(y, 0.6 * np.mean(y[gates]))
 
-        # Add system labels
-        for i in range(24):
-            plt.text(1.1*x[i], 1.1*y[i], str(i), fontsize=12,
-                     ha='center', va='center', zorder=6)
+        return x, y
 
-        # Add legend (remove duplicates)
-        handles, labels = plt.gca().get_legend_handles_labels()
-        by_label = dict(zip(labels, handles))
-        plt.legend(by_label.values(), by_label.keys(), loc='best')
+    def visualize_pochven(self, show_flashpoints: bool = True, show_path: bool = False,
+                          start_system: Optional[int] = None, end_system: Optional[int] = None,
+                          output_path: Optional[str] = None) -> None:
+        """
+        Visualize the Pochven constellation, highlighting the camping system and flashpoints.
 
-        # Set title and remove axes
-        plt.title('Pochven Constellation')
-        plt.axis('off')
-        plt.tight_layout()
+        Args:
+            show_flashpoints: Whether to highlight the flashpoints
+            show_path: Whether to show a path between two systems
+            start_system: The starting system for the path (required if show_path is True)
+            end_system: The ending system for the path (required if show_path is True)
+            output_path: Render the figure to this file instead of showing it
+        """
+        # Imported here so the simulation core never loads matplotlib
+        import plotting
 
-        # Show the plot
-        plt.show()
+        plotting.visualize_pochven(self, show_flashpoints, show_path,
+                                   start_system, end_system, output_path)
 
-    def plot_probability_curve(self, max_flashpoints: int = 20, n_simulations: int = 1000) -> None:
+    def plot_probability_curve(self, max_flashpoints: int = 20, n_simulations: int = 1000,
+                               output_path: Optional[str] = None) -> None:
         """
         Plot the probability curve of encountering the camping fleet as a function of n_flashpoints.
 
         Args:
             max_flashpoints: Maximum number of flashpoints to simulate
-            n_simulations: Number of simulations to run for each data point
-        """
-        # Create arrays to store results
-        n_values = list(range(1, max_flashpoints + 1))
-        sim_probs = []
-        analytical_probs = []
-
-        # Calculate probabilities
-        for n in n_values:
-            sim_prob = self.calculate_encounter_probability(n, n_simulations)
-            analytical_prob = self.calculate_analytical_probability(n)
-
-            sim_probs.append(sim_prob)
-            analytical_probs.append(analytical_prob)
-
-        # Create the plot
-        plt.figure(figsize=(10, 6))
-        plt.plot(n_values, sim_probs, 'bo-', label='Simulation')
-        plt.plot(n_values, analytical_probs, 'r--', label='Analytical')
-
-        # Add labels and title
-        plt.xlabel('Number of Flashpoints')
-        plt.ylabel('Probability of Encounter')
-        plt.title(
-            'Probability of Encountering Camping Fleet vs. Number of Flashpoints')
-        plt.grid(True)
-        plt.legend()
-
-        # Set x-ticks to only show whole numbers
-        plt.xticks(n_values)
-
-        # Show the plot
-        plt.show()
+            n_simulations: Number of simulations to run
+            output_path: Render the figure to this file instead of showing it
+        """
+        import plotting
+
+        plotting.plot_probability_curve(self, max_flashpoints, n_simulations, output_path)
+
+    def animate_trajectory(self, records: np.ndarray, output_path: str, run: int = 0,
+                           fps: int = 10, dpi: int = 80) -> int:
+        """
+        Render a recorded run as a GIF or a sequence of PNG frames, without a display.
+
+        Args:
+            records: Trajectory records, from iter_trajectories or trajectory.load_trajectories
+            output_path: A .gif file, or a directory to write the PNG frames into
+            run: Index of the run to render
+            fps: Frames (flashpoint steps) per second of the GIF
+            dpi: Resolution of the frames
+
+        Returns:
+            Number of frames rendered
+        """
+        import plotting
+
+        return plotting.animate_trajectory(self, records, output_path, run, fps, dpi=dpi)
@@ -0,0 +1,210 @@
+"""
+Fleet routing policies.
+
+After every completion the fleet picks one of the three active flashpoints to go to
+next. A policy makes that choice from the fleet's system and the flashpoints, in
+dict order, and may also know where the camps are. Deriving a choice can be
+expensive (the lookahead policy averages over every future spawn), so each policy
+is compiled once per map and set of known camps into a table indexed
+[fleet system, first, second, third flashpoint] that holds the chosen slot. The
+simulators only ever index that table, which costs the same for every policy and
+is cheaper than comparing distances even for the nearest flashpoint.
+
+The built-in policies depend on the map only through its distances and routes, so
+they commute with its symmetries and the exact solver can share chains between
+symmetric camps. A custom policy that doesn't should set symmetric = False.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from routing import RoutingTable
+
+
+class Policy:
+    """
+    Base class of fleet routing policies.
+
+    Subclasses implement compile(); policies must be hashable and picklable (frozen
+    dataclasses are both), since compiled tables are cached per policy and policies
+    are sent to worker processes.
+
+    Attributes:
+        camp_aware: Whether the choice depends on where the camps are
+        symmetric: Whether the policy commutes with the map's symmetries
+    """
+    camp_aware = False
+    symmetric = True
+
+    def compile(self, routing: RoutingTable, camp_mask: int) -> np.ndarray:
+        """
+        Build the policy's decision table.
+
+        Args:
+            routing: Routing table of the map
+            camp_mask: Bitmask of the camps the fleet knows about (0 for policies
+                that aren't camp-aware)
+
+        Returns:
+            uint8 array of shape (S, S, S, S), indexed [fleet system, first, second,
+            third flashpoint], holding the slot (0-2) the fleet moves to
+        """
+        raise NotImplementedError
+
+
+def _candidate_grid(n_systems: int) -> np.ndarray:
+    # (S, S, S, 3) array of every flashpoint triple, in dict order
+    return np.stack(np.meshgrid(*(np.arange(n_systems),) * 3, indexing='ij'), axis=-1)
+
+
+def _route_costs(routing: RoutingTable, camp_mask: int, camp_penalty: float) -> np.ndarray:
+    # (S, S) cost of travelling between systems: jumps plus a penalty for passing a camp
+    costs = routing.distance.astype(float)
+    if camp_penalty:
+        costs += camp_penalty * (routing.path_mask & np.uint64(camp_mask) != 0)
+    return costs
+
+
+def _argmin_slots(scores: np.ndarray) -> np.ndarray:
+    # Lowest-scoring slot along the last axis; ties go to the oldest flashpoint
+    return np.argmin(scores, axis=-1).astype(np.uint8)
+
+
+@dataclass(frozen=True)
+class NearestPolicy(Policy):
+    """Go to the nearest flashpoint, breaking ties by dict order (the default)."""
+
+    def compile(self, routing: RoutingTable, camp_mask: int) -> np.ndarray:
+        fleet_system = np.arange(routing.n_systems)[:, None, None, None, None]
+        triples = _candidate_grid(routing.n_systems)[None]
+        return _argmin_slots(routing.distance[fleet_system, triples])
+
+
+@dataclass(frozen=True)
+class CampAvoidingPolicy(Policy):
+    """
+    Go to the nearest flashpoint whose route avoids every known camp.
+
+    If no route is safe, or the nearest safe flashpoint is more than max_detour
+    jumps further than the nearest one, go to the nearest flashpoint instead.
+
+    Attributes:
+        max_detour: Most extra jumps the fleet accepts to stay safe (no limit if None)
+    """
+    max_detour: Optional[int] = None
+    camp_aware = True
+
+    def compile(self, routing: RoutingTable, camp_mask: int) -> np.ndarray:
+        n_systems = routing.n_systems
+        fleet_system = np.arange(n_systems)[:, None, None, None, None]
+        triples = _candidate_grid(n_systems)[None]
+        distance = routing.distance[fleet_system, triples].astype(np.int64)
+        unsafe = routing.path_mask[fleet_system, triples] & np.uint64(camp_mask) != 0
+
+        # Unsafe flashpoints rank after every safe one
+        safe_slots = _argmin_slots(distance + unsafe * (n_systems + 1))
+        nearest_slots = _argmin_slots(distance)
+
+        safe_distance = np.take_along_axis(distance, safe_slots[..., None], axis=-1)[..., 0]
+        nearest_distance = np.take_along_axis(distance, nearest_slots[..., None], axis=-1)[..., 0]
+        acceptable = ~np.take_along_axis(unsafe, safe_slots[..., None], axis=-1)[..., 0]
+        if self.max_detour is not None:
+            acceptable &= safe_distance - nearest_distance <= self.max_detour
+        return np.where(acceptable, safe_slots, nearest_slots).astype(np.uint8)
+
+
+@dataclass(frozen=True)
+class LookaheadPolicy(Policy):
+    """
+    Plan depth flashpoints ahead by expectimax over the spawns.
+
+    Each choice minimizes the expected cost of the next depth moves, where a move
+    costs its jumps plus camp_penalty if its route passes a known camp. The fleet
+    picks the best flashpoint at every step and each spawn is uniformly random, so
+    the value of a position is the average over spawns of the best choice's cost
+    plus the value of where that choice leaves the fleet. Depth 1 with no penalty
+    is the nearest policy.
+
+    Attributes:
+        depth: Number of flashpoints to plan ahead (at least 1)
+        camp_penalty: Cost of passing a known camp, in jumps (0 ignores camps)
+    """
+    depth: int = 2
+    camp_penalty: float = 0.0
+
+    def __post_init__(self):
+        if self.depth < 1:
+            raise ValueError("The lookahead depth must be at least 1")
+        if self.camp_penalty < 0:
+            raise ValueError("The camp penalty must not be negative")
+
+    @property
+    def camp_aware(self) -> bool:
+        return self.camp_penalty != 0
+
+    def compile(self, routing: RoutingTable, camp_mask: int) -> np.ndarray:
+        n_systems = routing.n_systems
+        costs = _route_costs(routing, camp_mask, self.camp_penalty)
+
+        # Every decision: fleet system and flashpoint triple, (S, S, S, S) per slot
+        fleet_system = np.arange(n_systems)[:, None, None, None, None]
+        triples = _candidate_grid(n_systems)[None]
+        move_costs = costs[fleet_system, triples]
+
+        # The flashpoints left after taking each slot, in dict order
+        first = np.stack([triples[..., 1], triples[..., 0], triples[..., 0]], axis=-1)
+        second = np.stack([triples[..., 2], triples[..., 2], triples[..., 1]], axis=-1)
+
+        # value[f, a, b]: expected cost of the next moves from system f with a and b
+        # remaining, before the next spawn
+        value = np.zeros((n_systems,) * 3)
+        for _ in range(self.depth - 1):
+            scores = move_costs + value[triples, first, second]
+            value = scores.min(axis=-1).mean(axis=-1)
+        return _argmin_slots(move_costs + value[triples, first, second])
+
+
+# The default policy
+NEAREST = NearestPolicy()
+
+
+def resolve(policy: Optional[Policy]) -> Policy:
+    """The policy to follow, where None stands for NEAREST."""
+    return NEAREST if policy is None else policy
+
+
+# Compiled tables kept per process: one for every single camp of the largest map,
+# which runs with random camps cycle through, at under 1 MB each
+_MAX_TABLES = 32
+
+# Nested-list copies of the tables take several MB each, so fewer are kept; loops
+# over random camps hold their own for the duration of a call
+_MAX_LISTS = 8
+
+
+@lru_cache(maxsize=_MAX_TABLES)
+def _compiled(policy: Policy, routing: RoutingTable, camp_mask: int) -> np.ndarray:
+    table = policy.compile(routing, camp_mask)
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=_MAX_LISTS)
+def _compiled_lists(policy: Policy, routing: RoutingTable, camp_mask: int) -> List:
+    return _compiled(policy, routing, camp_mask).tolist()
+
+
+def policy_table(policy: Policy, routing: RoutingTable, camp_mask: int = 0) -> np.ndarray:
+    """
+    The compiled, read-only decision table of a policy, built once per map and camps.
+
+    The camps are ignored for policies that aren't camp-aware, so those share one table.
+    """
+    return _compiled(policy, routing, camp_mask if policy.camp_aware else 0)
+
+
+def policy_lists(policy: Policy, routing: RoutingTable, camp_mask: int = 0) -> List:
+    """policy_table as nested lists of ints, for fast lookups from plain Python."""
+    return _compiled_lists(policy, routing, camp_mask if policy.camp_aware else 0)
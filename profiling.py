@@ -0,0 +1,112 @@
+"""
+Opt-in instrumentation for the simulation hot path.
+
+Assign a profiler to a Pochven instance to collect per-phase timings and counters:
+
+    pochven.profiler = SimulationProfiler()
+    pochven.simulate_flashpoint_runs(10, 1000)
+    print(pochven.profiler.to_json())
+
+Any object with the same record/count/record_path_length methods can be used as a
+hook instead. While pochven.profiler is None the simulation runs its uninstrumented
+loop, so there is no per-step cost when profiling is off.
+"""
+import json
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+
+# Phases timed by the instrumented simulation loop
+PHASES = (
+    'restore',             # resetting the run state to the starting configuration
+    'randomize',           # drawing the camp and flashpoints that were not provided
+    'initial_move',        # moving the fleet to its first flashpoint
+    'spawn',               # drawing the system of the replacement flashpoint
+    'complete',            # replacing the completed flashpoint in the run state
+    'nearest_flashpoint',  # choosing the next flashpoint
+    'camp_check',          # checking the route for the camp
+    'batch',               # whole batch-engine calls
+)
+
+
+class SimulationProfiler:
+    """
+    Collects phase timings and event counters from simulations.
+
+    Attributes:
+        timings: Total seconds spent in each phase
+        calls: Number of timed intervals recorded for each phase
+        counters: Event counts (simulations, steps, spawns, camp_hits, encounters)
+        path_lengths: Histogram of route lengths in jumps
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard everything recorded so far."""
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.path_lengths: Dict[int, int] = defaultdict(int)
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Add a timed interval to a phase."""
+        self.timings[phase] += seconds
+        self.calls[phase] += 1
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        """Increment an event counter."""
+        self.counters[counter] += amount
+
+    def record_path_length(self, jumps: int) -> None:
+        """Add a route of the given number of jumps to the path-length histogram."""
+        self.path_lengths[jumps] += 1
+
+    def to_dict(self) -> dict:
+        """
+        Export the collected data.
+
+        Returns:
+            A JSON-serializable dict with per-phase total and mean times, the share
+            of the total instrumented time spent in each phase, the counters and
+            the path-length histogram
+        """
+        total = sum(self.timings.values())
+        n_paths = sum(self.path_lengths.values())
+        return {
+            'phases': {
+                phase: {
+                    'seconds': seconds,
+                    'calls': self.calls[phase],
+                    'mean_seconds': seconds / self.calls[phase],
+                    'share': seconds / total if total else 0.0,
+                }
+                for phase, seconds in self.timings.items()
+            },
+            'total_seconds': total,
+            'counters': dict(self.counters),
+            'path_lengths': {
+                'histogram': {str(jumps): count for jumps, count in sorted(self.path_lengths.items())},
+                'mean': (sum(jumps * count for jumps, count in self.path_lengths.items()) / n_paths
+                         if n_paths else 0.0),
+            },
+        }
+
+    def to_json(self, path: Optional[str] = None, indent: int = 2) -> str:
+        """
+        Export the collected data as JSON.
+
+        Args:
+            path: Also write the JSON to this file if given
+            indent: JSON indentation
+
+        Returns:
+            The JSON string
+        """
+        text = json.dumps(self.to_dict(), indent=indent)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
@@ -0,0 +1,214 @@
+"""
+Map definition and precomputed routing tables for the Pochven constellation.
+
+The simulation's inner loop only ever asks three questions about a route: how
+long it is, which flashpoint is nearest, and whether the route passes through the
+camp. RoutingTable answers all of them with table lookups built once per map from
+its adjacency lists, so the same code works for the plain ring and for the map
+with home systems.
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+RING_SIZE = 24
+
+# Home systems sit off the ring, one per krai (each krai being eight consecutive ring
+# systems), linked to two systems of their own krai. Home system IDs follow the ring.
+HOME_SYSTEM_CONNECTIONS = {
+    24: [2, 5],
+    25: [10, 13],
+    26: [18, 21],
+}
+
+_UNREACHABLE = np.iinfo(np.uint8).max
+
+
+def pochven_connections(include_home_systems: bool = False) -> Dict[int, List[int]]:
+    """
+    Adjacency lists of the Pochven map.
+
+    Ring neighbours are listed clockwise first, so shortest paths go clockwise when
+    both directions around the ring are equally long.
+
+    Args:
+        include_home_systems: Whether to add the three krai home systems
+
+    Returns:
+        A dict mapping each system ID to the IDs of the systems it connects to
+    """
+    connections = {system_id: [(system_id + 1) % RING_SIZE, (system_id - 1) % RING_SIZE]
+                   for system_id in range(RING_SIZE)}
+
+    if include_home_systems:
+        for home_system, gates in HOME_SYSTEM_CONNECTIONS.items():
+            connections[home_system] = list(gates)
+            for system_id in gates:
+                connections[system_id].append(home_system)
+
+    return connections
+
+
+class RoutingTable:
+    """
+    All-pairs distance, next-hop and path-membership tables for a map.
+
+    Shortest paths are the ones found by following next_hop, which always takes the
+    first neighbour (in adjacency order) that is one jump closer to the destination.
+
+    Attributes:
+        n_systems: Number of systems in the map
+        indptr, indices: CSR adjacency; the neighbours of system s are
+            indices[indptr[s]:indptr[s + 1]]
+        distance: (n, n) array of jump counts
+        next_hop: (n, n) array of the first system after start on the path to end
+            (end itself when start == end)
+        path_mask: (n, n) array of uint64 bitmasks; bit k is set when system k lies on
+            the path from start to end, both endpoints included
+    """
+
+    def __init__(self, connections: Dict[int, List[int]]):
+        n_systems = len(connections)
+        if sorted(connections) != list(range(n_systems)):
+            raise ValueError("System IDs must be the integers 0 to n - 1")
+        if n_systems > 64:
+            raise ValueError("Path bitmasks support at most 64 systems")
+
+        self.n_systems = n_systems
+        self.indptr = np.zeros(n_systems + 1, dtype=np.int32)
+        self.indptr[1:] = np.cumsum([len(connections[s]) for s in range(n_systems)])
+        self.indices = np.array([t for s in range(n_systems) for t in connections[s]],
+                                dtype=np.int32)
+
+        self.distance = self._all_pairs_distance()
+        if (self.distance == _UNREACHABLE).any():
+            raise ValueError("The map is not connected")
+
+        # The next hop is the first neighbour that is one jump closer to the end
+        self.next_hop = np.tile(np.arange(n_systems, dtype=np.int16), (n_systems, 1))
+        for start in range(n_systems):
+            neighbours = self.neighbours(start)
+            closer = self.distance[neighbours] == self.distance[start].astype(np.int16) - 1
+            has_closer = closer.any(axis=0)
+            self.next_hop[start, has_closer] = neighbours[np.argmax(closer, axis=0)][has_closer]
+
+        # Build each path's bitmask from the one of its next hop, nearest starts first
+        self.path_mask = np.zeros((n_systems, n_systems), dtype=np.uint64)
+        bits = np.uint64(1) << np.arange(n_systems, dtype=np.uint64)
+        for end in range(n_systems):
+            for start in np.argsort(self.distance[:, end], kind='stable'):
+                hop = self.next_hop[start, end]
+                self.path_mask[start, end] = bits[start] | (
+                    self.path_mask[hop, end] if hop != start else np.uint64(0))
+
+        # Plain nested lists for scalar lookups, which are much faster than
+        # indexing NumPy arrays one element at a time
+        self._distance_rows = self.distance.tolist()
+        self._next_hop_rows = self.next_hop.tolist()
+        self._path_mask_rows = self.path_mask.tolist()
+
+    def neighbours(self, system_id: int) -> np.ndarray:
+        """The systems connected to a system, in adjacency order."""
+        return self.indices[self.indptr[system_id]:self.indptr[system_id + 1]]
+
+    def _all_pairs_distance(self) -> np.ndarray:
+        # Breadth-first search from every system
+        n_systems = self.n_systems
+        distance = np.full((n_systems, n_systems), _UNREACHABLE, dtype=np.uint8)
+        adjacency = [self.neighbours(s).tolist() for s in range(n_systems)]
+        for source in range(n_systems):
+            row = [_UNREACHABLE] * n_systems
+            row[source] = 0
+            queue = deque([source])
+            while queue:
+                system_id = queue.popleft()
+                for neighbour in adjacency[system_id]:
+                    if row[neighbour] == _UNREACHABLE:
+                        row[neighbour] = row[system_id] + 1
+                        queue.append(neighbour)
+            distance[source] = row
+        return distance
+
+    def shortest_path(self, start_system_id: int, end_system_id: int) -> List[int]:
+        """The list of systems on the path from start to end, both included."""
+        path = [start_system_id]
+        next_hop = self._next_hop_rows
+        while path[-1] != end_system_id:
+            path.append(next_hop[path[-1]][end_system_id])
+        return path
+
+    def distance_row(self, start_system_id: int) -> List[int]:
+        """Jump counts from one system to every system, as a plain list."""
+        return self._distance_rows[start_system_id]
+
+    def get_distance(self, start_system_id: int, end_system_id: int) -> int:
+        """Number of jumps on the shortest path between two systems."""
+        return self._distance_rows[start_system_id][end_system_id]
+
+    def path_includes(self, start_system_id: int, end_system_id: int, system_id: int) -> bool:
+        """Whether the shortest path from start to end passes through system_id."""
+        return (self._path_mask_rows[start_system_id][end_system_id] >> system_id) & 1 == 1
+
+    def path_intersects(self, start_system_id: int, end_system_id: int, mask: int) -> bool:
+        """Whether the shortest path from start to end passes through any system in a bitmask."""
+        return self._path_mask_rows[start_system_id][end_system_id] & mask != 0
+
+
+def system_mask(system_ids: Iterable[int]) -> int:
+    """
+    Bitmask with one bit set per system, in the layout of RoutingTable.path_mask.
+
+    Args:
+        system_ids: System IDs to include
+
+    Returns:
+        The bitmask as a Python int
+    """
+    mask = 0
+    for system_id in system_ids:
+        mask |= 1 << system_id
+    return mask
+
+
+def order_preserving_symmetries(routing: RoutingTable) -> List[np.ndarray]:
+    """
+    Symmetries of the map that leave every simulation statistic unchanged.
+
+    Candidates are the rotations and reflections of the ring, extended to the
+    systems off the ring by matching their connections. A candidate is kept only if
+    it maps every system's adjacency list onto the image system's list in the same
+    order, since that order breaks ties between equally short paths. Reflections
+    turn clockwise into counter-clockwise and so never qualify.
+
+    Args:
+        routing: Routing table of the map
+
+    Returns:
+        A list of permutation arrays, where perm[s] is the image of system s
+    """
+    n_systems = routing.n_systems
+    neighbours = [routing.neighbours(s).tolist() for s in range(n_systems)]
+    off_ring = {tuple(sorted(neighbours[s])): s for s in range(RING_SIZE, n_systems)}
+
+    symmetries = []
+    for direction in (1, -1):
+        for shift in range(RING_SIZE):
+            perm = np.arange(n_systems)
+            perm[:RING_SIZE] = (direction * np.arange(RING_SIZE) + shift) % RING_SIZE
+            images = [off_ring.get(tuple(sorted(perm[neighbours[s]])))
+                      for s in range(RING_SIZE, n_systems)]
+            if None in images:
+                continue
+            perm[RING_SIZE:] = images
+            if all(perm[neighbours[s]].tolist() == neighbours[perm[s]] for s in range(n_systems)):
+                symmetries.append(perm)
+
+    return symmetries
+
+
+@lru_cache(maxsize=None)
+def pochven_routing_table(include_home_systems: bool = False) -> RoutingTable:
+    """The routing table for the Pochven map, built once and shared."""
+    return RoutingTable(pochven_connections(include_home_systems))
@@ -0,0 +1,243 @@
+"""
+Batch evaluation of many scenarios in one process pool.
+
+A scenario is one configuration to evaluate, given as a JSON object per line (JSONL)
+or a CSV row. Scenarios are read lazily and at most max_in_flight of them are queued
+on the workers at a time, so inputs of any size run in bounded memory. Each result
+is written as one JSON line as soon as its scenario finishes, in completion order;
+the "index" field (the scenario's position in the input) and the optional "id"
+field tie results back to their scenarios.
+
+Scenario fields (all optional; missing ones take the batch defaults):
+
+- id: any JSON value, copied to the result
+- camping_system: a system ID, or a list of IDs for several camps
+- flashpoint_systems: three system IDs
+- fleet_starting_system: a system ID
+- include_home_systems: true/false
+- n_flashpoints, n_simulations, seed
+- method: "simulation", "exact" or "both"
+- policy: "nearest", "camp-avoiding" or "lookahead", with lookahead_depth
+
+In CSV input, lists are space- or semicolon-separated and empty cells are missing.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+import policies
+from pochven import Pochven
+
+METHODS = ('simulation', 'exact', 'both')
+FORMATS = ('jsonl', 'csv')
+POLICIES = ('nearest', 'camp-avoiding', 'lookahead')
+
+# Fields holding lists of system IDs
+_LIST_FIELDS = ('camping_system', 'flashpoint_systems')
+_INT_FIELDS = ('fleet_starting_system', 'n_flashpoints', 'n_simulations', 'seed',
+               'lookahead_depth')
+
+Scenario = Dict[str, Any]
+
+
+def _parse_csv_row(row: Dict[str, str]) -> Scenario:
+    # Convert a CSV row's strings into the types a JSON scenario would have
+    scenario = {}
+    for name, value in row.items():
+        if name is None or value is None or value.strip() == '':
+            continue
+        value = value.strip()
+        if name in _LIST_FIELDS:
+            scenario[name] = [int(v) for v in value.replace(';', ' ').split()]
+        elif name in _INT_FIELDS:
+            scenario[name] = int(value)
+        elif name == 'include_home_systems':
+            scenario[name] = value.lower() in ('1', 'true', 'yes')
+        else:
+            scenario[name] = value
+    return scenario
+
+
+def read_scenarios(stream: TextIO, format: str = 'jsonl') -> Iterator[Scenario]:
+    """
+    Read scenarios one at a time.
+
+    Args:
+        stream: Text stream to read from
+        format: 'jsonl' for one JSON object per line (blank lines are skipped) or
+            'csv' for a CSV file with a header row
+
+    Yields:
+        Scenario dicts. A line that can't be parsed yields {'error': message}, so
+        it gets a result line of its own and the batch carries on
+    """
+    if format not in FORMATS:
+        raise ValueError(f"The format must be one of {', '.join(FORMATS)}")
+
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            try:
+                yield _parse_csv_row(row)
+            except ValueError as e:
+                yield {'error': f"Invalid CSV row: {e}"}
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            scenario = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'error': f"Invalid JSON: {e}"}
+            continue
+        yield scenario if isinstance(scenario, dict) else {
+            'error': "Each line must be a JSON object"}
+
+
+def _policy(scenario: Scenario) -> Optional[policies.Policy]:
+    name = scenario.get('policy', 'nearest')
+    if name not in POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+    if name == 'camp-avoiding':
+        return policies.CampAvoidingPolicy()
+    if name == 'lookahead':
+        return policies.LookaheadPolicy(depth=scenario.get('lookahead_depth', 2))
+    return None
+
+
+def _count(scenario: Scenario, name: str, default: int) -> int:
+    # A count field, which must be a positive integer
+    value = scenario.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer")
+    if value < 1:
+        raise ValueError(f"{name} must be at least 1")
+    return value
+
+
+def run_scenario(index: int, scenario: Scenario) -> Dict[str, Any]:
+    """
+    Evaluate one scenario. Runs in a worker process.
+
+    Args:
+        index: Position of the scenario in the input
+        scenario: The scenario, with the batch defaults already applied
+
+    Returns:
+        The JSON-serializable result: the probabilities asked for, the number of
+        simulations and simulated flashpoint steps, and the time taken in seconds,
+        or an "error" message for an invalid scenario
+    """
+    result = {'index': index}
+    if 'id' in scenario:
+        result['id'] = scenario['id']
+    if 'error' in scenario:
+        result['error'] = scenario['error']
+        return result
+
+    start = time.perf_counter()
+    try:
+        method = scenario.get('method', 'simulation')
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+
+        camps = scenario.get('camping_system')
+        if isinstance(camps, list) and len(camps) == 1:
+            camps = camps[0]
+        pochven = Pochven(
+            include_home_systems=bool(scenario.get('include_home_systems', False)),
+            camping_system=None if isinstance(camps, list) else camps,
+            camping_systems=camps if isinstance(camps, list) else None,
+            flashpoint_starting_systems=scenario.get('flashpoint_systems'),
+            fleet_starting_system=scenario.get('fleet_starting_system'),
+            policy=_policy(scenario))
+
+        n_flashpoints = _count(scenario, 'n_flashpoints', 10)
+        n_simulations = _count(scenario, 'n_simulations', 1000)
+        result['n_flashpoints'] = n_flashpoints
+        if method in ('simulation', 'both'):
+            result['probability'] = pochven.calculate_encounter_probability(
+                n_flashpoints, n_simulations, seed=scenario.get('seed'))
+            result['n_simulations'] = n_simulations
+            result['n_steps'] = n_simulations * n_flashpoints
+        if method in ('exact', 'both'):
+            result['exact_probability'] = pochven.calculate_analytical_probability(n_flashpoints)
+    except (ValueError, TypeError) as e:
+        result = {key: result[key] for key in ('index', 'id') if key in result}
+        result['error'] = str(e)
+
+    result['seconds'] = time.perf_counter() - start
+    result['worker'] = os.getpid()
+    return result
+
+
+def iter_results(scenarios: Iterable[Scenario], defaults: Optional[Scenario] = None,
+                 workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Evaluate scenarios on a process pool and yield each result as it finishes.
+
+    Args:
+        scenarios: Scenarios to evaluate, consumed lazily
+        defaults: Values for fields a scenario leaves out
+        workers: Number of worker processes (in this process if None or 1)
+        max_in_flight: Most scenarios queued at once (defaults to 4 per worker)
+
+    Yields:
+        Result dicts from run_scenario, in completion order
+    """
+    defaults = defaults or {}
+    tasks = ((index, {**defaults, **scenario}) for index, scenario in enumerate(scenarios))
+
+    if workers is None or workers <= 1:
+        for index, scenario in tasks:
+            yield run_scenario(index, scenario)
+        return
+
+    max_in_flight = max_in_flight or 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for index, scenario in tasks:
+            pending.add(executor.submit(run_scenario, index, scenario))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def run_batch(input_stream: TextIO, output_stream: TextIO, format: str = 'jsonl',
+              defaults: Optional[Scenario] = None, workers: Optional[int] = None,
+              max_in_flight: Optional[int] = None) -> Tuple[int, int, float]:
+    """
+    Stream scenarios from input_stream and write one JSON result line per scenario.
+
+    Each line is flushed as soon as it is written, so results can be consumed while
+    the batch is still running.
+
+    Args:
+        input_stream: Scenarios in the given format
+        output_stream: Where to write the JSONL results
+        format: 'jsonl' or 'csv'
+        defaults: Values for fields a scenario leaves out
+        workers: Number of worker processes (in this process if None or 1)
+        max_in_flight: Most scenarios queued at once (defaults to 4 per worker)
+
+    Returns:
+        A tuple of (scenarios evaluated, scenarios that failed, elapsed seconds)
+    """
+    start = time.perf_counter()
+    n_results = n_errors = 0
+    for result in iter_results(read_scenarios(input_stream, format), defaults, workers,
+                               max_in_flight):
+        output_stream.write(json.dumps(result) + '\n')
+        output_stream.flush()
+        n_results += 1
+        n_errors += 'error' in result
+    return n_results, n_errors, time.perf_counter() - start
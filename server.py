@@ -0,0 +1,355 @@
+"""
+Local query service for encounter probabilities.
+
+A long-running asyncio HTTP server, on TCP or a Unix socket, that answers
+probability and curve queries without starting a process per query:
+
+    python server.py --port 8765
+    curl 'http://127.0.0.1:8765/probability?camping_system=12&fleet_starting_system=5&n_flashpoints=10'
+
+Answers are kept in an in-memory LRU. Identical queries that arrive while one is
+being computed share that computation (request coalescing), and computations run on
+a process pool so the event loop stays responsive.
+
+Endpoints (GET, JSON responses):
+
+- /probability: camping_system, fleet_starting_system, flashpoints (comma-separated),
+  include_home_systems, n_flashpoints (default 10), n_simulations (default 1000),
+  seed, method ("simulation" or "exact")
+- /curve: the same parameters, with max_flashpoints (default 20) instead of
+  n_flashpoints
+- /stats: cache and coalescing counters
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from pochven import Pochven
+
+METHODS = ('simulation', 'exact')
+
+# Largest request head accepted, in bytes
+_MAX_HEAD_SIZE = 16 * 1024
+
+# Largest request body accepted (and skipped), in bytes
+_MAX_BODY_SIZE = 64 * 1024
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class Query(NamedTuple):
+    """A normalized query; equal queries share one cached or in-flight result."""
+    kind: str
+    method: str
+    include_home_systems: bool
+    camping_system: Optional[int]
+    fleet_starting_system: Optional[int]
+    flashpoints: Optional[Tuple[int, ...]]
+    n_flashpoints: int
+    n_simulations: Optional[int]
+    seed: Optional[int]
+
+
+def _int_param(params: Dict[str, list], name: str, default: Optional[int] = None) -> Optional[int]:
+    if name not in params:
+        return default
+    try:
+        return int(params[name][-1])
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+def parse_query(path: str) -> Query:
+    """
+    Parse a request path into a Query.
+
+    Args:
+        path: Request target, e.g. "/probability?camping_system=12&n_flashpoints=10"
+
+    Returns:
+        The normalized query
+
+    Raises:
+        LookupError: If the endpoint is unknown
+        ValueError: If a parameter is invalid
+    """
+    url = urlsplit(path)
+    kind = url.path.strip('/')
+    if kind not in ('probability', 'curve'):
+        raise LookupError(f"Unknown endpoint {url.path}")
+    params = parse_qs(url.query)
+
+    method = params.get('method', ['simulation'])[-1]
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+
+    flashpoints = None
+    if 'flashpoints' in params:
+        try:
+            flashpoints = tuple(int(f) for f in params['flashpoints'][-1].split(','))
+        except ValueError:
+            raise ValueError("flashpoints must be comma-separated integers")
+
+    if kind == 'probability':
+        n_flashpoints = _int_param(params, 'n_flashpoints', 10)
+    else:
+        n_flashpoints = _int_param(params, 'max_flashpoints', 20)
+    if n_flashpoints < 1:
+        raise ValueError("The number of flashpoints must be at least 1")
+
+    # Exact answers don't depend on the simulation parameters, so leave them out
+    # of the query to let all such requests share one result
+    n_simulations = seed = None
+    if method == 'simulation':
+        n_simulations = _int_param(params, 'n_simulations', 1000)
+        seed = _int_param(params, 'seed')
+        if n_simulations < 1:
+            raise ValueError("n_simulations must be at least 1")
+
+    return Query(
+        kind=kind,
+        method=method,
+        include_home_systems=params.get('include_home_systems', ['0'])[-1].lower() in ('1', 'true', 'yes'),
+        camping_system=_int_param(params, 'camping_system'),
+        fleet_starting_system=_int_param(params, 'fleet_starting_system'),
+        flashpoints=flashpoints,
+        n_flashpoints=n_flashpoints,
+        n_simulations=n_simulations,
+        seed=seed,
+    )
+
+
+def compute(query: Query) -> dict:
+    """
+    Answer a query. Runs in a worker process.
+
+    Returns:
+        The JSON-serializable answer
+    """
+    pochven = Pochven(include_home_systems=query.include_home_systems,
+                      camping_system=query.camping_system,
+                      flashpoint_starting_systems=None if query.flashpoints is None
+                      else list(query.flashpoints),
+                      fleet_starting_system=query.fleet_starting_system)
+    answer = {'method': query.method}
+    if query.method == 'simulation':
+        answer['n_simulations'] = query.n_simulations
+
+    if query.kind == 'probability':
+        answer['n_flashpoints'] = query.n_flashpoints
+        if query.method == 'exact':
+            answer['probability'] = pochven.calculate_analytical_probability(query.n_flashpoints)
+        else:
+            answer['probability'] = pochven.calculate_encounter_probability(
+                query.n_flashpoints, query.n_simulations, seed=query.seed)
+    else:
+        if query.method == 'exact':
+            probabilities = pochven.calculate_analytical_curve(query.n_flashpoints)[1:]
+        else:
+            _, probabilities = pochven.calculate_probability_curve(
+                query.n_flashpoints, query.n_simulations, seed=query.seed)
+        answer['n_values'] = list(range(1, query.n_flashpoints + 1))
+        answer['probabilities'] = [float(p) for p in probabilities]
+    return answer
+
+
+class QueryService:
+    """
+    Answers queries from an LRU of results, coalescing identical in-flight queries.
+
+    Unseeded simulation answers are cached like any other: a repeated query returns
+    the stored estimate rather than a fresh one.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, max_entries: int = 4096):
+        self.executor = executor
+        self.max_entries = max_entries
+        self._results: 'OrderedDict[Query, dict]' = OrderedDict()
+        self._in_flight: Dict[Query, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def answer(self, query: Query) -> dict:
+        """Answer a query from the cache, an identical in-flight query or a new computation."""
+        result = self._results.get(query)
+        if result is not None:
+            self._results.move_to_end(query)
+            self.hits += 1
+            return result
+
+        future = self._in_flight.get(query)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            future = asyncio.get_running_loop().run_in_executor(self.executor, compute, query)
+            self._in_flight[query] = future
+            future.add_done_callback(lambda f: self._finish(query, f))
+
+        # Shielded so that one client disconnecting doesn't cancel the others' answer
+        return await asyncio.shield(future)
+
+    def _finish(self, query: Query, future: asyncio.Future) -> None:
+        # Move a completed computation from the in-flight table to the LRU
+        del self._in_flight[query]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._results[query] = future.result()
+        if len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Cache and coalescing counters."""
+        return {
+            'entries': len(self._results),
+            'in_flight': len(self._in_flight),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+        }
+
+
+def _response(status: int, body: dict, keep_alive: bool) -> bytes:
+    payload = json.dumps(body).encode()
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin1') + payload
+
+
+async def _respond(service: QueryService, method: str, target: str) -> Tuple[int, dict]:
+    # Status and JSON body for one request
+    if method != 'GET':
+        return 405, {'error': 'Only GET is supported'}
+    if urlsplit(target).path.strip('/') == 'stats':
+        return 200, service.stats()
+    try:
+        query = parse_query(target)
+    except LookupError as e:
+        return 404, {'error': str(e)}
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    try:
+        return 200, await service.answer(query)
+    except ValueError as e:
+        # Invalid configurations are rejected by Pochven itself
+        return 400, {'error': str(e)}
+    except Exception as e:
+        return 500, {'error': f"{type(e).__name__}: {e}"}
+
+
+async def handle_connection(service: QueryService, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    """Serve HTTP/1.1 requests on one connection until the client closes it."""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+            if len(head) > _MAX_HEAD_SIZE:
+                return
+
+            lines = head.decode('latin1').split('\r\n')
+            try:
+                method, target, version = lines[0].split(' ')
+            except ValueError:
+                writer.write(_response(400, {'error': 'Malformed request line'}, False))
+                await writer.drain()
+                return
+
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+
+            # Requests carry no meaningful body, but skip one if sent
+            if headers.get('content-length'):
+                try:
+                    length = int(headers['content-length'])
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= _MAX_BODY_SIZE:
+                    writer.write(_response(400, {'error': 'Invalid Content-Length'}, False))
+                    await writer.drain()
+                    return
+                try:
+                    await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+            status, body = await _respond(service, method, target)
+            writer.write(_response(status, body, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765, unix_path: Optional[str] = None,
+                workers: Optional[int] = None, max_entries: int = 4096) -> None:
+    """
+    Run the query server until cancelled.
+
+    Args:
+        host: Address to listen on
+        port: TCP port to listen on
+        unix_path: Listen on this Unix socket instead of TCP
+        workers: Number of worker processes (defaults to the number of CPUs)
+        max_entries: Number of answers to keep in the LRU
+    """
+    # Workers are spawned rather than forked: forking a process that runs an event
+    # loop and executor threads can leave the children holding locks
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        service = QueryService(executor, max_entries)
+
+        def handler(reader, writer):
+            return handle_connection(service, reader, writer)
+
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(handler, path=unix_path)
+            print(f"Serving on {unix_path}")
+        else:
+            server = await asyncio.start_server(handler, host, port)
+            print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Local HTTP service for Pochven encounter probability queries')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='TCP port to listen on (default: 8765)')
+    parser.add_argument('--unix', metavar='PATH', default=None,
+                        help='Listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help='Number of answers to keep in memory (default: 4096)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Compact per-run simulation state.
+
+A SimulationState holds everything that changes during one run: the three active
+flashpoints, the fleet's system and the camps. The Pochven instance only
+holds the configuration, so any number of runs (in threads, coroutines or a plain
+loop) can each work on their own state without touching shared objects.
+"""
+from typing import Optional, Sequence, Tuple
+
+# Immutable copy of a SimulationState, as returned by snapshot()
+Snapshot = Tuple[Tuple[int, ...], Optional[int], int]
+
+
+class SimulationState:
+    """
+    Mutable state of a single simulation run.
+
+    Flashpoints occupy fixed slots ordered oldest first, matching the order of the
+    Pochven.flashpoints dict: completing a flashpoint removes its slot and the
+    replacement is appended as the newest. The slots are a tuple, so a snapshot
+    shares it instead of copying.
+
+    Attributes:
+        flashpoints: Systems of the active flashpoints, oldest first
+        fleet_system: System the fleet is in (None before it has been placed)
+        camp_mask: Bitmask of the systems with a camp (see routing.system_mask)
+    """
+    __slots__ = ('flashpoints', 'fleet_system', 'camp_mask')
+
+    def __init__(self, flashpoints: Sequence[int], fleet_system: Optional[int],
+                 camp_mask: int):
+        self.flashpoints = tuple(flashpoints)
+        self.fleet_system = fleet_system
+        self.camp_mask = camp_mask
+
+    def snapshot(self) -> Snapshot:
+        """Capture the state in O(1)."""
+        return self.flashpoints, self.fleet_system, self.camp_mask
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Return to a state captured by snapshot(), in O(1)."""
+        self.flashpoints, self.fleet_system, self.camp_mask = snapshot
+
+    def nearest_slot(self, distances: Sequence[int]) -> int:
+        """
+        Find the slot of the nearest flashpoint.
+
+        Args:
+            distances: Distances from the fleet's system to every system, e.g. a
+                row of the routing table's distance matrix
+
+        Returns:
+            The slot index; ties go to the oldest flashpoint
+        """
+        nearest_slot = 0
+        min_distance = distances[self.flashpoints[0]]
+        for slot in range(1, len(self.flashpoints)):
+            distance = distances[self.flashpoints[slot]]
+            if distance < min_distance:
+                min_distance = distance
+                nearest_slot = slot
+        return nearest_slot
+
+    def policy_slot(self, slots: list) -> int:
+        """
+        Find the slot a compiled routing policy picks from the fleet's system.
+
+        Args:
+            slots: A policy table as nested lists (see policies.policy_lists),
+                indexed [fleet system][first][second][third flashpoint]
+
+        Returns:
+            The slot index
+        """
+        first, second, third = self.flashpoints
+        return slots[self.fleet_system][first][second][third]
+
+    def complete(self, slot: int, new_system: int) -> int:
+        """
+        Complete the flashpoint in a slot and spawn its replacement.
+
+        Args:
+            slot: Slot of the flashpoint to complete
+            new_system: System of the newly spawned flashpoint
+
+        Returns:
+            The system where the flashpoint was completed, which is where the fleet is
+        """
+        flashpoints = self.flashpoints
+        completed_system = flashpoints[slot]
+        self.flashpoints = flashpoints[:slot] + flashpoints[slot + 1:] + (new_system,)
+        self.fleet_system = completed_system
+        return completed_system
+
+    def __repr__(self) -> str:
+        return (f"SimulationState(flashpoints={self.flashpoints}, "
+                f"fleet_system={self.fleet_system}, camp_mask={self.camp_mask:#x})")
@@ -0,0 +1,104 @@
+"""
+Confidence intervals and adaptive (sequential) Monte Carlo estimation.
+"""
+import math
+from statistics import NormalDist
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import batch
+
+# Size of the first batch of an adaptive run; every later batch doubles it
+INITIAL_BATCH_SIZE = 1024
+
+
+class EncounterEstimate(NamedTuple):
+    """An encounter probability estimate with its confidence interval."""
+    probability: float
+    lower: float
+    upper: float
+    n_simulations: int
+
+
+def wilson_interval(successes: int, n_trials: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Wilson score interval for a binomial proportion.
+
+    Unlike the normal approximation it stays inside [0, 1] and behaves well for
+    proportions close to 0 or 1, which are common for short or long runs.
+
+    Args:
+        successes: Number of successes
+        n_trials: Number of trials
+        confidence: Two-sided confidence level
+
+    Returns:
+        A tuple of (lower, upper) bounds
+    """
+    if n_trials == 0:
+        return 0.0, 1.0
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n_trials
+    denominator = 1 + z ** 2 / n_trials
+    centre = (p + z ** 2 / (2 * n_trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n_trials + z ** 2 / (4 * n_trials ** 2)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def sequential_encounter_estimate(pochven, n_flashpoints: int, target_half_width: float,
+                                  confidence: float = 0.95, max_simulations: int = 10 ** 7,
+                                  seed: Optional[int] = None,
+                                  workers: Optional[int] = None,
+                                  batch_size: int = INITIAL_BATCH_SIZE) -> EncounterEstimate:
+    """
+    Simulate in growing batches until the confidence interval is narrow enough.
+
+    Batch r (starting at 0) runs batch_size * 2**r simulations on its own
+    child stream of the seed, so a seeded run is reproducible and independent of the
+    number of workers.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete
+        target_half_width: Stop once the interval's half-width is at most this
+        confidence: Two-sided confidence level of the interval
+        max_simulations: Stop after this many simulations even if the target is not met
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes to split each batch over
+        batch_size: Number of simulations in the first batch
+
+    Returns:
+        The estimate, its interval and the number of simulations used
+
+    Raises:
+        ValueError: If target_half_width is not between 0 and 1, or max_simulations
+            or batch_size is not positive
+    """
+    if not 0 < target_half_width < 1:
+        raise ValueError("The target half-width must be between 0 and 1")
+    if max_simulations < 1:
+        raise ValueError("max_simulations must be at least 1")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    root = np.random.SeedSequence(seed)
+    encounters = 0
+    n_simulations = 0
+    round_index = 0
+
+    while True:
+        size = min(batch_size, max_simulations - n_simulations)
+        round_seed = np.random.SeedSequence(
+            root.entropy, spawn_key=root.spawn_key + (round_index,))
+        encounters += batch.simulate_encounters(
+            pochven, n_flashpoints, size, round_seed, workers)
+        n_simulations += size
+
+        lower, upper = wilson_interval(encounters, n_simulations, confidence)
+        if (upper - lower) / 2 <= target_half_width or n_simulations >= max_simulations:
+            return EncounterEstimate(encounters / n_simulations, lower, upper, n_simulations)
+
+        batch_size *= 2
+        round_index += 1
@@ -0,0 +1,119 @@
+"""
+Parameter sweeps over camping systems, fleet starts and flashpoint starts.
+
+Configurations related by a symmetry of the map (a rotation of the ring, for
+instance) have identical statistics, so a sweep reduces every configuration to a
+canonical representative, computes each distinct one once, and expands the results
+back onto the full grid. All representatives are simulated together in one batch.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import batch
+import markov
+import routing
+
+
+def _canonical(config: Tuple[int, int, Tuple[int, ...]],
+               symmetries: List[np.ndarray]) -> Tuple[int, int, Tuple[int, ...]]:
+    # The smallest image of the configuration under the symmetry group
+    camping_system, fleet_starting_system, flashpoints = config
+    images = []
+    for perm in symmetries:
+        images.append((
+            int(perm[camping_system]),
+            fleet_starting_system if fleet_starting_system == batch.RANDOM
+            else int(perm[fleet_starting_system]),
+            flashpoints if flashpoints[0] == batch.RANDOM
+            else tuple(int(perm[f]) for f in flashpoints)))
+    return min(images)
+
+
+def _sweep_counts(offset: int, size: int, rng: np.random.Generator, routing_table,
+                  camp_mask: np.ndarray, fleet_starting_system: np.ndarray,
+                  flashpoints: np.ndarray, n_simulations: int,
+                  n_flashpoints: int) -> np.ndarray:
+    # Encounter counts per configuration for runs offset to offset + size, where
+    # runs are laid out configuration by configuration
+    config_index = np.arange(offset, offset + size) // n_simulations
+    draws = batch.RandomDraws(rng, size)
+    state = batch.initial_state(routing_table, camp_mask[config_index],
+                                fleet_starting_system[config_index],
+                                flashpoints[config_index], draws)
+    first_encounter = batch.first_encounter_steps(
+        routing_table, *state, n_flashpoints, draws)
+    encountered = first_encounter != batch.NEVER_ENCOUNTERED
+    return np.bincount(config_index[encountered], minlength=len(camp_mask))
+
+
+def sweep_encounter_probability(camping_systems: Iterable[int],
+                                fleet_starting_systems: Iterable[Optional[int]],
+                                flashpoint_starting_systems: Iterable[Optional[Sequence[int]]],
+                                n_flashpoints: int, n_simulations: int = 1000,
+                                include_home_systems: bool = False, exact: bool = False,
+                                seed: Optional[int] = None,
+                                workers: Optional[int] = None) -> np.ndarray:
+    """
+    Calculate the encounter probability for every combination of starting parameters.
+
+    Args:
+        camping_systems: Camping systems to sweep over
+        fleet_starting_systems: Fleet starting systems to sweep over; None starts the
+            fleet at a random flashpoint
+        flashpoint_starting_systems: Triples of flashpoint starting systems to sweep
+            over; None randomizes the flashpoints on every run
+        n_flashpoints: Number of flashpoints to complete
+        n_simulations: Number of simulations to run for each distinct configuration
+        include_home_systems: Whether the map includes the krai home systems
+        exact: Use the exact Markov-chain solver instead of simulating
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes to split the simulations over
+
+    Returns:
+        Array of shape (len(camping_systems), len(fleet_starting_systems),
+        len(flashpoint_starting_systems)) of encounter probabilities
+    """
+    routing_table = routing.pochven_routing_table(include_home_systems)
+    symmetries = routing.order_preserving_symmetries(routing_table)
+
+    camping_systems = list(camping_systems)
+    fleet_starting_systems = [batch.RANDOM if s is None else s
+                              for s in fleet_starting_systems]
+    flashpoint_starting_systems = [(batch.RANDOM,) * 3 if f is None else tuple(f)
+                                   for f in flashpoint_starting_systems]
+
+    # Map every grid cell to the index of its canonical configuration
+    classes = {}
+    grid = np.empty((len(camping_systems), len(fleet_starting_systems),
+                     len(flashpoint_starting_systems)), dtype=np.int64)
+    for i, camping_system in enumerate(camping_systems):
+        for j, fleet_starting_system in enumerate(fleet_starting_systems):
+            for k, flashpoints in enumerate(flashpoint_starting_systems):
+                canonical = _canonical(
+                    (camping_system, fleet_starting_system, flashpoints), symmetries)
+                grid[i, j, k] = classes.setdefault(canonical, len(classes))
+
+    representatives = list(classes)
+    if exact:
+        probabilities = np.array([
+            markov.encounter_curve(
+                routing_table, camping_system,
+                None if flashpoints[0] == batch.RANDOM else flashpoints,
+                None if fleet_starting_system == batch.RANDOM else fleet_starting_system,
+                n_flashpoints)[n_flashpoints]
+            for camping_system, fleet_starting_system, flashpoints in representatives])
+    else:
+        camp_mask = np.left_shift(1, np.array([c for c, _, _ in representatives]))
+        fleet_starting_system = np.array([s for _, s, _ in representatives])
+        flashpoints = np.array([f for _, _, f in representatives])
+
+        counts = np.zeros(len(representatives), dtype=np.int64)
+        for chunk_counts in batch.map_chunks(
+                _sweep_counts, len(representatives) * n_simulations, routing_table,
+                camp_mask, fleet_starting_system, flashpoints, n_simulations,
+                n_flashpoints, seed=seed, workers=workers):
+            counts += chunk_counts
+        probabilities = counts / n_simulations
+
+    return probabilities[grid]
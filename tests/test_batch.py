@@ -0,0 +1,36 @@
+import pytest
+
+import batch
+import policies
+import stats
+from pochven import Pochven
+
+CONFIGURATIONS = {
+    'fixed': dict(camping_system=12, fleet_starting_system=5,
+                  flashpoint_starting_systems=[0, 8, 16]),
+    'random': dict(),
+    'several-camps': dict(camping_systems={3, 12, 20}, fleet_starting_system=0),
+    'camp-avoiding': dict(camping_system=12, fleet_starting_system=5,
+                          policy=policies.CampAvoidingPolicy()),
+}
+
+
+@pytest.mark.parametrize('name', CONFIGURATIONS)
+def test_batch_engine_matches_exact_solver(name):
+    pochven = Pochven(**CONFIGURATIONS[name])
+    n_simulations = 20000
+    for n_flashpoints in (1, 5, 20):
+        encounters = batch.simulate_encounters(pochven, n_flashpoints, n_simulations, seed=7)
+        lower, upper = stats.wilson_interval(encounters, n_simulations, confidence=0.999)
+        assert lower <= pochven.calculate_analytical_probability(n_flashpoints) <= upper
+
+
+def test_workers_give_identical_seeded_results():
+    # Several chunks, so the process pool splits them between workers
+    pochven = Pochven(**CONFIGURATIONS['random'])
+    n_simulations = 3 * batch.CHUNK_SIZE + 100
+    serial = batch.first_encounter_histogram(pochven, 10, n_simulations, seed=11, workers=1)
+    parallel = batch.first_encounter_histogram(pochven, 10, n_simulations, seed=11, workers=3)
+    assert serial.tolist() == parallel.tolist()
+    assert (pochven.calculate_encounter_probability(10, n_simulations, seed=11, workers=1)
+            == pochven.calculate_encounter_probability(10, n_simulations, seed=11, workers=3))
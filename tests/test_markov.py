@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import policies
+from pochven import Pochven
+
+CONFIGURATIONS = {
+    'fixed': dict(camping_system=12, fleet_starting_system=5,
+                  flashpoint_starting_systems=[0, 8, 16]),
+    'random': dict(),
+    'several-camps': dict(camping_systems={3, 12, 20}, fleet_starting_system=0),
+    'lookahead': dict(camping_system=12, policy=policies.LookaheadPolicy(depth=2)),
+}
+
+
+@pytest.mark.parametrize('name', CONFIGURATIONS)
+def test_expected_flashpoints_is_summed_survival_curve(name):
+    # E[T] = sum over n >= 0 of P(T > n), truncated once the tail is negligible
+    pochven = Pochven(**CONFIGURATIONS[name])
+    survival = 1.0 - pochven.calculate_analytical_curve(1000)
+    assert survival[-1] < 1e-12
+    assert pochven.calculate_expected_flashpoints() == pytest.approx(survival.sum(), rel=1e-8)
+
+
+@pytest.mark.parametrize('name', CONFIGURATIONS)
+def test_first_encounter_distribution_sums_to_curve(name):
+    pochven = Pochven(**CONFIGURATIONS[name])
+    distribution = pochven.calculate_first_encounter_distribution(50)
+    curve = pochven.calculate_analytical_curve(50)
+    assert distribution[0] == 0
+    np.testing.assert_allclose(np.cumsum(distribution), curve, atol=1e-12)
@@ -0,0 +1,24 @@
+import random
+
+import policies
+from pochven import Pochven
+
+
+def test_compiled_caches_are_bounded():
+    routing = Pochven().routing
+    policy = policies.CampAvoidingPolicy()
+    for camp_a in range(routing.n_systems):
+        for camp_b in range(camp_a + 1, camp_a + 3):
+            camp_mask = 1 << camp_a | 1 << camp_b % routing.n_systems
+            policies.policy_table(policy, routing, camp_mask)
+            policies.policy_lists(policy, routing, camp_mask)
+    assert policies._compiled.cache_info().currsize <= policies._MAX_TABLES
+    assert policies._compiled_lists.cache_info().currsize <= policies._MAX_LISTS
+
+
+def test_random_camps_with_camp_aware_policy_are_reproducible():
+    pochven = Pochven(fleet_starting_system=5, policy=policies.CampAvoidingPolicy())
+    first = pochven.simulate_flashpoint_runs(5, 200, random.Random(3))
+    second = pochven.simulate_flashpoint_runs(5, 200, random.Random(3))
+    assert first == second
+    assert 0 < first < 1
@@ -0,0 +1,29 @@
+import io
+import json
+
+import scenarios
+
+
+def test_non_positive_counts_are_per_scenario_errors():
+    lines = [
+        {'id': 'ok', 'n_flashpoints': 2, 'n_simulations': 20, 'seed': 1},
+        {'id': 'zero-simulations', 'n_simulations': 0},
+        {'id': 'negative-simulations', 'n_simulations': -5},
+        {'id': 'zero-flashpoints', 'n_flashpoints': 0},
+        {'id': 'negative-flashpoints', 'n_flashpoints': -1, 'method': 'exact'},
+        {'id': 'after', 'n_flashpoints': 2, 'n_simulations': 20, 'seed': 1},
+    ]
+    input_stream = io.StringIO(''.join(json.dumps(line) + '\n' for line in lines))
+    output_stream = io.StringIO()
+
+    n_results, n_errors, _ = scenarios.run_batch(input_stream, output_stream)
+
+    results = {r['id']: r for r in map(json.loads, output_stream.getvalue().splitlines())}
+    assert (n_results, n_errors) == (6, 4)
+    assert results['zero-simulations']['error'] == "n_simulations must be at least 1"
+    assert results['negative-simulations']['error'] == "n_simulations must be at least 1"
+    assert results['zero-flashpoints']['error'] == "n_flashpoints must be at least 1"
+    assert results['negative-flashpoints']['error'] == "n_flashpoints must be at least 1"
+    for key in ('ok', 'after'):
+        assert 0 <= results[key]['probability'] <= 1
+        assert 'error' not in results[key]
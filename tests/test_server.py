@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+async def _exchange(request: bytes) -> bytes:
+    # Send one raw request to a fresh server and return everything it answers
+    service = server.QueryService()
+    listener = await asyncio.start_server(
+        lambda r, w: server.handle_connection(service, r, w), '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+    return response
+
+
+@pytest.mark.parametrize('path', [
+    '/probability?n_flashpoints=x',
+    '/probability?n_flashpoints=0',
+    '/probability?n_simulations=0',
+    '/probability?method=bogus',
+    '/probability?camping_system=twelve',
+    '/curve?flashpoints=a,b',
+    '/curve?max_flashpoints=-1',
+])
+def test_malformed_query(path):
+    request = f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode()
+    response = asyncio.run(_exchange(request))
+    assert response.startswith(b'HTTP/1.1 400 Bad Request\r\n')
+
+
+@pytest.mark.parametrize('path', ['/', '/nosuchendpoint', '/0?n_flashpoints=x'])
+def test_unknown_endpoint(path):
+    request = f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode()
+    response = asyncio.run(_exchange(request))
+    assert response.startswith(b'HTTP/1.1 404 Not Found\r\n')
+
+
+@pytest.mark.parametrize('length', ['zz', '-5', '1.5', str(server._MAX_BODY_SIZE + 1)])
+def test_invalid_content_length(length):
+    request = f"GET /stats HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+    response = asyncio.run(_exchange(request))
+    assert response.startswith(b'HTTP/1.1 400 Bad Request\r\n')
+    assert b'Invalid Content-Length' in response
+
+
+def test_body_is_skipped():
+    request = b"GET /stats HTTP/1.1\r\nContent-Length: 3\r\nConnection: close\r\n\r\nabc"
+    response = asyncio.run(_exchange(request))
+    assert response.startswith(b'HTTP/1.1 200 OK\r\n')
@@ -0,0 +1,36 @@
+import pytest
+
+import stats
+from pochven import Pochven
+
+
+@pytest.fixture
+def pochven():
+    return Pochven(camping_system=12, fleet_starting_system=5,
+                   flashpoint_starting_systems=[0, 8, 16])
+
+
+@pytest.mark.parametrize('target_half_width', [0, -0.01, 1, 1.5])
+def test_target_half_width_out_of_range(pochven, target_half_width):
+    with pytest.raises(ValueError, match="half-width"):
+        stats.sequential_encounter_estimate(pochven, 10, target_half_width, seed=0)
+
+
+@pytest.mark.parametrize('max_simulations', [0, -1])
+def test_non_positive_max_simulations(pochven, max_simulations):
+    with pytest.raises(ValueError, match="max_simulations"):
+        stats.sequential_encounter_estimate(pochven, 10, 0.01, max_simulations=max_simulations,
+                                            seed=0)
+
+
+@pytest.mark.parametrize('batch_size', [0, -8])
+def test_non_positive_batch_size(pochven, batch_size):
+    with pytest.raises(ValueError, match="batch_size"):
+        stats.sequential_encounter_estimate(pochven, 10, 0.01, seed=0, batch_size=batch_size)
+
+
+def test_stops_at_max_simulations(pochven):
+    estimate = stats.sequential_encounter_estimate(
+        pochven, 10, 0.001, max_simulations=100, seed=0, batch_size=64)
+    assert estimate.n_simulations == 100
+    assert estimate.lower <= estimate.probability <= estimate.upper
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import timed
+from pochven import Pochven
+
+
+@pytest.fixture
+def pochven():
+    return Pochven(camping_system=12, fleet_starting_system=5,
+                   flashpoint_starting_systems=[0, 8, 16])
+
+
+@pytest.mark.parametrize('clear_duration', [timed.FixedDuration(0), timed.UniformDuration(0, 0)])
+def test_zero_time_cycles_are_rejected(pochven, clear_duration):
+    # Used to loop forever, as no clock ever reached the horizon
+    with pytest.raises(ValueError, match="jump time of 0"):
+        pochven.calculate_timed_encounter_curve(10, 1, 100, jump_time=0,
+                                                clear_duration=clear_duration, seed=1)
+    with pytest.raises(ValueError, match="jump time of 0"):
+        timed.simulate_timed_run(pochven, 10, jump_time=0, clear_duration=clear_duration,
+                                 rng=np.random.default_rng(1))
+
+
+def test_zero_jump_time_with_clear_time(pochven):
+    times, probabilities = pochven.calculate_timed_encounter_curve(
+        100, 10, 200, jump_time=0, clear_duration=timed.FixedDuration(5), seed=1)
+    assert len(times) == len(probabilities) == 11
+    assert np.all(np.diff(probabilities) >= 0)
+
+
+def test_zero_clear_time_with_jump_time(pochven):
+    _, probabilities = pochven.calculate_timed_encounter_curve(
+        100, 10, 200, jump_time=1, clear_duration=timed.FixedDuration(0), seed=1)
+    assert 0 < probabilities[-1] <= 1
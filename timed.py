@@ -0,0 +1,370 @@
+"""
+Event-driven simulation in continuous time.
+
+The step-based simulators count flashpoint completions. Here every run also keeps a
+clock: clearing a flashpoint takes a random time, every jump takes jump_time, and a
+camp only catches the fleet while its schedule says it is active. The result is the
+encounter probability as a function of elapsed time.
+
+Time advances from event to event, never by fixed ticks, so the cost depends on the
+number of flashpoints cleared and not on the length of the horizon:
+
+- simulate_timed_run follows a single run through a heap-ordered event queue
+  (flashpoint cleared, jump, arrival) and returns its full event log.
+- timed_encounter_curve runs many runs at once. Runs don't interact, so instead of
+  one global queue each run keeps its own clock and all runs advance one event cycle
+  (clear, then travel) at a time with array operations.
+"""
+import heapq
+import itertools
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import batch
+import policies
+from state import SimulationState
+
+# Default time for one jump and for clearing a flashpoint, in minutes
+DEFAULT_JUMP_TIME = 1.0
+DEFAULT_CLEAR_TIME = 20.0
+
+
+class FixedDuration:
+    """Every flashpoint takes the same time to clear."""
+
+    def __init__(self, duration: float):
+        if duration < 0:
+            raise ValueError("The duration must not be negative")
+        self.duration = duration
+
+    def __call__(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return np.full(size, float(self.duration))
+
+
+class UniformDuration:
+    """Clear times uniformly distributed between low and high."""
+
+    def __init__(self, low: float, high: float):
+        if not 0 <= low <= high:
+            raise ValueError("The bounds must satisfy 0 <= low <= high")
+        self.low = low
+        self.high = high
+
+    def __call__(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.uniform(self.low, self.high, size)
+
+
+class ExponentialDuration:
+    """Exponentially distributed clear times with the given mean."""
+
+    def __init__(self, mean: float):
+        if mean <= 0:
+            raise ValueError("The mean must be positive")
+        self.mean = mean
+
+    def __call__(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.exponential(self.mean, size)
+
+
+class GammaDuration:
+    """
+    Gamma-distributed clear times with the given mean.
+
+    Larger shapes concentrate the times around the mean; shape 1 is exponential.
+    """
+
+    def __init__(self, mean: float, shape: float = 4.0):
+        if mean <= 0 or shape <= 0:
+            raise ValueError("The mean and shape must be positive")
+        self.mean = mean
+        self.shape = shape
+
+    def __call__(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.gamma(self.shape, self.mean / self.shape, size)
+
+
+class CampSchedule:
+    """
+    Time windows during which a camp is active.
+
+    Args:
+        windows: (start, end) pairs; the camp is active for start <= t < end
+        period: If given, the windows repeat with this period (e.g. 1440 for a
+            daily schedule in minutes) and must lie within [0, period]
+    """
+
+    def __init__(self, windows: Sequence[Tuple[float, float]], period: Optional[float] = None):
+        windows = sorted(windows)
+        for (start, end), following in zip(windows, windows[1:] + [None]):
+            if start >= end:
+                raise ValueError("Every window must start before it ends")
+            if following is not None and following[0] < end:
+                raise ValueError("Camp windows must not overlap")
+        if period is not None and windows and (windows[0][0] < 0 or windows[-1][1] > period):
+            raise ValueError("Periodic windows must lie within [0, period]")
+        self.period = period
+        self._starts = np.array([start for start, _ in windows], dtype=float)
+        self._ends = np.array([end for _, end in windows], dtype=float)
+
+    def active(self, times: np.ndarray) -> np.ndarray:
+        """Whether the camp is active at each of the given times."""
+        times = np.asarray(times, dtype=float)
+        if self.period is not None:
+            times = np.mod(times, self.period)
+        window = np.searchsorted(self._starts, times, side='right') - 1
+        return (window >= 0) & (times < self._ends[np.maximum(window, 0)])
+
+
+# Camp schedules: None (always active), one schedule for every camp, or per camp
+Schedules = Union[None, CampSchedule, Dict[int, CampSchedule]]
+
+
+def _schedule_for(camp_schedule: Schedules, camping_system: int) -> Optional[CampSchedule]:
+    if isinstance(camp_schedule, dict):
+        return camp_schedule.get(camping_system)
+    return camp_schedule
+
+
+def _check_timing(jump_time: float, clear_duration) -> None:
+    # Clocks only advance by jumps and clears, so a cycle that can take no time at
+    # all would keep a run short of the horizon forever
+    if jump_time < 0:
+        raise ValueError("The jump time must not be negative")
+    if jump_time == 0 and (
+            isinstance(clear_duration, FixedDuration) and clear_duration.duration == 0
+            or isinstance(clear_duration, UniformDuration) and clear_duration.high == 0):
+        raise ValueError("With a jump time of 0, clearing a flashpoint must take time")
+
+
+class EventScheduler:
+    """Priority queue of timed events; events at equal times come out in insertion order."""
+
+    def __init__(self):
+        self._queue = []
+        self._sequence = itertools.count()
+
+    def schedule(self, time: float, kind: str, system: int) -> None:
+        """Add an event."""
+        heapq.heappush(self._queue, (time, next(self._sequence), kind, system))
+
+    def pop(self) -> Tuple[float, str, int]:
+        """Remove and return the earliest event as (time, kind, system)."""
+        time, _, kind, system = heapq.heappop(self._queue)
+        return time, kind, system
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class TimedRun(NamedTuple):
+    """The event log of one timed run."""
+    first_encounter_time: float
+    events: List[Tuple[float, str, int]]
+
+
+def simulate_timed_run(pochven, horizon: float, jump_time: float = DEFAULT_JUMP_TIME,
+                       clear_duration=None, camp_schedule: Schedules = None,
+                       rng: Optional[np.random.Generator] = None) -> TimedRun:
+    """
+    Follow a single run through time with an event queue.
+
+    Events are "arrive" (the fleet reaches a flashpoint and starts clearing it),
+    "clear" (the flashpoint is done and a new one spawns), "jump" (the fleet enters
+    a system on its way to the next flashpoint) and "encounter" (it does so, or
+    leaves from, a camping system while that camp is active).
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        horizon: Stop once the next event would happen after this time
+        jump_time: Time taken by one jump
+        clear_duration: Callable (rng, size) -> clear times, e.g. GammaDuration(20)
+            (defaults to FixedDuration(DEFAULT_CLEAR_TIME))
+        camp_schedule: When the camps are active (always if None)
+        rng: NumPy random generator (fresh entropy if omitted)
+
+    Returns:
+        The time of the first encounter (inf if none) and the log of
+        (time, kind, system) events in time order
+
+    Raises:
+        ValueError: If jump_time is negative, or is 0 while clears can take no time
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if clear_duration is None:
+        clear_duration = FixedDuration(DEFAULT_CLEAR_TIME)
+    _check_timing(jump_time, clear_duration)
+
+    routing = pochven.routing
+    n_systems = pochven.n_systems
+    camp_mask, fleet_starting_system, flashpoints = batch.configuration(pochven)
+    if camp_mask == batch.RANDOM:
+        camp_mask = 1 << int(rng.integers(0, n_systems))
+    if flashpoints[0] == batch.RANDOM:
+        flashpoints = rng.integers(0, n_systems, 3)
+    start = None if fleet_starting_system == batch.RANDOM else fleet_starting_system
+    state = SimulationState([int(f) for f in flashpoints], start, camp_mask)
+
+    slots = policies.policy_lists(policies.resolve(pochven.policy), routing, camp_mask)
+
+    def camp_active(system: int, time: float) -> bool:
+        if not (state.camp_mask >> system) & 1:
+            return False
+        schedule = _schedule_for(camp_schedule, system)
+        return schedule is None or bool(schedule.active(time))
+
+    # Travel to the first flashpoint; as in the other simulators, this route is not
+    # checked for camps
+    if start is not None:
+        slot = state.policy_slot(slots)
+        travel = routing.get_distance(fleet_starting_system, state.flashpoints[slot]) * jump_time
+    else:
+        slot = int(rng.integers(0, 3))
+        travel = 0.0
+
+    scheduler = EventScheduler()
+    scheduler.schedule(travel, 'arrive', state.flashpoints[slot])
+    events = []
+    first_encounter_time = np.inf
+
+    while scheduler:
+        time, kind, system = scheduler.pop()
+        if time > horizon:
+            break
+        events.append((time, kind, system))
+
+        if kind == 'arrive':
+            scheduler.schedule(time + float(clear_duration(rng, 1)[0]), 'clear', system)
+
+        elif kind == 'clear':
+            current_system = state.complete(slot, int(rng.integers(0, n_systems)))
+            slot = state.policy_slot(slots)
+            path = routing.shortest_path(current_system, state.flashpoints[slot])
+
+            # The route starts in the system just cleared
+            if camp_active(current_system, time):
+                scheduler.schedule(time, 'encounter', current_system)
+            for jumps, hop in enumerate(path[1:], start=1):
+                scheduler.schedule(time + jumps * jump_time, 'jump', hop)
+            scheduler.schedule(time + (len(path) - 1) * jump_time, 'arrive', path[-1])
+
+        elif kind == 'jump':
+            if camp_active(system, time):
+                scheduler.schedule(time, 'encounter', system)
+
+        elif kind == 'encounter':
+            first_encounter_time = min(first_encounter_time, time)
+
+    return TimedRun(first_encounter_time, events)
+
+
+def _first_encounter_times(routing, camp_mask: np.ndarray, flashpoints: np.ndarray,
+                           current_slot: np.ndarray, start_clock: np.ndarray,
+                           horizon: float, jump_time: float, clear_duration,
+                           camp_schedule: Schedules, draws: batch.RandomDraws,
+                           policy: Optional[policies.Policy]) -> np.ndarray:
+    # Per-run clocks advanced one clear-and-travel cycle at a time
+    distance = routing.distance
+    first_encounter = np.full(len(camp_mask), np.inf)
+    camps = [c for c in range(routing.n_systems)
+             if np.any(camp_mask >> np.uint64(c) & np.uint64(1))]
+    clock = start_clock
+
+    # iter_steps is unbounded here; the loop ends once every clock passes the horizon
+    for _, current_system, next_system, _, hit in batch.iter_steps(
+            routing, camp_mask, flashpoints, current_slot, np.iinfo(np.int64).max, draws, policy):
+        running = clock <= horizon
+        if not running.any():
+            break
+
+        cleared = clock + clear_duration(draws.rng, len(clock))
+        hit &= running
+        if hit.any():
+            # On a shortest path, a system k jumps from the start is passed k jumps in
+            route_camps = routing.path_mask[current_system, next_system] & camp_mask
+            for camp in camps:
+                on_route = hit & (route_camps >> np.uint64(camp) & np.uint64(1) == 1)
+                passed = cleared + distance[current_system, camp] * jump_time
+                schedule = _schedule_for(camp_schedule, camp)
+                if schedule is not None:
+                    on_route &= schedule.active(passed)
+                first_encounter = np.where(on_route, np.minimum(first_encounter, passed),
+                                           first_encounter)
+
+        clock = np.where(running, cleared + distance[current_system, next_system] * jump_time,
+                         clock)
+
+    return first_encounter
+
+
+def _timed_counts(offset: int, size: int, rng: np.random.Generator, routing,
+                  config: Tuple[int, int, np.ndarray], times: np.ndarray, jump_time: float,
+                  clear_duration, camp_schedule: Schedules,
+                  policy: Optional[policies.Policy]) -> np.ndarray:
+    draws = batch.RandomDraws(rng, size)
+    camp_mask, fleet_starting_system, flashpoints = batch.broadcast_configuration(config, size)
+    state = batch.initial_state(routing, camp_mask, fleet_starting_system, flashpoints, draws,
+                                policy)
+
+    # Travel time to the first flashpoint (none when starting on one)
+    _, flashpoints, current_slot = state
+    first_target = flashpoints[np.arange(size), current_slot]
+    start_clock = np.where(
+        fleet_starting_system == batch.RANDOM, 0.0,
+        routing.distance[np.maximum(fleet_starting_system, 0), first_target] * jump_time)
+
+    first_encounter = _first_encounter_times(
+        routing, *state, start_clock, times[-1], jump_time, clear_duration, camp_schedule, draws,
+        policy)
+
+    # Count each encounter at the first grid time at or after it
+    return np.bincount(np.searchsorted(times, first_encounter),
+                       minlength=len(times) + 1)[:len(times)]
+
+
+def timed_encounter_curve(pochven, horizon: float, resolution: float = 1.0,
+                          n_simulations: int = 10000, jump_time: float = DEFAULT_JUMP_TIME,
+                          clear_duration=None, camp_schedule: Schedules = None,
+                          seed: Optional[int] = None,
+                          workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encounter probability as a function of elapsed time.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        horizon: Longest elapsed time to evaluate
+        resolution: Spacing of the returned time grid
+        n_simulations: Number of runs to simulate
+        jump_time: Time taken by one jump
+        clear_duration: Callable (rng, size) -> clear times, e.g. GammaDuration(20)
+            (defaults to FixedDuration(DEFAULT_CLEAR_TIME))
+        camp_schedule: When the camps are active: None for always, a CampSchedule
+            for every camp, or a dict of CampSchedule per camping system
+        seed: Seed for reproducible results (fresh entropy if omitted)
+        workers: Number of worker processes to split the runs over
+
+    Returns:
+        A tuple of (times, probabilities) where probabilities[i] is the chance of
+        having met a camp by times[i]
+
+    Raises:
+        ValueError: If horizon or resolution is not positive, or jump_time is
+            negative, or is 0 while clears can take no time
+    """
+    if horizon <= 0 or resolution <= 0:
+        raise ValueError("The horizon and resolution must be positive")
+    if clear_duration is None:
+        clear_duration = FixedDuration(DEFAULT_CLEAR_TIME)
+    _check_timing(jump_time, clear_duration)
+
+    times = np.arange(0.0, horizon + resolution / 2, resolution)
+    times[-1] = horizon
+
+    counts = np.zeros(len(times), dtype=np.int64)
+    for chunk_counts in batch.map_chunks(
+            _timed_counts, n_simulations, pochven.routing, batch.configuration(pochven),
+            times, jump_time, clear_duration, camp_schedule, pochven.policy,
+            seed=seed, workers=workers):
+        counts += chunk_counts
+    return times, np.cumsum(counts) / n_simulations
@@ -0,0 +1,157 @@
+"""
+Streaming trajectory recording for flashpoint simulations.
+
+The batch engine's step loop is exposed as a stream of fixed-width NumPy records,
+one per run per flashpoint step, produced in blocks so that no per-step Python
+objects are kept. Streams can be written to a .npy file whose header is fixed-size
+and rewritten on close, so traces of any length are written without holding them
+in memory and read back lazily through a memory map.
+"""
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+import batch
+
+TRAJECTORY_DTYPE = np.dtype([
+    ('run', np.uint32),
+    ('step', np.uint32),
+    ('fleet_system', np.uint16),
+    ('target_system', np.uint16),
+    ('flashpoints', np.uint16, (3,)),
+    ('camp_hit', np.bool_),
+])
+
+# Target number of records per yielded block
+BLOCK_RECORDS = 1 << 16
+
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+# Space reserved for the .npy header, large enough for any record count
+_NPY_HEADER_SIZE = 256
+
+
+def iter_trajectories(pochven, n_flashpoints: int, n_simulations: int = 1,
+                      seed: Optional[int] = None) -> Iterator[np.ndarray]:
+    """
+    Stream the per-step records of a batch of simulations.
+
+    Each record holds the run index, the step (1-based), the system whose flashpoint
+    was just completed, the flashpoint system the fleet moves to next, the three
+    flashpoints after the spawn (in dict order) and whether the route passes the camp.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete in each run
+        n_simulations: Number of runs to simulate side by side
+        seed: Seed for reproducible results (fresh entropy if omitted)
+
+    Yields:
+        Structured arrays of TRAJECTORY_DTYPE records, ordered by step, then run
+    """
+    draws = batch.RandomDraws(np.random.default_rng(seed), n_simulations)
+    state = batch.initial_state(
+        pochven.routing, *batch.broadcast_configuration(batch.configuration(pochven), n_simulations),
+        draws, pochven.policy)
+
+    steps_per_block = max(1, BLOCK_RECORDS // n_simulations)
+    block = np.empty((steps_per_block, n_simulations), dtype=TRAJECTORY_DTYPE)
+    block['run'] = np.arange(n_simulations)
+    row = 0
+
+    for step, current_system, next_system, flashpoints, hit in batch.iter_steps(
+            pochven.routing, *state, n_flashpoints, draws, pochven.policy):
+        records = block[row]
+        records['step'] = step
+        records['fleet_system'] = current_system
+        records['target_system'] = next_system
+        records['flashpoints'] = flashpoints
+        records['camp_hit'] = hit
+        row += 1
+
+        if row == steps_per_block:
+            yield block.reshape(-1)
+            block = np.empty_like(block)
+            block['run'] = np.arange(n_simulations)
+            row = 0
+
+    if row:
+        yield block[:row].reshape(-1)
+
+
+class TrajectoryWriter:
+    """
+    Append-only writer of trajectory records to a .npy file.
+
+    The header is written with a fixed size up front and rewritten with the final
+    record count on close, so records can be streamed straight to disk.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype = TRAJECTORY_DTYPE):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.n_records = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self) -> None:
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (self.n_records,),
+        })
+        padding = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2 - len(header) - 1
+        if padding < 0:
+            raise ValueError("Record dtype is too large for the reserved .npy header")
+        header = (header + ' ' * padding + '\n').encode('latin1')
+        self._file.seek(0)
+        self._file.write(_NPY_MAGIC + len(header).to_bytes(2, 'little') + header)
+
+    def write(self, records: np.ndarray) -> None:
+        """Append a block of records."""
+        if records.dtype != self.dtype:
+            raise ValueError(f"Expected records of dtype {self.dtype}, got {records.dtype}")
+        self._file.write(np.ascontiguousarray(records).tobytes())
+        self.n_records += len(records)
+
+    def close(self) -> None:
+        """Record the final count in the header and close the file."""
+        if self._file.closed:
+            return
+        self._write_header()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_trajectories(path: str, blocks: Iterable[np.ndarray]) -> int:
+    """
+    Write a stream of record blocks to a .npy file.
+
+    Args:
+        path: Output file path
+        blocks: Record blocks, for example from iter_trajectories
+
+    Returns:
+        Number of records written
+    """
+    with TrajectoryWriter(path) as writer:
+        for records in blocks:
+            writer.write(records)
+    return writer.n_records
+
+
+def load_trajectories(path: str) -> np.ndarray:
+    """
+    Open a trajectory file lazily.
+
+    Returns:
+        A read-only memory-mapped array of records; only the parts that are accessed
+        are read from disk
+    """
+    return np.load(path, mmap_mode='r')
+
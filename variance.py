@@ -0,0 +1,127 @@
+"""
+Variance reduction for encounter probability estimates.
+
+Two techniques, both built on the batch engine:
+
+- Common random numbers: configurations replay the same SpawnTape, so their
+  estimates are positively correlated and the noise in their difference largely
+  cancels.
+- Conditional Monte Carlo: each step adds the exact probability that the next route
+  passes the camp instead of sampling it (batch.conditional_encounter_probabilities).
+
+The functions here run both plain and reduced estimators on the same tape and report
+how much variance each technique removes.
+"""
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+import batch
+
+
+class VarianceReport(NamedTuple):
+    """Plain versus conditional Monte Carlo on the same runs."""
+    plain_estimate: float
+    conditional_estimate: float
+    plain_variance: float
+    conditional_variance: float
+    variance_reduction: float
+
+
+class ConfigurationComparison(NamedTuple):
+    """
+    Estimates for several configurations simulated on a shared spawn tape.
+
+    differences[i, j] is estimates[i] - estimates[j]; the two variance matrices give
+    the variance of that difference with common random numbers and, for reference,
+    with independent runs of the same size.
+    """
+    estimates: np.ndarray
+    differences: np.ndarray
+    common_variance: np.ndarray
+    independent_variance: np.ndarray
+
+
+def run_values(pochven, tape: batch.SpawnTape, n_flashpoints: int,
+               conditional: bool = False) -> np.ndarray:
+    """
+    Per-run encounter values of a configuration replayed on a spawn tape.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        tape: Spawn tape with at least n_flashpoints steps
+        n_flashpoints: Number of flashpoints to complete in each run
+        conditional: Return conditional Monte Carlo estimates instead of 0/1 outcomes
+
+    Returns:
+        Array with one value per run on the tape; its mean estimates the encounter
+        probability
+    """
+    if n_flashpoints > tape.n_flashpoints:
+        raise ValueError(
+            f"The spawn tape only covers {tape.n_flashpoints} flashpoints")
+
+    state = batch.initial_state(
+        pochven.routing, *batch.broadcast_configuration(batch.configuration(pochven), tape.size),
+        tape, pochven.policy)
+    if conditional:
+        return batch.conditional_encounter_probabilities(
+            pochven.routing, *state, n_flashpoints, tape, pochven.policy)
+    first_encounter = batch.first_encounter_steps(
+        pochven.routing, *state, n_flashpoints, tape, pochven.policy)
+    return (first_encounter != batch.NEVER_ENCOUNTERED).astype(np.float64)
+
+
+def conditional_variance_reduction(pochven, n_flashpoints: int, n_simulations: int = 10000,
+                                   seed: Optional[int] = None) -> VarianceReport:
+    """
+    Compare plain and conditional Monte Carlo on the same spawn tape.
+
+    Args:
+        pochven: The Pochven instance describing the configuration
+        n_flashpoints: Number of flashpoints to complete
+        n_simulations: Number of simulations on the tape
+        seed: Seed of the spawn tape
+
+    Returns:
+        Both estimates, their per-run variances and the ratio plain / conditional
+    """
+    tape = batch.SpawnTape(n_simulations, n_flashpoints, seed)
+    plain = run_values(pochven, tape, n_flashpoints)
+    conditional = run_values(pochven, tape, n_flashpoints, conditional=True)
+
+    plain_variance = float(plain.var(ddof=1))
+    conditional_variance = float(conditional.var(ddof=1))
+    return VarianceReport(float(plain.mean()), float(conditional.mean()),
+                          plain_variance, conditional_variance,
+                          plain_variance / conditional_variance if conditional_variance > 0 else np.inf)
+
+
+def compare_configurations(pochvens: Sequence, n_flashpoints: int, n_simulations: int = 10000,
+                           seed: Optional[int] = None,
+                           conditional: bool = False) -> ConfigurationComparison:
+    """
+    Estimate several configurations with common random numbers.
+
+    Args:
+        pochvens: Pochven instances describing the configurations to compare
+        n_flashpoints: Number of flashpoints to complete
+        n_simulations: Number of simulations on the shared tape
+        seed: Seed of the spawn tape
+        conditional: Also apply the conditional Monte Carlo estimator
+
+    Returns:
+        The estimates, their pairwise differences and the variances of those
+        differences with and without common random numbers
+    """
+    tape = batch.SpawnTape(n_simulations, n_flashpoints, seed)
+    values = np.array([run_values(pochven, tape, n_flashpoints, conditional)
+                       for pochven in pochvens])
+
+    estimates = values.mean(axis=1)
+    differences = estimates[:, None] - estimates[None, :]
+    variances = values.var(axis=1, ddof=1)
+    common_variance = np.array([[np.var(a - b, ddof=1) for b in values]
+                                for a in values]) / n_simulations
+    independent_variance = (variances[:, None] + variances[None, :]) / n_simulations
+    return ConfigurationComparison(estimates, differences, common_variance, independent_variance)